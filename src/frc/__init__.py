@@ -1,5 +1,15 @@
-from . import commands
-from . import subsystems
+import importlib
 
-from . import constants
-from . import robot
\ No newline at end of file
+_submodules = (
+    'commands',
+    'subsystems',
+    'constants',
+    'robot',
+)
+
+
+def __getattr__(name: str):
+    # Imported on first use so that e.g. frc.constants doesn't pull in the robot
+    if name in _submodules:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
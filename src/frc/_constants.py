@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from lib.robotpy.utils import ConstantsClass, IDList
+
+
+# Any values with just a type hint are placeholders for the actual value
+
+class Interface(ConstantsClass):
+    kDriverControllerPort: int
+    kManipControllerPort: int
+    kAxisCount = 6
+    kLeftDriveAxis = 1
+    kRightDriveAxis = 5
+
+    # Drive stick shaping (lib.python.shaping), in order
+    kDriveDeadzone = 0.1
+    # Output is kDriveExpoBlend parts |x|^kDriveExpo to the rest linear
+    kDriveExpo = 2.
+    kDriveExpoBlend = 1.
+    # Output units per second
+    kDriveSlewRate = 4.
+    # Seconds
+    kDriveFilterTimeConstant = 0.02
+    kDriveScale = 1.
+
+
+class Drivetrain(ConstantsClass):
+    kLeftMotorIDs: IDList
+    kRightMotorIDs: IDList
+
+    # Meters between the left and right wheels' contact patches
+    kTrackWidth = 0.6
+    kWheelDiameter = 0.1524
+    # Motor rotations per wheel rotation
+    kGearRatio = 10.71
+    # Integrated sensor counts per motor rotation
+    kEncoderResolution = 2048
+    kOdometryPeriod = 0.005
+    kPoseHistoryLength = 1.
+    # Wheel speed (m/s) at full output, for feedforward
+    kMaxWheelSpeed = 4.
+    kTelemetryPeriod = 0.1
+    # Output per meter of position error when following a profile
+    kProfileP = 1.
+
+    # See lib.robotpy.configuration.talonFXParameters for the parameters
+    class kMotorConfig(ConstantsClass):
+        openLoopRamp = 0.2
+        neutralMode = 'Brake'
+        # (enable, limit, trigger threshold, trigger time)
+        supplyCurrentLimit = (True, 40., 60., 0.1)
+
+
+class Elevator(ConstantsClass):
+    kMotorIDs: IDList
+
+    class kPIDConstants(ConstantsClass):
+        Kp: int
+        Ki: int
+        Kd: int
+
+    # Plant model for tuning (frc.tuning); kg, motor rotations per drum rotation, m.
+    # The controller works in m, as the tuning plant does
+    kCarriageMass = 10.
+    kGearRatio = 10.
+    kDrumRadius = 0.02
+    kMaxHeight = 1.5
+    # Integrated sensor counts per motor rotation
+    kEncoderResolution = 2048
+
+    kControlPeriod = 0.005
+    kTelemetryPeriod = 0.1
+
+    class kMotorConfig(ConstantsClass):
+        neutralMode = 'Brake'
+        supplyCurrentLimit = (True, 30., 40., 0.1)
+
+
+class Autonomous(ConstantsClass):
+    kMaxVelocity = 2.
+    kMaxAcceleration = 2.
+    kSampleInterval = 0.02
+    # (x, y, heading) in m and radians; interior waypoints are (x, y)
+    kStart = (0., 0., 0.)
+    kInteriorWaypoints = ((1.5, 0.5),)
+    kEnd = (3., 1., 0.)
+    # Distances forwardDistance is used with, generated ahead of time
+    kForwardDistances = (1.,)
+    # Relative to the working directory; /home/lvuser on the robot
+    kCacheDirectory = 'profiles'
+
+
+class Power(ConstantsClass):
+    # Ohms, including wiring
+    kBatteryResistance = 0.02
+    # Outputs are scaled to keep the predicted battery voltage above this (brownout is 6.8 V)
+    kMinimumVoltage = 7.5
+    # How fast a shed group's scale recovers, per second
+    kRecoveryRate = 2.
+    # Integrated sensor counts per 100 ms at a Falcon 500's free speed
+    kFreeSpeedCounts = 6380 / 600 * 2048
+    # Higher priorities are served first
+    kDrivetrainPriority = 1
+    kElevatorPriority = 0
+
+
+class Health(ConstantsClass):
+    kSamplePeriod = 0.1
+    # Samples per rolling window, and the weight of each new sample in the EWMA
+    kWindow = 50
+    kAlpha = 0.1
+    # Faults are only judged once the window has this many samples
+    kMinSamples = 10
+    # Stalled: mean stator current above this (A) while barely turning (counts per 100 ms)
+    kStallCurrent = 60.
+    kStallVelocity = 100.
+    # Over current: EWMA above group median * ratio + margin (A)
+    kOutlierRatio = 1.5
+    kOutlierMargin = 10.
+    # Celsius
+    kMaxTemperature = 80.
+
+
+class Scheduling(ConstantsClass):
+    # Every subsystem rate must be a multiple of this
+    kTickPeriod = 0.005
+
+
+class Diagnostics(ConstantsClass):
+    # Time robotPeriodic, subsystem periodics and command execute/isFinished
+    kLoopTiming = False
+    # Count the bytes each of those allocates, with tracemalloc (slow)
+    kAllocations = False
+    # Sample the loop's stack, tagged with the running command or subsystem;
+    # cheap enough for practice matches. Written as <log>.collapsed when disabled
+    kSampling = False
+    kSamplingInterval = 0.01
+
+
+class GarbageCollection(ConstantsClass):
+    # Automatic collection thresholds while enabled; None disables it entirely.
+    # Only short, young-generation collections run; gen 2 never comes due
+    kEnabledThresholds = (10_000, 100, 1_000_000)
+    # Full collections while disabled
+    kDisabledCollectPeriod = 1.
+
+
+class Dashboard(ConstantsClass):
+    kTableName = 'Robot'
+    # The publisher thread's period; fields are sampled every robot loop
+    kPublishPeriod = 0.05
+    # Every field is republished at least this often (s), for dashboards which connect late
+    kMaxInterval = 1.
+    # Changes smaller than these aren't published: output, m and radians, encoder counts
+    kOutputThreshold = 0.01
+    kPoseThreshold = 0.01
+    kEncoderThreshold = 10.
+
+
+class Telemetry(ConstantsClass):
+    # Relative to the working directory; /home/lvuser on the robot
+    kLogDirectory = 'logs'
+    kBlockRows = 250
+
+
+class Configuration(ConstantsClass):
+    # Last configuration applied to each motor; relative to the working directory, /home/lvuser on the robot
+    kCachePath = 'motorconfig.json'
+    kTimeoutMs = 50
+    kRetries = 3
+    kWorkers = 4
@@ -1,14 +1,26 @@
+from __future__ import annotations
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
-    from collections import Callable
+    from typing import Callable
 
 import commands2
+import wpilib
 
-from lib.python.utils import (
-    deadzone,
-    unit_float,
-)
-from frc import subsystems
+from lib.python import shaping
+from lib.python.utils import unit_float
+import frc.constants as constants
+from frc import subsystems, trajectories
+
+
+def makeDrivePipeline(period: float = wpilib.TimedRobot.kDefaultPeriod) -> shaping.Pipeline:
+    """Stick shaping for one side of the drive; also usable offline through Pipeline.batch"""
+    return shaping.Pipeline(
+        shaping.Deadzone(constants.Interface.kDriveDeadzone),
+        shaping.Expo(constants.Interface.kDriveExpo, constants.Interface.kDriveExpoBlend),
+        shaping.SlewRateLimiter(constants.Interface.kDriveSlewRate, period),
+        shaping.LowPass(constants.Interface.kDriveFilterTimeConstant, period),
+        shaping.Scale(constants.Interface.kDriveScale),
+    )
 
 
 class default(commands2.CommandBase):
@@ -20,12 +32,21 @@ class default(commands2.CommandBase):
             leftPowerSupplier: Callable[[], unit_float], 
             rightPowerSupplier: Callable[[], unit_float],
             ) -> None:
+        super().__init__()
         self.leftPowerSupplier = leftPowerSupplier
         self.rightPowerSupplier = rightPowerSupplier
-        self.addRequirements(subsystems.drivetrain)
-        super().__init__()
+        self.leftPipeline = makeDrivePipeline()
+        self.rightPipeline = makeDrivePipeline()
+        # Called directly every execute
+        self.leftShaping = self.leftPipeline.function()
+        self.rightShaping = self.rightPipeline.function()
+        self.drivetrain = subsystems.drivetrain
+        self.addRequirements(self.drivetrain)
     
     def initialize(self) -> None:
+        # Slew and filter state restart from rest
+        self.leftPipeline.reset()
+        self.rightPipeline.reset()
         return super().initialize()
     
     def execute(self) -> None:
@@ -34,8 +55,9 @@ class default(commands2.CommandBase):
         """
         #8======D
         self.drivetrain.tankDrive(
-            deadzone(self.leftPowerSupplier()),
-            deadzone(self.rightPowerSupplier()),
+            self.leftShaping(self.leftPowerSupplier()),
+            self.rightShaping(self.rightPowerSupplier()),
+            False,
         )
         return super().execute()
     
@@ -48,7 +70,37 @@ class default(commands2.CommandBase):
 
 
 class forwardDistance(commands2.CommandBase):
-    def __init__(self) -> None:
-        
-        
-        self.addRequirements(subsystems.drivetrain)
\ No newline at end of file
+    """
+    Drives straight for a distance (m) along a cached trapezoidal profile
+    """
+    def __init__(self, distance: float) -> None:
+        super().__init__()
+        self.drivetrain = subsystems.drivetrain
+        # Loaded (or generated) here rather than when scheduled
+        self.profile = trajectories.forwardProfile(distance)
+        self.timer = wpilib.Timer()
+        self.addRequirements(self.drivetrain)
+
+    def initialize(self) -> None:
+        self.startDistance = self.drivetrain.getAverageDistance()
+        self.timer.reset()
+        self.timer.start()
+        return super().initialize()
+
+    def execute(self) -> None:
+        setpoint = self.profile.sample(self.timer.get())
+        error = self.startDistance + setpoint['position'] - self.drivetrain.getAverageDistance()
+        output = (
+            setpoint['velocity'] / constants.Drivetrain.kMaxWheelSpeed
+            + constants.Drivetrain.kProfileP * error
+        )
+        self.drivetrain.tankDrive(output, output, False)
+        return super().execute()
+
+    def end(self, interrupted: bool) -> None:
+        self.timer.stop()
+        self.drivetrain.tankDrive(0, 0)
+        return super().end(interrupted)
+
+    def isFinished(self) -> bool:
+        return self.profile.is_finished(self.timer.get())
@@ -1,20 +1,57 @@
+from __future__ import annotations
+
 import commands2
+import wpilib
+from wpimath.controller import RamseteController
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.kinematics import DifferentialDriveKinematics
 
+import frc.constants as constants
 import frc.subsystems as subsystems
+from frc import trajectories
 
 
 class AutonomousCommand(commands2.CommandBase):
+    """
+    Follows the cached autonomous trajectory with a Ramsete controller
+    """
     def __init__(self, drivetrain: subsystems.Drivetrain):
+        super().__init__()
+        self.drivetrain = drivetrain
+        # Loaded (or generated) at robotInit, so autonomousInit only schedules
+        self.trajectory = trajectories.autonomousTrajectory()
+        self.controller = RamseteController()
+        self.kinematics = DifferentialDriveKinematics(constants.Drivetrain.kTrackWidth)
+        self.timer = wpilib.Timer()
         self.addRequirements(drivetrain)
     
     def initialize(self) -> None:
+        self.drivetrain.resetPose(*constants.Autonomous.kStart)
+        self.timer.reset()
+        self.timer.start()
         return super().initialize()
     
     def execute(self) -> None:
+        reference = self.trajectory.sample(self.timer.get())
+        pose = self.drivetrain.getPose()
+        speeds = self.controller.calculate(
+            Pose2d(pose.x, pose.y, Rotation2d(pose.heading)),
+            Pose2d(reference['x'], reference['y'], Rotation2d(reference['heading'])),
+            reference['velocity'],
+            reference['velocity'] * reference['curvature'],
+        )
+        wheelSpeeds = self.kinematics.toWheelSpeeds(speeds)
+        self.drivetrain.tankDrive(
+            wheelSpeeds.left / constants.Drivetrain.kMaxWheelSpeed,
+            wheelSpeeds.right / constants.Drivetrain.kMaxWheelSpeed,
+            False,
+        )
         return super().execute()
     
     def end(self, interrupted: bool) -> None:
+        self.timer.stop()
+        self.drivetrain.tankDrive(0, 0)
         return super().end(interrupted)
     
     def isFinished(self) -> bool:
-        return super().isFinished()
\ No newline at end of file
+        return self.trajectory.is_finished(self.timer.get())
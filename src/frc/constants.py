@@ -1,24 +1,34 @@
+"""
+The robot's constants, defined in frc._constants
+
+Loaded from the snapshot written by frc.freezeconstants when it is current,
+which skips ConstantsType.__new__ (and its placeholder warnings) at boot;
+otherwise frc._constants is imported as usual. That saves a couple of ms
+once per boot (frc.freezeconstants reports both, timed from cold);
+the build mostly earns its keep by validating the constants before a deploy
+"""
 from __future__ import annotations
 
-from lib.robotpy.utils import ConstantsClass, IDList
+import os
+import typing
 
+import lib.python.utils
+import lib.robotpy.utils
+from lib.robotpy import frozenconstants
 
-# Any values with just a type hint are placeholders for the actual value
+if typing.TYPE_CHECKING:
+    from frc._constants import *
 
-class Interface(ConstantsClass):
-    kDriverControllerPort: int
-    kManipControllerPort: int
 
+_kDirectory = os.path.dirname(os.path.abspath(__file__))
+kSnapshotPath = os.path.join(_kDirectory, 'constants.snapshot')
+# Any change to these makes the snapshot stale
+kSourcePaths = (
+    os.path.join(_kDirectory, '_constants.py'),
+    # How the classes are created and indexed
+    lib.robotpy.utils.__file__,
+    lib.python.utils.__file__,
+    frozenconstants.__file__,
+)
 
-class Drivetrain(ConstantsClass):
-    kLeftMotorIDs: IDList
-    kRightMotorIDs: IDList
-
-
-class Elevator(ConstantsClass):
-    kMotorIDs: IDList
-
-    class kPIDConstants(ConstantsClass):
-        Kp: int
-        Ki: int
-        Kd: int
+globals().update(frozenconstants.loadOrImport('frc._constants', kSourcePaths, kSnapshotPath))
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import frc.constants as constants
+from lib.robotpy.dashboard import DashboardPublisher
+
+
+# Subsystems add their fields when constructed; Robot samples it every loop and starts it in robotInit
+publisher = DashboardPublisher(constants.Dashboard.kPublishPeriod)
+
+
+def addFields(
+        prefix: str,
+        getters: dict[str, Callable[[], Any]],
+        typecode: str = 'd',
+        threshold: float = 0.,
+        ) -> None:
+    for name, getter in getters.items():
+        publisher.addField(f'{prefix}/{name}', getter, typecode, threshold, constants.Dashboard.kMaxInterval)
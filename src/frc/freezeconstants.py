@@ -0,0 +1,91 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import argparse
+import importlib
+import os
+import statistics
+import subprocess
+import sys
+import warnings
+
+from lib.robotpy import frozenconstants
+
+
+_kSourceDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter, with the modules frc.constants needs either way already imported
+_kTimingScript = '''
+import site
+import sys
+site.addsitedir(sys.argv[1])
+from time import perf_counter
+import lib.python.utils, lib.robotpy.utils
+from lib.robotpy import frozenconstants
+start = perf_counter()
+if sys.argv[2] == 'load':
+    import frc.constants
+    assert 'frc._constants' not in sys.modules, 'snapshot not used'
+else:
+    import frc._constants
+print(perf_counter() - start)
+'''
+
+
+def coldTime(mode: str, runs: int) -> float:
+    """Median seconds to 'load' the snapshot or 'import' frc._constants, each in a new process"""
+    times = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', _kTimingScript, _kSourceDirectory, mode],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True,
+        )
+        times.append(float(result.stdout))
+    return statistics.median(times)
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Validate frc._constants and snapshot it for frc.constants to load at boot; run before deploying',
+    )
+    parser.add_argument('--check', action='store_true', help='only report whether the snapshot is current')
+    parser.add_argument('--strict', action='store_true', help='fail on warnings, e.g. placeholder constants')
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes to time loading and importing in')
+    args = parser.parse_args(argv)
+
+    # Imported first, so that its warnings are caught however frc.constants loads
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        module = importlib.import_module('frc._constants')
+    import frc.constants as constants
+
+    if args.check:
+        current = frozenconstants.isCurrent(constants.kSourcePaths, constants.kSnapshotPath)
+        print(f'{constants.kSnapshotPath} is {"current" if current else "stale"}')
+        return 0 if current else 1
+
+    for warning in caught:
+        print(f'warning: {warning.filename}:{warning.lineno}: {warning.message}')
+    problems = frozenconstants.validate(module)
+    for problem in problems:
+        print(f'error: {problem}')
+    if problems or (args.strict and caught):
+        print('Snapshot not written')
+        return 1
+
+    frozenconstants.build(module, constants.kSourcePaths, constants.kSnapshotPath)
+    # Timed from cold, as at boot: within this process both would be cached
+    loadTime = coldTime('load', args.runs)
+    importTime = coldTime('import', args.runs)
+    print(
+        f'Wrote {constants.kSnapshotPath}: loads in {loadTime * 1e3:.1f} ms '
+        f'(frc._constants imports in {importTime * 1e3:.1f} ms), median of {args.runs} fresh processes'
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import frc.constants as constants
+from lib.robotpy.power import CurrentArbiter
+
+
+# Subsystems register their motor groups when constructed; Robot updates it every loop
+arbiter = CurrentArbiter(
+    resistance=constants.Power.kBatteryResistance,
+    minimumVoltage=constants.Power.kMinimumVoltage,
+    recoveryRate=constants.Power.kRecoveryRate,
+)
+
+
+def supplyCurrentLimit(motorConfig) -> float:
+    """Per-motor supply current limit (A) of a kMotorConfig constants class, if enabled"""
+    limit = dict(motorConfig.items()).get('supplyCurrentLimit')
+    if limit is None or not limit[0]:
+        return float('inf')
+    return limit[1]
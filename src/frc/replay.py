@@ -0,0 +1,141 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    # Log paths are relative to the caller, so src is added without changing directory
+    import os
+    import site
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import argparse
+import multiprocessing
+import os
+from time import perf_counter
+
+import numpy
+
+import frc.constants as constants
+from frc.simulation import HeadlessSimulation, JoystickScript
+from lib.python.matchlog import MatchLog
+
+
+# Recorded outputs compared against the replay's
+OUTPUT_FIELDS = (
+    'drivetrain/leftOutput',
+    'drivetrain/rightOutput',
+    'elevator/output',
+)
+
+
+def scriptFromLog(log: MatchLog) -> tuple[JoystickScript, int]:
+    """
+    Joystick keyframes for every change in the recorded driver and manipulator input,
+    with the log timestamp (ns) at which autonomous started
+    """
+    ports = (
+        ('driver', constants.Interface.kDriverControllerPort),
+        ('manip', constants.Interface.kManipControllerPort),
+    )
+    axisCount = constants.Interface.kAxisCount
+
+    names = ['robot/mode']
+    for name, _ in ports:
+        names += [f'interface/{name}/axis{axis}' for axis in range(axisCount)]
+        names.append(f'interface/{name}/buttons')
+    columns = log.query(names)
+
+    timestamps = columns['timestamp']
+    enabled = numpy.flatnonzero(columns['robot/mode'] != 0)
+    if not len(enabled):
+        raise ValueError(f'{log.path} never leaves disabled')
+    # Teleop-only logs (e.g. practice) start where autonomous would have ended
+    matchStart = int(timestamps[enabled[0]])
+    if columns['robot/mode'][enabled[0]] != 1:
+        matchStart -= int(HeadlessSimulation.kAutonomousLength * 1e9)
+    matchTimes = (timestamps - matchStart) / 1e9
+
+    keyframes = []
+    for name, port in ports:
+        axes = numpy.stack([columns[f'interface/{name}/axis{axis}'] for axis in range(axisCount)], axis=1)
+        buttons = columns[f'interface/{name}/buttons']
+        changed = numpy.ones(len(timestamps), bool)
+        changed[1:] = (axes[1:] != axes[:-1]).any(axis=1) | (buttons[1:] != buttons[:-1])
+        for i in numpy.flatnonzero(changed):
+            keyframes.append((float(matchTimes[i]), port, axes[i].tolist(), int(buttons[i])))
+
+    return JoystickScript(keyframes), matchStart
+
+
+def replay(path: str, seed: int = 0) -> dict[str, numpy.ndarray]:
+    """
+    Drives the robot code with a log's recorded joystick input on the simulated clock,
+    returning the match time and commanded motor outputs of every loop
+    (plus the recorded outputs, as recorded/<field>, resampled to the same times)
+    """
+    from frc.robot import Robot
+
+    with MatchLog(path) as log:
+        script, matchStart = scriptFromLog(log)
+        until = (log.end_time - matchStart) / 1e9
+        recorded = log.query([name for name in OUTPUT_FIELDS if name in log.dtypes])
+        recorded = {name: numpy.array(column) for name, column in recorded.items()}
+
+    samples = {name: [] for name in ('matchTime', *OUTPUT_FIELDS)}
+
+    def onStep(robot, matchTime: float) -> None:
+        container = robot.container
+        samples['matchTime'].append(matchTime)
+        samples['drivetrain/leftOutput'].append(container.drivetrain.mLeftMotors.get())
+        samples['drivetrain/rightOutput'].append(container.drivetrain.mRightMotors.get())
+        samples['elevator/output'].append(container.elevator.mMotors.get())
+
+    HeadlessSimulation(Robot, seed=seed, script=script, onStep=onStep).run(until)
+
+    results = {name: numpy.array(values) for name, values in samples.items()}
+    recordedTimes = (recorded.pop('timestamp') - matchStart) / 1e9
+    for name, column in recorded.items():
+        results[f'recorded/{name}'] = numpy.interp(results['matchTime'], recordedTimes, column)
+    return results
+
+
+def _replayToFile(job: tuple[str, str, int]) -> tuple[str, str, float]:
+    path, outputDirectory, seed = job
+    start = perf_counter()
+    results = replay(path, seed)
+    output = os.path.join(outputDirectory, os.path.basename(path) + '.replay.npz')
+    numpy.savez_compressed(output, **results)
+    return path, output, perf_counter() - start
+
+
+def replayAll(paths: list[str], outputDirectory: str, processes: int = None, seed: int = 0) -> list[tuple[str, str, float]]:
+    """
+    Replays every log in its own freshly spawned process
+    (the HAL and the robot's subsystems are per-process singletons),
+    saving each log's results as <outputDirectory>/<log>.replay.npz
+    """
+    os.makedirs(outputDirectory, exist_ok=True)
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes, maxtasksperchild=1) as pool:
+        return list(pool.imap_unordered(
+            _replayToFile,
+            [(path, outputDirectory, seed) for path in paths],
+        ))
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Replay recorded joystick input through the robot code')
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--output', default='replays', help='directory for the .replay.npz results')
+    parser.add_argument('--jobs', type=int, default=None, help='parallel replays (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for path, output, elapsed in replayAll(args.logs, args.output, args.jobs, args.seed):
+        results = numpy.load(output)
+        print(f'{path}: replayed in {elapsed:.1f} s -> {output}')
+        for name in OUTPUT_FIELDS:
+            if f'recorded/{name}' in results:
+                difference = numpy.abs(results[name] - results[f'recorded/{name}'])
+                print(f'  {name:<30} max |replay - recorded| {difference.max():.4f}')
+
+
+if __name__ == '__main__':
+    main()
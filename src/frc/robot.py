@@ -4,49 +4,279 @@ if __name__ == '__main__':
     os.chdir('src')
     site.addsitedir(os.getcwd())
 
+import atexit
+import os
+from time import perf_counter_ns
 import warnings
 import commands2
 import wpilib
 import wpilib.drive
+from wpilib.simulation import BatterySim, RoboRioSim
 
+import frc.commands as commands
 import frc.constants as constants
 import frc.subsystems as subsystems
+from frc import dashboard, power, scheduling, telemetry, trajectories
 
+from lib.robotpy import configuration, gcpolicy, inputs, instrumentation, sampling, snapshot
+from lib.robotpy.dashboard import NetworkTablesSink
 from lib.robotpy.utils import isCompetition
 if not isCompetition():
     warnings.filterwarnings('error')
 
 
 class Robot(commands2.TimedCommandRobot):
+    def __init__(self, period: float = wpilib.TimedRobot.kDefaultPeriod) -> None:
+        super().__init__(period)
+        # The base constructor starts the loop's clock, which the timing wheel is phased to
+        self.mStartTime = wpilib.Timer.getFPGATimestamp()
+        self.mLoopStart = None
+
     def robotInit(self) -> None:
+        self.mGCPolicy = gcpolicy.GarbageCollectionPolicy(
+            constants.GarbageCollection.kEnabledThresholds,
+            constants.GarbageCollection.kDisabledCollectPeriod,
+            self.getPeriod(),
+        )
+
+        # Hardware is constructed here rather than on first use mid-match
+        subsystems.initializeAll()
+        self.configureMotors()
+        # Autonomous profiles come from the on-disk cache, never generated at autonomousInit
+        trajectories.precompute()
         self.container = RobotContainer()
+        scheduling.wheel.install(self, self.mStartTime)
+
+        self.profiler = None
+        if constants.Diagnostics.kLoopTiming:
+            self.profiler = instrumentation.LoopProfiler(self.getPeriod())
+            for cls in instrumentation.subclasses(commands2.Subsystem, 'frc.'):
+                self.profiler.instrumentClass(cls, ('periodic',))
+            for cls in instrumentation.subclasses(commands2.CommandBase, 'frc.'):
+                self.profiler.instrumentClass(cls, ('execute', 'isFinished'))
+            scheduling.wheel.instrument(self.profiler.timed)
+            atexit.register(lambda: print(self.profiler.summary()))
+
+        self.allocations = None
+        if constants.Diagnostics.kAllocations:
+            self.allocations = instrumentation.AllocationProfiler()
+            for cls in instrumentation.subclasses(commands2.Subsystem, 'frc.'):
+                self.allocations.instrumentClass(cls, ('periodic',))
+            for cls in instrumentation.subclasses(commands2.CommandBase, 'frc.'):
+                self.allocations.instrumentClass(cls, ('execute', 'isFinished'))
+            scheduling.wheel.instrument(self.allocations.tracked)
+            self.allocations.start()
+            atexit.register(lambda: print(self.allocations.summary()))
+
+        self.sampler = None
+        if constants.Diagnostics.kSampling:
+            self.sampler = sampling.SamplingProfiler(constants.Diagnostics.kSamplingInterval)
+            for cls in instrumentation.subclasses(commands2.Subsystem, 'frc.'):
+                self.sampler.instrumentClass(cls, ('periodic',))
+            for cls in instrumentation.subclasses(commands2.CommandBase, 'frc.'):
+                self.sampler.instrumentCommand(cls, ('execute', 'isFinished'))
+            scheduling.wheel.instrument(self.sampler.tagged)
+
+        self.mModeField = telemetry.recorder.add_field('robot/mode', 'b')
+        self.mLoopTimeField = telemetry.recorder.add_field('robot/loopTimeMs')
+        self.mTelemetry = telemetry.addFields('robot/gc', {
+            'enabledCollections': self.mGCPolicy.getEnabledCollections,
+            'maxEnabledPauseMs': self.mGCPolicy.getMaxEnabledPauseMs,
+        })
+        if self.allocations is not None:
+            self.mTelemetry += telemetry.addFields('robot/allocations', {
+                'loopBytes': self.allocations.getLoopBytes,
+                'loopBlocks': self.allocations.getLoopBlocks,
+            }, 'q')
+        running = telemetry.addCommandFields()
+        dashboard.addFields('commands', {
+            cls.__name__: (lambda cls=cls: running[cls] > 0)
+            for cls in running
+        }, '?')
+        dashboard.addFields('robot', {'mode': self.getMode})
+        # Publishes from its own thread; the loop only samples
+        dashboard.publisher.start(NetworkTablesSink(constants.Dashboard.kTableName))
+
+        logDirectory = constants.Telemetry.kLogDirectory
+        if self.isReal():
+            logDirectory = os.path.join('/home/lvuser', logDirectory)
+        os.makedirs(logDirectory, exist_ok=True)
+        logName = os.path.join(logDirectory, str(wpilib.RobotController.getFPGATime()))
+        telemetry.recorder.start(f'{logName}.rbtlog')
+        atexit.register(telemetry.recorder.close)
+
+        if self.sampler is not None:
+            self.mSamplesPath = f'{logName}.collapsed'
+            self.sampler.start()
+            atexit.register(self.exportSamples)
+
+        # Everything constructed so far lives for the whole match
+        self.mGCPolicy.freeze()
+
+    def exportSamples(self) -> None:
+        """Writes every stack sampled so far as a flamegraph's collapsed stacks"""
+        self.sampler.export(self.mSamplesPath)
+
+    def configureMotors(self) -> None:
+        """Writes only the motor parameters which changed since they were last applied"""
+        cachePath = constants.Configuration.kCachePath
+        if self.isReal():
+            cachePath = os.path.join('/home/lvuser', cachePath)
+        stage = configuration.ConfigurationStage(
+            cachePath,
+            configuration.talonFXParameters(),
+            constants.Configuration.kTimeoutMs,
+            constants.Configuration.kRetries,
+            constants.Configuration.kWorkers,
+        )
+
+        motors = {}
+        for subsystem in (subsystems.drivetrain, subsystems.elevator):
+            motors.update(subsystem.getMotorConfiguration())
+
+        for deviceID, results in stage.apply(motors).items():
+            failed = [name for name, succeeded in results.items() if not succeeded]
+            if failed:
+                wpilib.reportWarning(f'Motor {deviceID} failed to configure {", ".join(failed)}')
+
+    def beginLoop(self) -> None:
+        """
+        Starts timing this loop; the first thing every loop runs is the mode's
+        init or periodic, each of which calls this before robotPeriodic ends the loop
+        """
+        if self.mLoopStart is not None:
+            return
+        self.mLoopStart = perf_counter_ns()
+        # Sensors are re-read by their first reader in this loop
+        snapshot.invalidateAll()
+        if self.profiler is not None:
+            self.profiler.beginLoop()
+        if self.allocations is not None:
+            self.allocations.beginLoop()
+
+    def robotPeriodic(self) -> None:
+        self.beginLoop()
+
+        # Joysticks are read once, before any command or trigger polls them
+        self.container.inputs.refresh()
+        super().robotPeriodic()
+        self.container.robotPeriodic()
+        # Scales the outputs commanded this loop from next loop on
+        power.arbiter.update()
+        # Reads this loop's cached sensor values
+        dashboard.publisher.sample()
+
+        if self.allocations is not None:
+            self.allocations.endLoop()
+        if self.profiler is not None:
+            self.profiler.endLoop()
+
+        telemetry.sample(self.mTelemetry)
+        recorder = telemetry.recorder
+        recorder.set(self.mModeField, self.getMode())
+        recorder.set(self.mLoopTimeField, (perf_counter_ns() - self.mLoopStart) / 1e6)
+        recorder.commit(wpilib.RobotController.getFPGATime() * 1000)
+        self.mLoopStart = None
+
+    def simulationPeriodic(self) -> None:
+        # The simulated battery sags with the arbiter's predicted draw
+        RoboRioSim.setVInVoltage(BatterySim.calculate([power.arbiter.getPredictedCurrent()]))
+
+    def getMode(self) -> int:
+        """0 when disabled, then 1, 2 and 3 for autonomous, teleop and test"""
+        if self.isDisabled():
+            return 0
+        if self.isAutonomous():
+            return 1
+        if self.isTest():
+            return 3
+        return 2
+
+    def disabledInit(self) -> None:
+        self.beginLoop()
+        self.mGCPolicy.onDisabled()
+        if self.sampler is not None:
+            # The robot is usually powered off rather than exited after a match
+            self.exportSamples()
+
+    def disabledPeriodic(self) -> None:
+        self.beginLoop()
+        self.mGCPolicy.disabledPeriodic()
 
     def autonomousInit(self) -> None:
+        self.beginLoop()
+        self.mGCPolicy.onEnabled()
         self.autonomousCommand = self.container.getAutonomousCommand()
+        if self.autonomousCommand is not None:
+            self.autonomousCommand.schedule()
+
+    def autonomousPeriodic(self) -> None:
+        self.beginLoop()
     
     def teleopInit(self) -> None:
-        self.autonomousCommand.cancel()
+        self.beginLoop()
+        self.mGCPolicy.onEnabled()
+        if getattr(self, 'autonomousCommand', None) is not None:
+            self.autonomousCommand.cancel()
 
     def teleopPeriodic(self) -> None:
+        self.beginLoop()
         self.container.teleopPeriodic()
     
-    def testInit():
+    def testInit(self):
+        self.beginLoop()
+        self.mGCPolicy.onEnabled()
         commands2.CommandScheduler.getInstance().cancelAll()
 
+    def testPeriodic(self) -> None:
+        self.beginLoop()
+
 
 class RobotContainer():
     def __init__(self):
         self.driver = wpilib.Joystick(constants.Interface.kDriverControllerPort)
         self.manip = wpilib.Joystick(constants.Interface.kManipControllerPort)
 
-        self.drivetrain = subsystems.Drivetrain()
+        driverStation = wpilib.DriverStation.getInstance()
+        # Commands and triggers read the joysticks through this, never the HAL directly
+        self.inputs = inputs.InputSnapshot(
+            driverStation,
+            (self.driver.getPort(), self.manip.getPort()),
+            constants.Interface.kAxisCount,
+        )
+
+        self.drivetrain = subsystems.drivetrain
+        self.elevator = subsystems.elevator
+        # Stick forward is negative
+        self.drivetrain.setDefaultCommand(commands.drivetrain.default(
+            self.inputs.axis(self.driver.getPort(), constants.Interface.kLeftDriveAxis, -1),
+            self.inputs.axis(self.driver.getPort(), constants.Interface.kRightDriveAxis, -1),
+        ))
+
+        self.autonomousCommand = commands.AutonomousCommand(self.drivetrain)
+
+        self.mTelemetry = []
+        for name, joystick in (('driver', self.driver), ('manip', self.manip)):
+            port = joystick.getPort()
+            self.mTelemetry += telemetry.addFields(f'interface/{name}', {
+                f'axis{axis}': self.inputs.axis(port, axis)
+                for axis in range(constants.Interface.kAxisCount)
+            })
+            self.mTelemetry += telemetry.addFields(
+                f'interface/{name}',
+                {'buttons': lambda port=port: self.inputs.getButtons(port)},
+                'q',
+            )
 
     def getAutonomousCommand(self) -> commands2.Command:
-        pass
+        return self.autonomousCommand
 
     def teleopPeriodic(self) -> None:
         pass
 
+    def robotPeriodic(self) -> None:
+        telemetry.sample(self.mTelemetry)
+
 
 if __name__ == '__main__':
     # wpilib.run(Robot)
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+import frc.constants as constants
+from lib.robotpy.scheduling import TimingWheel
+
+
+# Subsystems add their jobs when constructed; Robot installs the wheel in robotInit
+wheel = TimingWheel(constants.Scheduling.kTickPeriod)
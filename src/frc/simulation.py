@@ -0,0 +1,184 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    # Script paths are relative to the caller, so src is added without changing directory
+    import os
+    import site
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import argparse
+import bisect
+import json
+import random
+import threading
+from time import perf_counter
+from typing import Callable, Optional, Sequence
+
+import hal
+import wpilib
+from wpilib.simulation import DriverStationSim
+
+
+# (axes, buttons bitmask) for each joystick port
+JoystickState = dict[int, tuple[Sequence[float], int]]
+
+
+class JoystickScript:
+    """
+    Joystick input as keyframes of (match time, port, axes, buttons);
+    each port holds its last keyframe's values until its next one
+    """
+
+    def __init__(self, keyframes: Sequence[tuple[float, int, Sequence[float], int]]) -> None:
+        self.mPorts: dict[int, tuple[list[float], list[tuple[Sequence[float], int]]]] = {}
+        for time, port, axes, buttons in sorted(keyframes, key=lambda keyframe: keyframe[0]):
+            times, states = self.mPorts.setdefault(port, ([], []))
+            times.append(time)
+            states.append((tuple(axes), int(buttons)))
+
+    @classmethod
+    def load(cls, path: str) -> JoystickScript:
+        """
+        Reads a JSON list of {"t": seconds, "port": int, "axes": [...], "buttons": int} keyframes
+        """
+        with open(path) as file:
+            keyframes = json.load(file)
+        return cls([
+            (keyframe['t'], keyframe['port'], keyframe.get('axes', ()), keyframe.get('buttons', 0))
+            for keyframe in keyframes
+        ])
+
+    def __call__(self, matchTime: float) -> JoystickState:
+        state = {}
+        for port, (times, states) in self.mPorts.items():
+            i = bisect.bisect_right(times, matchTime) - 1
+            if i >= 0:
+                state[port] = states[i]
+        return state
+
+
+class HeadlessSimulation:
+    """
+    Runs a robot on the simulated clock, as fast as the CPU allows
+
+    The HAL's timing is paused and stepped one robot period at a time,
+    waiting for every notifier (so every robot loop) to finish before the next step,
+    which makes runs repeatable for a given seed and input script.
+
+    The match is disabled for kDisabledLength seconds,
+    then autonomous for kAutonomousLength and teleop for kTeleopLength;
+    match time counts from the start of autonomous.
+    """
+    kDisabledLength = 0.5
+    kAutonomousLength = 15.
+    kTeleopLength = 135.
+
+    def __init__(
+            self,
+            robotClass: type,
+            seed: int = 0,
+            script: Optional[Callable[[float], JoystickState]] = None,
+            period: float = 0.02,
+            onStep: Optional[Callable[[wpilib.RobotBase, float], None]] = None,
+            ) -> None:
+        self.mRobotClass = robotClass
+        self.mSeed = seed
+        self.mScript = script
+        self.mPeriod = period
+        self.mOnStep = onStep
+        self.mRobot = None
+
+    def _seed(self) -> None:
+        random.seed(self.mSeed)
+        try:
+            import numpy
+        except ImportError:
+            pass
+        else:
+            numpy.random.seed(self.mSeed)
+
+    def _setMode(self, matchTime: float) -> None:
+        enabled = 0 <= matchTime < self.kAutonomousLength + self.kTeleopLength
+        autonomous = 0 <= matchTime < self.kAutonomousLength
+        DriverStationSim.setEnabled(enabled)
+        DriverStationSim.setAutonomous(autonomous)
+        if autonomous:
+            DriverStationSim.setMatchTime(self.kAutonomousLength - matchTime)
+        elif enabled:
+            DriverStationSim.setMatchTime(self.kAutonomousLength + self.kTeleopLength - matchTime)
+
+    def _setJoysticks(self, matchTime: float) -> None:
+        for port, (axes, buttons) in self.mScript(matchTime).items():
+            DriverStationSim.setJoystickAxisCount(port, len(axes))
+            for axis, value in enumerate(axes):
+                DriverStationSim.setJoystickAxis(port, axis, value)
+            DriverStationSim.setJoystickButtons(port, buttons)
+
+    def run(self, until: float = kAutonomousLength + kTeleopLength) -> wpilib.RobotBase:
+        """
+        Runs the match up to the given match time (seconds since autonomous started),
+        returning the robot
+        """
+        self._seed()
+        hal.initialize(500, 0)
+        wpilib.simulation.pauseTiming()
+
+        initialized = threading.Event()
+
+        class HeadlessRobot(self.mRobotClass):
+            def robotInit(self) -> None:
+                super().robotInit()
+                initialized.set()
+
+        robot = self.mRobot = HeadlessRobot()
+        thread = threading.Thread(target=robot.startCompetition, name='HeadlessRobot', daemon=True)
+        thread.start()
+        initialized.wait()
+
+        DriverStationSim.setDsAttached(True)
+        matchTime = -self.kDisabledLength
+        try:
+            while matchTime < until:
+                self._setMode(matchTime)
+                if self.mScript is not None:
+                    self._setJoysticks(matchTime)
+                DriverStationSim.notifyNewData()
+
+                wpilib.simulation.stepTiming(self.mPeriod)
+                matchTime += self.mPeriod
+
+                if self.mOnStep is not None:
+                    self.mOnStep(robot, matchTime)
+        finally:
+            DriverStationSim.setEnabled(False)
+            DriverStationSim.notifyNewData()
+            robot.endCompetition()
+            wpilib.simulation.stepTiming(self.mPeriod)
+            thread.join(timeout=1)
+            wpilib.simulation.resumeTiming()
+
+        return robot
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Run the robot headless on a simulated clock')
+    parser.add_argument('--until', type=float, default=HeadlessSimulation.kAutonomousLength + HeadlessSimulation.kTeleopLength,
+                        help='match time to stop at, in seconds from the start of autonomous')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--script', help='JSON joystick keyframes (see JoystickScript.load)')
+    args = parser.parse_args(argv)
+
+    from frc.robot import Robot
+
+    script = JoystickScript.load(args.script) if args.script else None
+    simulation = HeadlessSimulation(Robot, seed=args.seed, script=script)
+
+    start = perf_counter()
+    simulation.run(args.until)
+    elapsed = perf_counter() - start
+
+    simulated = args.until + HeadlessSimulation.kDisabledLength
+    print(f'Simulated {simulated:.1f} s in {elapsed:.2f} s ({simulated / elapsed:.0f}x realtime)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,44 @@
-# TODO: Replace this with subsystems import and such
-from frc.subsystems._drivetrain import Drivetrain
-from frc.subsystems._elevator import Elevator
+"""
+Subsystems are constructed lazily, on first access,
+so importing frc.subsystems doesn't create any hardware:
 
-drivetrain = Drivetrain()
-elevator = Elevator()
+frc.subsystems.Drivetrain imports the class,
+frc.subsystems.drivetrain returns its (singleton) instance
+"""
+import importlib
+
+_classModules = {
+    'Drivetrain': 'frc.subsystems._drivetrain',
+    'Elevator': 'frc.subsystems._elevator',
+    'MotorHealth': 'frc.subsystems._motorhealth',
+}
+_instanceClasses = {
+    'drivetrain': 'Drivetrain',
+    'elevator': 'Elevator',
+    # Watches the motors of the subsystems above, so constructed after them
+    'motorHealth': 'MotorHealth',
+}
 
 __all__ = [
-    drivetrain,
-    elevator,
-]
\ No newline at end of file
+    *_classModules,
+    *_instanceClasses,
+]
+
+
+def __getattr__(name: str):
+    if name in _classModules:
+        return getattr(importlib.import_module(_classModules[name]), name)
+    if name in _instanceClasses:
+        # getInstance is thread-safe and only ever constructs once
+        return __getattr__(_instanceClasses[name]).getInstance()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> list:
+    return sorted([*globals(), *__all__])
+
+
+def initializeAll() -> None:
+    """Constructs every subsystem, e.g. in robotInit rather than mid-match"""
+    for name in _instanceClasses:
+        __getattr__(name)
@@ -1,47 +1,185 @@
 from __future__ import annotations
 
-from types import SimpleNamespace
+import math
 
-import commands2
 import ctre
-from ctre import TalonFXSensorCollection
 import wpilib
 import wpilib.controller
 import wpilib.drive
 
 import frc.constants as constants
-from lib.python.utils import avg
-from lib.robotpy.ctre import WPI_TalonFXCollection, getTalonEncoders
+from frc import dashboard, power, scheduling, telemetry
+from lib.robotpy.ctre import WPI_TalonFXCollection
+from lib.robotpy import snapshot
+from lib.robotpy.odometry import DifferentialOdometry, Pose
+from lib.robotpy.snapshot import SensorSnapshot
+from lib.robotpy.utils import SingletonSubsystem
 
 
-class Drivetrain(commands2.Subsystem):
+class Drivetrain(SingletonSubsystem):
     def __init__(self):
         super().__init__()
 
-        self.mLeftMotors = WPI_TalonFXCollection(constants.Drivetrain.kLeftMotorIDs)
-        self.mRightMotors = WPI_TalonFXCollection(constants.Drivetrain.kRightMotorIDs)
+        self.mLeftMotors = WPI_TalonFXCollection(*constants.Drivetrain.kLeftMotorIDs)
+        self.mRightMotors = WPI_TalonFXCollection(*constants.Drivetrain.kRightMotorIDs)
 
         self.mDrive = wpilib.drive.DifferentialDrive(
             self.mLeftMotors,
             self.mRightMotors,
         )
 
-    def arcadeDrive(self, forward: float, turning: float) -> None:
-        self.mDrive.arcadeDrive(forward, turning)
+        self.mLeftSensors = [motor.getSensorCollection() for motor in self.mLeftMotors.mMotorList]
+        self.mRightSensors = [motor.getSensorCollection() for motor in self.mRightMotors.mMotorList]
+
+        # Every encoder is read at most once per robot loop
+        self.mSensors = SensorSnapshot({
+            'leftPosition': [sensor.getIntegratedSensorPosition for sensor in self.mLeftSensors],
+            'rightPosition': [sensor.getIntegratedSensorPosition for sensor in self.mRightSensors],
+            'leftVelocity': [sensor.getIntegratedSensorVelocity for sensor in self.mLeftSensors],
+            'rightVelocity': [sensor.getIntegratedSensorVelocity for sensor in self.mRightSensors],
+        })
+
+        # The odometry thread reads the encoders itself, bypassing the per-loop snapshot
+        metersPerCount = self.mMetersPerCount = math.pi * constants.Drivetrain.kWheelDiameter / (
+            constants.Drivetrain.kEncoderResolution * constants.Drivetrain.kGearRatio)
+        leftPosition = [sensor.getIntegratedSensorPosition for sensor in self.mLeftSensors]
+        rightPosition = [sensor.getIntegratedSensorPosition for sensor in self.mRightSensors]
+        self.mOdometry = DifferentialOdometry(
+            lambda: sum(getter() for getter in leftPosition) / len(leftPosition) * metersPerCount,
+            lambda: sum(getter() for getter in rightPosition) / len(rightPosition) * metersPerCount,
+            constants.Drivetrain.kTrackWidth,
+            round(constants.Drivetrain.kPoseHistoryLength / constants.Drivetrain.kOdometryPeriod),
+        )
+        self.mOdometry.start(constants.Drivetrain.kOdometryPeriod)
+        self.mLoopPose = self.getPose()
+        self.mLoopPoseTick = None
+
+        self.mTelemetry = telemetry.addFields('drivetrain', {
+            'x': lambda: self.getLoopPose().x,
+            'y': lambda: self.getLoopPose().y,
+            'heading': lambda: self.getLoopPose().heading,
+            'leftPosition': self.getLeftEncoderPosition,
+            'rightPosition': self.getRightEncoderPosition,
+            'leftVelocity': self.getLeftEncoderVelocity,
+            'rightVelocity': self.getRightEncoderVelocity,
+            'leftOutput': self.mLeftMotors.get,
+            'rightOutput': self.mRightMotors.get,
+            **{
+                f'left{i}/statorCurrent': motor.getStatorCurrent
+                for i, motor in enumerate(self.mLeftMotors.mMotorList)
+            },
+            **{
+                f'right{i}/statorCurrent': motor.getStatorCurrent
+                for i, motor in enumerate(self.mRightMotors.mMotorList)
+            },
+        })
+        scheduling.wheel.add(self.telemetryPeriodic, constants.Drivetrain.kTelemetryPeriod)
+
+        dashboard.addFields('drivetrain', {
+            'x': lambda: self.getLoopPose().x,
+            'y': lambda: self.getLoopPose().y,
+            'heading': lambda: self.getLoopPose().heading,
+        }, threshold=constants.Dashboard.kPoseThreshold)
+        dashboard.addFields('drivetrain', {
+            'leftVelocity': self.getLeftEncoderVelocity,
+            'rightVelocity': self.getRightEncoderVelocity,
+        }, threshold=constants.Dashboard.kEncoderThreshold)
+        dashboard.addFields('drivetrain', {
+            'leftOutput': self.mLeftMotors.get,
+            'rightOutput': self.mRightMotors.get,
+        }, threshold=constants.Dashboard.kOutputThreshold)
+
+        # Both sides share a priority, so they are always scaled alike
+        currentLimit = power.supplyCurrentLimit(constants.Drivetrain.kMotorConfig)
+        self.mLeftGroup = power.arbiter.register(
+            'drivetrain/left', constants.Power.kDrivetrainPriority, len(self.mLeftSensors), currentLimit)
+        self.mRightGroup = power.arbiter.register(
+            'drivetrain/right', constants.Power.kDrivetrainPriority, len(self.mRightSensors), currentLimit)
+
+    def telemetryPeriodic(self) -> None:
+        telemetry.sample(self.mTelemetry)
+
+    def getMotorConfiguration(self) -> dict[int, tuple[ctre.WPI_TalonFX, dict]]:
+        """{deviceID: (motor, {parameter: value})}, applied by the robot's ConfigurationStage"""
+        config = dict(constants.Drivetrain.kMotorConfig.items())
+        return {
+            motor.getDeviceID(): (motor, config)
+            for motor in self.mLeftMotors.mMotorList + self.mRightMotors.mMotorList
+        }
+
+    def arcadeDrive(self, forward: float, turning: float, squareInputs: bool=True) -> None:
+        if squareInputs:
+            forward = math.copysign(forward * forward, forward)
+            turning = math.copysign(turning * turning, turning)
+        arbiter = power.arbiter
+        arbiter.request(self.mLeftGroup, max(-1., min(forward + turning, 1.)), self.getLeftSpeedFraction())
+        arbiter.request(self.mRightGroup, max(-1., min(forward - turning, 1.)), self.getRightSpeedFraction())
+        scale = min(arbiter.getScale(self.mLeftGroup), arbiter.getScale(self.mRightGroup))
+        self.mDrive.arcadeDrive(forward * scale, turning * scale, False)
     
     def tankDrive(self, leftSpeed: float, rightSpeed: float, squareInputs: bool=True) -> None:
-        self.mDrive.tankDrive(leftSpeed, rightSpeed, squareInputs)
+        if squareInputs:
+            leftSpeed = math.copysign(leftSpeed * leftSpeed, leftSpeed)
+            rightSpeed = math.copysign(rightSpeed * rightSpeed, rightSpeed)
+        arbiter = power.arbiter
+        arbiter.request(self.mLeftGroup, leftSpeed, self.getLeftSpeedFraction())
+        arbiter.request(self.mRightGroup, rightSpeed, self.getRightSpeedFraction())
+        self.mDrive.tankDrive(
+            leftSpeed * arbiter.getScale(self.mLeftGroup),
+            rightSpeed * arbiter.getScale(self.mRightGroup),
+            False,
+        )
+
+    def getLeftSpeedFraction(self) -> float:
+        return self.getLeftEncoderVelocity() / constants.Power.kFreeSpeedCounts
+
+    def getRightSpeedFraction(self) -> float:
+        return self.getRightEncoderVelocity() / constants.Power.kFreeSpeedCounts
     
     def resetEncoders(self):
-        for motor in self.mMotors.leftList + self.mMotors.rightList:
-            motor.getSensorCollection().setQuadraturePosition(0, 0)
+        """
+        Zeroes the encoder positions in software, from the odometry's next update (within
+        kOdometryPeriod); the motors are never zeroed, so the pose never sees a jump
+        """
+        self.mOdometry.resetEncoders()
+
+    def resetPose(self, x: float = 0., y: float = 0., heading: float = 0.) -> None:
+        self.mOdometry.resetPose(x, y, heading)
+
+    def getPose(self) -> Pose:
+        """Latest (timestamp, x, y, heading) from the odometry thread, in s, m and radians"""
+        return self.mOdometry.getPose()
+
+    def getLoopPose(self) -> Pose:
+        """
+        getPose, read once per robot loop, so that fields sampled together
+        (x, y and heading) all come from the same pose
+        """
+        tick = snapshot.getTick()
+        if tick != self.mLoopPoseTick:
+            self.mLoopPose = self.getPose()
+            self.mLoopPoseTick = tick
+        return self.mLoopPose
+
+    def getPoseAt(self, timestamp: float) -> Pose:
+        """Pose interpolated at an FPGA timestamp from the last kPoseHistoryLength seconds"""
+        return self.mOdometry.getPoseAt(timestamp)
     
     def getLeftEncoderPosition(self) -> float:
-        self.mLeftMotors.getSelectedSensorPosition()
-        return avg(map(TalonFXSensorCollection.getIntegratedSensorPosition, getTalonEncoders(self.mMotors.left)))
+        return self.mSensors.mean('leftPosition') - self.mOdometry.getEncoderOffsets()[0] / self.mMetersPerCount
         
     def getRightEncoderPosition(self) -> float:
-        return avg(map(TalonFXSensorCollection.getIntegratedSensorPosition, getTalonEncoders(self.mMotors.right)))
+        return self.mSensors.mean('rightPosition') - self.mOdometry.getEncoderOffsets()[1] / self.mMetersPerCount
     
     def getAverageEncoderPosition(self) -> float:
-        return (self.getLeftEncoderPosition() + self.getRightEncoderPosition()) / 2
\ No newline at end of file
+        return (self.getLeftEncoderPosition() + self.getRightEncoderPosition()) / 2
+
+    def getAverageDistance(self) -> float:
+        """Average wheel distance in meters since the encoders were reset"""
+        return self.getAverageEncoderPosition() * self.mMetersPerCount
+
+    def getLeftEncoderVelocity(self) -> float:
+        return self.mSensors.mean('leftVelocity')
+
+    def getRightEncoderVelocity(self) -> float:
+        return self.mSensors.mean('rightVelocity')
@@ -1,19 +1,104 @@
 from __future__ import annotations
 
+import math
+
 import commands2
 import ctre
 import wpilib
 import wpilib.controller
-import wpilib.drive
 
 import frc.constants as constants
+from frc import dashboard, power, scheduling, telemetry
+from lib.robotpy.ctre import WPI_TalonFXCollection
+from lib.robotpy.snapshot import SensorSnapshot
+from lib.robotpy.utils import SingletonSubsystemType
 
 
-class Elevator(commands2.PIDSubsystem):
+class Elevator(commands2.PIDSubsystem, metaclass=SingletonSubsystemType):
 
     def __init__(self):
-        super().__init__(wpilib.controller.PIDController(**constants.Elevator.kPIDConstants))
-        self.mMotorList = [ctre.WPI_TalonFX(ID) for ID in constants.Elevator.kMotorIDs]
-        self.mMotors = wpilib.SpeedControllerGroup(
-            *self.mMotorList
-        )
\ No newline at end of file
+        super().__init__(wpilib.controller.PIDController(
+            **constants.Elevator.kPIDConstants,
+            period=constants.Elevator.kControlPeriod,
+        ))
+        self.mMotors = WPI_TalonFXCollection(*constants.Elevator.kMotorIDs)
+        self.mMotorList = self.mMotors.mMotorList
+
+        self.mSensorList = [motor.getSensorCollection() for motor in self.mMotorList]
+        self.mMetersPerCount = 2 * math.pi * constants.Elevator.kDrumRadius / (
+            constants.Elevator.kEncoderResolution * constants.Elevator.kGearRatio)
+
+        # Every encoder is read at most once per robot loop
+        self.mSensors = SensorSnapshot({
+            'position': [sensor.getIntegratedSensorPosition for sensor in self.mSensorList],
+            'velocity': [sensor.getIntegratedSensorVelocity for sensor in self.mSensorList],
+        })
+
+        self.mTelemetry = telemetry.addFields('elevator', {
+            'position': self.getEncoderPosition,
+            'velocity': self.getEncoderVelocity,
+            'height': self.getHeight,
+            'setpoint': self.getSetpoint,
+            'output': self.mMotors.get,
+            **{
+                f'motor{i}/statorCurrent': motor.getStatorCurrent
+                for i, motor in enumerate(self.mMotorList)
+            },
+        })
+
+        # Control and telemetry run on the timing wheel rather than the 20 ms loop
+        scheduling.wheel.add(self.controlPeriodic, constants.Elevator.kControlPeriod)
+        scheduling.wheel.add(self.telemetryPeriodic, constants.Elevator.kTelemetryPeriod)
+
+        dashboard.addFields('elevator', {
+            'position': self.getEncoderPosition,
+            'velocity': self.getEncoderVelocity,
+        }, threshold=constants.Dashboard.kEncoderThreshold)
+        dashboard.addFields('elevator', {
+            'height': self.getHeight,
+            'setpoint': self.getSetpoint,
+        }, threshold=constants.Dashboard.kPoseThreshold)
+        dashboard.addFields('elevator', {
+            'output': self.mMotors.get,
+        }, threshold=constants.Dashboard.kOutputThreshold)
+
+        self.mPowerGroup = power.arbiter.register(
+            'elevator',
+            constants.Power.kElevatorPriority,
+            len(self.mMotorList),
+            power.supplyCurrentLimit(constants.Elevator.kMotorConfig),
+        )
+
+    def periodic(self) -> None:
+        pass
+
+    def controlPeriodic(self) -> None:
+        # Measured fresh every control tick, not once per robot loop
+        self.mSensors.invalidate()
+        super().periodic()
+
+    def telemetryPeriodic(self) -> None:
+        telemetry.sample(self.mTelemetry)
+
+    def getMotorConfiguration(self) -> dict[int, tuple[ctre.WPI_TalonFX, dict]]:
+        """{deviceID: (motor, {parameter: value})}, applied by the robot's ConfigurationStage"""
+        config = dict(constants.Elevator.kMotorConfig.items())
+        return {motor.getDeviceID(): (motor, config) for motor in self.mMotorList}
+
+    def getEncoderPosition(self) -> float:
+        return self.mSensors.mean('position')
+
+    def getEncoderVelocity(self) -> float:
+        return self.mSensors.mean('velocity')
+
+    def getHeight(self) -> float:
+        """Carriage height in m"""
+        return self.getEncoderPosition() * self.mMetersPerCount
+
+    def getMeasurement(self) -> float:
+        # In m, so gains from frc.tuning apply directly
+        return self.getHeight()
+
+    def useOutput(self, output: float, setpoint: float) -> None:
+        power.arbiter.request(self.mPowerGroup, output, self.getEncoderVelocity() / constants.Power.kFreeSpeedCounts)
+        self.mMotors.set(output * power.arbiter.getScale(self.mPowerGroup))
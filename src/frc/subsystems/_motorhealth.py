@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import numpy
+import wpilib
+
+import frc.constants as constants
+import frc.subsystems as subsystems
+from frc import scheduling, telemetry
+from lib.python.rolling import RollingWindow
+from lib.robotpy.utils import SingletonSubsystem
+
+
+class MotorHealth(SingletonSubsystem):
+    """
+    Watches every drivetrain and elevator motor for stalls, overheating
+    and drawing much more current than the rest of its group
+
+    Motors are sampled every kSamplePeriod on the timing wheel, not in the robot loop;
+    faults are reported to the driver station as they appear and recorded in telemetry.
+    """
+    kQuantities = ('statorCurrent', 'supplyCurrent', 'temperature', 'velocity')
+
+    def __init__(self):
+        super().__init__()
+
+        drivetrain = subsystems.drivetrain
+        self.mGroups = {
+            'drivetrain/left': drivetrain.mLeftMotors.mMotorList,
+            'drivetrain/right': drivetrain.mRightMotors.mMotorList,
+            'elevator': subsystems.elevator.mMotorList,
+        }
+        self.mMotors = []
+        self.mNames = []
+        # Index of each motor's group mates (not itself)
+        self.mMateIndices = []
+        for group, motors in self.mGroups.items():
+            start = len(self.mMotors)
+            self.mMotors += motors
+            self.mNames += [f'{group}{i}' for i in range(len(motors))]
+            indices = numpy.arange(start, start + len(motors))
+            self.mMateIndices += [indices[indices != i] for i in indices]
+
+        count = len(self.mMotors)
+        self.mGetters = [
+            (
+                motor.getStatorCurrent,
+                motor.getSupplyCurrent,
+                motor.getTemperature,
+                motor.getSensorCollection().getIntegratedSensorVelocity,
+            )
+            for motor in self.mMotors
+        ]
+        self.mSample = numpy.zeros((len(self.kQuantities), count))
+        self.mWindows = {
+            name: RollingWindow(count, constants.Health.kWindow, constants.Health.kAlpha)
+            for name in self.kQuantities
+        }
+
+        self.mStalled = numpy.zeros(count, bool)
+        self.mOverCurrent = numpy.zeros(count, bool)
+        self.mOverTemperature = numpy.zeros(count, bool)
+
+        self.mTelemetry = telemetry.addFields('health', {
+            **{
+                f'{name}/statorCurrentEwma': (lambda i=i: self.mWindows['statorCurrent'].ewma[i])
+                for i, name in enumerate(self.mNames)
+            },
+            **{
+                f'{name}/temperature': (lambda i=i: self.mWindows['temperature'].last()[i])
+                for i, name in enumerate(self.mNames)
+            },
+        })
+        self.mFaultField = telemetry.recorder.add_field('health/faults', 'Q')
+
+        scheduling.wheel.add(self.samplePeriodic, constants.Health.kSamplePeriod)
+
+    def samplePeriodic(self) -> None:
+        sample = self.mSample
+        for i, getters in enumerate(self.mGetters):
+            for quantity, getter in enumerate(getters):
+                sample[quantity, i] = getter()
+        for quantity, name in enumerate(self.kQuantities):
+            self.mWindows[name].push(sample[quantity])
+
+        self.check()
+        telemetry.sample(self.mTelemetry)
+        telemetry.recorder.set(self.mFaultField, self.getFaultMask())
+
+    def check(self) -> None:
+        """Updates the fault flags from the windows, reporting any new faults"""
+        current = self.mWindows['statorCurrent']
+        if current.filled() < constants.Health.kMinSamples:
+            return
+
+        meanCurrent = current.mean()
+        meanSpeed = numpy.abs(self.mWindows['velocity'].mean())
+        stalled = (meanCurrent > constants.Health.kStallCurrent) & (meanSpeed < constants.Health.kStallVelocity)
+
+        # Compared with the median of the rest of the group, which the motor itself can't pull up;
+        # a motor alone in its group has nothing to be compared with
+        ewma = current.ewma
+        mateMedian = numpy.array([
+            numpy.median(ewma[indices]) if len(indices) else numpy.inf
+            for indices in self.mMateIndices
+        ])
+        overCurrent = ewma > mateMedian * constants.Health.kOutlierRatio + constants.Health.kOutlierMargin
+
+        overTemperature = self.mWindows['temperature'].max() > constants.Health.kMaxTemperature
+
+        for flags, previous, fault in (
+                (stalled, self.mStalled, 'stalled'),
+                (overCurrent, self.mOverCurrent, 'drawing more current than its group'),
+                (overTemperature, self.mOverTemperature, 'over temperature'),
+                ):
+            for i in numpy.flatnonzero(flags & ~previous):
+                wpilib.reportWarning(f'{self.mNames[i]} (CAN {self.mMotors[i].getDeviceID()}) {fault}')
+            previous[:] = flags
+
+    def getFaultMask(self) -> int:
+        """Bits 3i, 3i + 1 and 3i + 2: motor i stalled, over current, over temperature"""
+        mask = 0
+        for i in range(len(self.mMotors)):
+            mask |= (
+                int(self.mStalled[i])
+                | int(self.mOverCurrent[i]) << 1
+                | int(self.mOverTemperature[i]) << 2
+            ) << 3 * i
+        return mask
+
+    def getFaults(self) -> dict[str, list[str]]:
+        """Faulted motors by name, with their current faults"""
+        faults = {}
+        for i, name in enumerate(self.mNames):
+            motorFaults = [
+                fault
+                for flags, fault in (
+                    (self.mStalled, 'stalled'),
+                    (self.mOverCurrent, 'overCurrent'),
+                    (self.mOverTemperature, 'overTemperature'),
+                )
+                if flags[i]
+            ]
+            if motorFaults:
+                faults[name] = motorFaults
+        return faults
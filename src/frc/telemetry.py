@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import commands2
+
+import frc.constants as constants
+from lib.python.telemetry import TelemetryRecorder
+from lib.robotpy.instrumentation import subclasses
+
+
+# Fields must all be added before the robot starts the recorder in robotInit
+recorder = TelemetryRecorder(constants.Telemetry.kBlockRows)
+
+
+def addFields(
+        prefix: str,
+        getters: dict[str, Callable[[], float]],
+        typecode: str = 'd',
+        ) -> list[tuple[int, Callable[[], float]]]:
+    return [
+        (recorder.add_field(f'{prefix}/{name}', typecode), getter)
+        for name, getter in getters.items()
+    ]
+
+
+def sample(fields: list[tuple[int, Callable[[], float]]]) -> None:
+    set_ = recorder.set
+    for field, getter in fields:
+        set_(field, getter())
+
+
+def addCommandFields() -> dict[type, int]:
+    """
+    Records how many instances of each frc command are scheduled,
+    kept up to date by CommandScheduler hooks; returns the live counts by class
+    """
+    fields = {
+        cls: recorder.add_field(f'commands/{cls.__name__}', 'b')
+        for cls in subclasses(commands2.CommandBase, 'frc.')
+    }
+    running = dict.fromkeys(fields, 0)
+
+    def update(command: commands2.Command, change: int) -> None:
+        cls = type(command)
+        if cls in fields:
+            running[cls] += change
+            recorder.set(fields[cls], running[cls])
+
+    scheduler = commands2.CommandScheduler.getInstance()
+    scheduler.onCommandInitialize(lambda command: update(command, 1))
+    scheduler.onCommandFinish(lambda command: update(command, -1))
+    scheduler.onCommandInterrupt(lambda command: update(command, -1))
+    return running
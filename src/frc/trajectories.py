@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+
+import numpy
+import wpilib
+
+import frc.constants as constants
+from lib.python.profiles import ProfileCache, SampledProfile, trapezoid
+
+
+_cache = None
+
+
+def getCache() -> ProfileCache:
+    """Profiles are regenerated whenever the drivetrain or autonomous constants change"""
+    global _cache
+    if _cache is None:
+        directory = constants.Autonomous.kCacheDirectory
+        if wpilib.RobotBase.isReal():
+            directory = os.path.join('/home/lvuser', directory)
+        _cache = ProfileCache(
+            directory,
+            constants.Drivetrain.contentHash() + constants.Autonomous.contentHash(),
+        )
+    return _cache
+
+
+def forwardProfile(distance: float) -> SampledProfile:
+    """Columns position, velocity and acceleration (m, m/s, m/s^2)"""
+    return getCache().get(
+        'trapezoid',
+        trapezoid,
+        constants.Autonomous.kSampleInterval,
+        distance=float(distance),
+        max_velocity=constants.Autonomous.kMaxVelocity,
+        max_acceleration=constants.Autonomous.kMaxAcceleration,
+    )
+
+
+def _generateTrajectory(
+        dt: float,
+        start: tuple[float, float, float],
+        interior: tuple[tuple[float, float], ...],
+        end: tuple[float, float, float],
+        ) -> dict[str, numpy.ndarray]:
+    from wpimath.geometry import Pose2d, Rotation2d, Translation2d
+    from wpimath.kinematics import DifferentialDriveKinematics
+    from wpimath.trajectory import TrajectoryConfig, TrajectoryGenerator
+
+    config = TrajectoryConfig(constants.Autonomous.kMaxVelocity, constants.Autonomous.kMaxAcceleration)
+    config.setKinematics(DifferentialDriveKinematics(constants.Drivetrain.kTrackWidth))
+    trajectory = TrajectoryGenerator.generateTrajectory(
+        Pose2d(start[0], start[1], Rotation2d(start[2])),
+        [Translation2d(x, y) for x, y in interior],
+        Pose2d(end[0], end[1], Rotation2d(end[2])),
+        config,
+    )
+
+    times = numpy.arange(int(numpy.ceil(trajectory.totalTime() / dt)) + 1) * dt
+    columns = {name: numpy.empty(len(times)) for name in ('x', 'y', 'heading', 'velocity', 'acceleration', 'curvature')}
+    for i, t in enumerate(times):
+        state = trajectory.sample(t)
+        columns['x'][i] = state.pose.X()
+        columns['y'][i] = state.pose.Y()
+        columns['heading'][i] = state.pose.rotation().radians()
+        columns['velocity'][i] = state.velocity
+        columns['acceleration'][i] = state.acceleration
+        columns['curvature'][i] = state.curvature
+    # Headings are interpolated between samples, so they mustn't wrap
+    columns['heading'] = numpy.unwrap(columns['heading'])
+    return columns
+
+
+def autonomousTrajectory() -> SampledProfile:
+    """Columns x, y, heading, velocity, acceleration and curvature (m, radians, s)"""
+    return getCache().get(
+        'trajectory',
+        _generateTrajectory,
+        constants.Autonomous.kSampleInterval,
+        start=constants.Autonomous.kStart,
+        interior=constants.Autonomous.kInteriorWaypoints,
+        end=constants.Autonomous.kEnd,
+    )
+
+
+def precompute() -> None:
+    """Loads (or generates) every profile autonomous uses, so none is generated mid-match"""
+    autonomousTrajectory()
+    for distance in constants.Autonomous.kForwardDistances:
+        forwardProfile(distance)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    # Output paths are relative to the caller, so src is added without changing directory
+    import os
+    import site
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import argparse
+from time import perf_counter
+
+import numpy
+
+import frc.constants as constants
+from lib.python.pidsweep import (
+    ElevatorPlant,
+    SweepSettings,
+    format_results,
+    grid,
+    random_search,
+    sweep,
+)
+
+
+def elevatorPlant() -> ElevatorPlant:
+    return ElevatorPlant(
+        mass=constants.Elevator.kCarriageMass,
+        gear_ratio=constants.Elevator.kGearRatio,
+        drum_radius=constants.Elevator.kDrumRadius,
+        motors=len(constants.Elevator.kMotorIDs),
+        max_height=constants.Elevator.kMaxHeight,
+    )
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Sweep Elevator PID gains against a simulated plant')
+    parser.add_argument('--kp', type=float, nargs=2, default=(0., 20.), metavar=('LOW', 'HIGH'))
+    parser.add_argument('--ki', type=float, nargs=2, default=(0., 5.), metavar=('LOW', 'HIGH'))
+    parser.add_argument('--kd', type=float, nargs=2, default=(0., 2.), metavar=('LOW', 'HIGH'))
+    parser.add_argument('--points', type=int, default=20, help='grid points per gain')
+    parser.add_argument('--random', type=int, help='random search with this many trials instead of a grid')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--setpoint', type=float, default=1., help='step height in m')
+    parser.add_argument('--duration', type=float, default=3.)
+    parser.add_argument('--period', type=float, default=constants.Elevator.kControlPeriod,
+                        help='controller period in s')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--save', help='write every result to this .npy file')
+    args = parser.parse_args(argv)
+
+    if args.random:
+        gains = random_search(args.random, args.kp, args.ki, args.kd, args.seed)
+    else:
+        gains = grid(*(numpy.linspace(low, high, args.points) for low, high in (args.kp, args.ki, args.kd)))
+
+    settings = SweepSettings(setpoint=args.setpoint, duration=args.duration, period=args.period)
+    start = perf_counter()
+    results = sweep(elevatorPlant(), gains, settings, args.jobs)
+    elapsed = perf_counter() - start
+
+    print(f'{len(results)} trials in {elapsed:.2f} s, {results["settled"].sum()} settled')
+    print(format_results(results, args.top))
+    if args.save:
+        numpy.save(args.save, results)
+
+
+if __name__ == '__main__':
+    main()
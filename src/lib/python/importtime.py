@@ -0,0 +1,88 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    # Report paths are relative to the caller, so src is added without changing directory
+    import os
+    import site
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+def profile_imports(module: str, cwd: str = None) -> dict[str, tuple[int, int]]:
+    """
+    Imports module in a fresh interpreter with -X importtime,
+    returning {module: (self us, cumulative us)} for everything it imported
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f'importing {module} failed:\n{result.stderr}')
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def format_report(
+        times: dict[str, tuple[int, int]],
+        top: int = 25,
+        baseline: dict[str, tuple[int, int]] = None,
+        ) -> str:
+    total = sum(self_us for self_us, _ in times.values())
+    lines = [f'{len(times)} modules imported in {total / 1000:.1f} ms']
+    if baseline is not None:
+        baseline_total = sum(self_us for self_us, _ in baseline.values())
+        lines[0] += f' (baseline {baseline_total / 1000:.1f} ms, {(total - baseline_total) / 1000:+.1f} ms)'
+
+    lines.append(f'{"module":<50}{"self ms":>10}{"cumul. ms":>12}' + (f'{"change ms":>12}' if baseline else ''))
+    ranked = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[:top]:
+        line = f'{name:<50}{self_us / 1000:>10.1f}{cumulative_us / 1000:>12.1f}'
+        if baseline is not None:
+            line += f'{(cumulative_us - baseline.get(name, (0, 0))[1]) / 1000:>+12.1f}'
+        lines.append(line)
+
+    if baseline is not None:
+        dropped = sorted(set(baseline) - set(times), key=lambda name: baseline[name][1], reverse=True)
+        if dropped:
+            lines.append(f'no longer imported: {", ".join(dropped[:top])}')
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Import-time profile (python -X importtime) of a module')
+    parser.add_argument('module', nargs='?', default='frc.robot')
+    parser.add_argument('--top', type=int, default=25, help='number of modules to list')
+    parser.add_argument('--save', help='write the profile to this JSON file')
+    parser.add_argument('--baseline', help='compare against a profile saved with --save')
+    args = parser.parse_args(argv)
+
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+    times = profile_imports(args.module, cwd=src)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {name: tuple(value) for name, value in json.load(file).items()}
+
+    print(format_report(times, args.top, baseline))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(times, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
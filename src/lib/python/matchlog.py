@@ -0,0 +1,256 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    # Log paths are relative to the caller, so src is added without changing directory
+    import os
+    import site
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator
+
+import numpy
+
+from lib.python.telemetry import (
+    BLOCK_HEADER,
+    BLOCK_MAGIC,
+    FILE_MAGIC,
+    padding,
+)
+
+
+# Sidecar index layout: INDEX_MAGIC, int64 number of log bytes scanned,
+# then one INDEX_DTYPE record per complete block
+INDEX_MAGIC = b'RBTIDX\x00\x01'
+INDEX_DTYPE = numpy.dtype([
+    ('offset', '<i8'),
+    ('rows', '<i8'),
+    ('first', '<i8'),
+    ('last', '<i8'),
+])
+
+
+class MatchLog:
+    """
+    Read-only, memory-mapped view of a TelemetryRecorder log
+
+    Blocks are located through a sidecar index (<path>.idx),
+    which is built on first open and extended when the log has grown;
+    queries only decode the blocks which overlap the requested time range
+    """
+
+    def __init__(self, path: str, use_index_file: bool = True) -> None:
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError(f'{path} is not a telemetry log')
+
+        header_length, = struct.unpack_from('<I', self._map, len(FILE_MAGIC))
+        header_end = len(FILE_MAGIC) + 4 + header_length
+        header = json.loads(self._map[len(FILE_MAGIC) + 4:header_end])
+        self._data_start = header_end + padding(header_end)
+
+        self.fields = [field['name'] for field in header['fields']]
+        self.dtypes = {
+            field['name']: numpy.dtype(field['type']).newbyteorder('<')
+            for field in header['fields']
+        }
+        self.index = self._load_index(use_index_file)
+
+    def close(self) -> None:
+        """Closes the log; fails while arrays viewing the log are still alive"""
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> MatchLog:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def start_time(self) -> int:
+        return int(self.index['first'][0]) if len(self.index) else 0
+
+    @property
+    def end_time(self) -> int:
+        return int(self.index['last'][-1]) if len(self.index) else 0
+
+    @property
+    def rows(self) -> int:
+        return int(self.index['rows'].sum())
+
+    def _column_offsets(self, offset: int, rows: int) -> dict[str, int]:
+        offsets = {}
+        position = offset + BLOCK_HEADER.size
+        offsets['timestamp'] = position
+        position += 8 * rows
+        for name in self.fields:
+            offsets[name] = position
+            size = self.dtypes[name].itemsize * rows
+            position += size + padding(size)
+        return offsets
+
+    def _block_size(self, rows: int) -> int:
+        size = BLOCK_HEADER.size + 8 * rows
+        for name in self.fields:
+            column = self.dtypes[name].itemsize * rows
+            size += column + padding(column)
+        return size
+
+    def _scan(self, offset: int) -> tuple[list[tuple[int, int, int, int]], int]:
+        blocks = []
+        end = len(self._map)
+        while offset + BLOCK_HEADER.size <= end:
+            magic, rows, first, last = BLOCK_HEADER.unpack_from(self._map, offset)
+            size = self._block_size(rows)
+            if magic != BLOCK_MAGIC or offset + size > end:
+                # A block still being written (or cut short by a crash)
+                break
+            blocks.append((offset, rows, first, last))
+            offset += size
+        return blocks, offset
+
+    def _load_index(self, use_index_file: bool) -> numpy.ndarray:
+        index_path = self.path + '.idx'
+        index = numpy.empty(0, INDEX_DTYPE)
+        scanned = self._data_start
+
+        if use_index_file and os.path.exists(index_path):
+            with open(index_path, 'rb') as file:
+                data = file.read()
+            if data[:len(INDEX_MAGIC)] == INDEX_MAGIC:
+                indexed, = struct.unpack_from('<q', data, len(INDEX_MAGIC))
+                if indexed <= len(self._map):
+                    scanned = indexed
+                    index = numpy.frombuffer(data, INDEX_DTYPE, offset=len(INDEX_MAGIC) + 8)
+
+        blocks, end = self._scan(scanned)
+        if blocks:
+            index = numpy.concatenate([index, numpy.array(blocks, INDEX_DTYPE)])
+
+        if use_index_file and end != scanned:
+            with open(index_path, 'wb') as file:
+                file.write(INDEX_MAGIC)
+                file.write(struct.pack('<q', end))
+                file.write(index.tobytes())
+
+        return index
+
+    def _view(self, block: numpy.void, names: Iterable[str]) -> dict[str, numpy.ndarray]:
+        rows = int(block['rows'])
+        offsets = self._column_offsets(int(block['offset']), rows)
+        views = {'timestamp': numpy.frombuffer(self._map, '<i8', rows, offsets['timestamp'])}
+        for name in names:
+            views[name] = numpy.frombuffer(self._map, self.dtypes[name], rows, offsets[name])
+        return views
+
+    def _check_fields(self, names: Iterable[str]) -> list[str]:
+        names = list(names)
+        missing = [name for name in names if name not in self.dtypes]
+        if missing:
+            raise KeyError(f'{missing} not found in {self.path}')
+        return names
+
+    def query(
+            self,
+            names: Iterable[str],
+            start: int = None,
+            stop: int = None,
+            ) -> dict[str, numpy.ndarray]:
+        """
+        Values of the named fields (and 'timestamp')
+        for start <= timestamp <= stop (in ns, either bound optional)
+        """
+        names = self._check_fields(names)
+        first = 0 if start is None else numpy.searchsorted(self.index['last'], start, 'left')
+        last = len(self.index) if stop is None else numpy.searchsorted(self.index['first'], stop, 'right')
+
+        views = [self._view(block, names) for block in self.index[first:last]]
+        if not views:
+            return {name: numpy.empty(0, self.dtypes.get(name, '<i8')) for name in ['timestamp', *names]}
+
+        columns = {
+            name: numpy.concatenate([view[name] for view in views])
+            for name in ['timestamp', *names]
+        }
+        mask = numpy.ones(len(columns['timestamp']), bool)
+        if start is not None:
+            mask &= columns['timestamp'] >= start
+        if stop is not None:
+            mask &= columns['timestamp'] <= stop
+        return {name: column[mask] for name, column in columns.items()}
+
+    def iter_blocks(self, names: Iterable[str] = None) -> Iterator[dict[str, numpy.ndarray]]:
+        """
+        Yields every block's columns as views into the log,
+        so any size of log streams through in constant memory
+        """
+        names = self.fields if names is None else self._check_fields(names)
+        for block in self.index:
+            yield self._view(block, names)
+
+
+def summarize(log: MatchLog, period: float = 0.02) -> dict[str, object]:
+    """Max stator current per motor and loop overrun count, in one streaming pass"""
+    current_fields = [name for name in log.fields if name.endswith('/statorCurrent')]
+    loop_field = 'robot/loopTimeMs' if 'robot/loopTimeMs' in log.dtypes else None
+    names = current_fields + ([loop_field] if loop_field else [])
+
+    max_currents = dict.fromkeys(current_fields, 0.)
+    overruns = 0
+    worst_loop = 0.
+    for block in log.iter_blocks(names):
+        for name in current_fields:
+            if len(block[name]):
+                max_currents[name] = max(max_currents[name], float(block[name].max()))
+        if loop_field and len(block[loop_field]):
+            overruns += int((block[loop_field] > period * 1000).sum())
+            worst_loop = max(worst_loop, float(block[loop_field].max()))
+
+    return {
+        'rows': log.rows,
+        'blocks': len(log.index),
+        'duration': (log.end_time - log.start_time) / 1e9,
+        'max_stator_current': max_currents,
+        'loop_overruns': overruns,
+        'worst_loop_ms': worst_loop,
+    }
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Inspect telemetry match logs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summary_parser = subparsers.add_parser('summary', help='max current per motor and loop overruns')
+    summary_parser.add_argument('logs', nargs='+')
+    summary_parser.add_argument('--period', type=float, default=0.02, help='loop period in seconds')
+
+    fields_parser = subparsers.add_parser('fields', help='list the recorded fields')
+    fields_parser.add_argument('log')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'fields':
+        with MatchLog(args.log) as log:
+            for name in log.fields:
+                print(f'{name:<50}{log.dtypes[name]}')
+        return
+
+    for path in args.logs:
+        with MatchLog(path) as log:
+            summary = summarize(log, args.period)
+        print(path)
+        print(f'  {summary["rows"]} rows in {summary["blocks"]} blocks over {summary["duration"]:.1f} s')
+        print(f'  {summary["loop_overruns"]} loop overruns, worst loop {summary["worst_loop_ms"]:.2f} ms')
+        for name, current in summary['max_stator_current'].items():
+            print(f'  {name:<48}{current:8.1f} A max')
+
+
+if __name__ == '__main__':
+    main()
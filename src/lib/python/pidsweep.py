@@ -0,0 +1,209 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import multiprocessing
+from typing import NamedTuple, Optional
+
+import numpy
+
+
+GRAVITY = 9.81
+
+# Falcon 500 at 12 V
+NOMINAL_VOLTAGE = 12.
+STALL_TORQUE = 4.69
+STALL_CURRENT = 257.
+FREE_SPEED = 6380 * 2 * numpy.pi / 60
+
+# Sweep results, one row per set of gains
+RESULT_DTYPE = numpy.dtype([
+    ('kp', 'f8'),
+    ('ki', 'f8'),
+    ('kd', 'f8'),
+    ('settled', '?'),
+    ('settling_time', 'f8'),
+    ('overshoot', 'f8'),
+    ('effort', 'f8'),
+    ('score', 'f8'),
+])
+
+
+class ElevatorPlant(NamedTuple):
+    mass: float
+    # Motor rotations per drum rotation
+    gear_ratio: float
+    drum_radius: float
+    motors: int = 2
+    max_height: float = float('inf')
+
+    def coefficients(self) -> tuple[float, float]:
+        """
+        (a, b) of the carriage's acceleration a * voltage - b * velocity - GRAVITY,
+        from the DC motor model through the gearbox and drum
+        """
+        resistance = NOMINAL_VOLTAGE / STALL_CURRENT
+        torque_constant = STALL_TORQUE / STALL_CURRENT
+        velocity_constant = FREE_SPEED / NOMINAL_VOLTAGE
+        a = self.motors * self.gear_ratio * torque_constant / (resistance * self.drum_radius * self.mass)
+        b = a * self.gear_ratio / (self.drum_radius * velocity_constant)
+        return a, b
+
+
+class SweepSettings(NamedTuple):
+    setpoint: float = 1.
+    duration: float = 3.
+    # Controller period; the plant is integrated in substeps of each
+    period: float = 0.02
+    substeps: int = 20
+    # Settled once within this fraction of the step for good
+    tolerance: float = 0.02
+    # score = settling time + overshoot_weight * overshoot + effort_weight * effort
+    overshoot_weight: float = 5.
+    effort_weight: float = 0.1
+
+
+def simulate(plant: ElevatorPlant, gains: numpy.ndarray, settings: SweepSettings) -> numpy.ndarray:
+    """
+    Steps every set of (kp, ki, kd) gains at once (one row each) from rest at the bottom
+    to settings.setpoint, with a wpilib.controller.PIDController-style controller
+    whose output is clamped to [-1, 1] of nominal voltage;
+    returns one RESULT_DTYPE row per set of gains
+    """
+    gains = numpy.atleast_2d(numpy.asarray(gains, float))
+    kp, ki, kd = gains.T
+    count = len(gains)
+    a, b = plant.coefficients()
+    steps = int(round(settings.duration / settings.period))
+    dt = settings.period / settings.substeps
+
+    position = numpy.zeros(count)
+    velocity = numpy.zeros(count)
+    integral = numpy.zeros(count)
+    previous_error = numpy.full(count, settings.setpoint)
+    peak = numpy.zeros(count)
+    effort = numpy.zeros(count)
+    # Last controller step at which each trial was outside the tolerance band
+    last_outside = numpy.zeros(count, int)
+    band = settings.tolerance * abs(settings.setpoint)
+
+    for step in range(steps):
+        error = settings.setpoint - position
+        integral += error * settings.period
+        output = numpy.clip(
+            kp * error + ki * integral + kd * (error - previous_error) / settings.period,
+            -1, 1,
+        )
+        previous_error = error
+        effort += output ** 2 * settings.period
+
+        voltage = output * NOMINAL_VOLTAGE
+        for _ in range(settings.substeps):
+            velocity += (a * voltage - b * velocity - GRAVITY) * dt
+            position += velocity * dt
+            # Hard stops at the bottom and top of travel
+            stopped = (position <= 0) | (position >= plant.max_height)
+            position.clip(0, plant.max_height, out=position)
+            velocity[stopped] = 0
+
+        numpy.maximum(peak, position, out=peak)
+        last_outside[numpy.abs(settings.setpoint - position) > band] = step + 1
+
+    results = numpy.empty(count, RESULT_DTYPE)
+    results['kp'], results['ki'], results['kd'] = kp, ki, kd
+    results['settled'] = last_outside < steps
+    results['settling_time'] = numpy.where(results['settled'], last_outside * settings.period, numpy.inf)
+    results['overshoot'] = numpy.maximum(peak - settings.setpoint, 0) / abs(settings.setpoint)
+    results['effort'] = effort
+    results['score'] = (
+        results['settling_time']
+        + settings.overshoot_weight * results['overshoot']
+        + settings.effort_weight * results['effort']
+    )
+    return results
+
+
+def grid(kp: numpy.ndarray, ki: numpy.ndarray, kd: numpy.ndarray) -> numpy.ndarray:
+    """Every combination of the given gain values, one (kp, ki, kd) row each"""
+    return numpy.stack(numpy.meshgrid(kp, ki, kd, indexing='ij'), -1).reshape(-1, 3)
+
+
+def random_search(
+        count: int,
+        kp_range: tuple[float, float],
+        ki_range: tuple[float, float],
+        kd_range: tuple[float, float],
+        seed: Optional[int] = None,
+        ) -> numpy.ndarray:
+    """count (kp, ki, kd) rows drawn uniformly from each gain's [low, high] range"""
+    generator = numpy.random.default_rng(seed)
+    low, high = numpy.array([kp_range, ki_range, kd_range], float).T
+    return generator.uniform(low, high, (count, 3))
+
+
+def _simulate_chunk(job: tuple[ElevatorPlant, numpy.ndarray, SweepSettings]) -> numpy.ndarray:
+    return simulate(*job)
+
+
+def sweep(
+        plant: ElevatorPlant,
+        gains: numpy.ndarray,
+        settings: SweepSettings = SweepSettings(),
+        processes: Optional[int] = None,
+        chunk_size: int = 4096,
+        ) -> numpy.ndarray:
+    """
+    Simulates every set of gains, split into chunks across a process pool,
+    returning the results ranked best (lowest score) first;
+    trials which never settle rank last
+    """
+    gains = numpy.atleast_2d(numpy.asarray(gains, float))
+    chunks = [gains[i:i + chunk_size] for i in range(0, len(gains), chunk_size)]
+    if processes == 1 or len(chunks) == 1:
+        results = [simulate(plant, chunk, settings) for chunk in chunks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_simulate_chunk, [(plant, chunk, settings) for chunk in chunks])
+
+    results = numpy.concatenate(results)
+    return results[numpy.argsort(results['score'], kind='stable')]
+
+
+def format_results(results: numpy.ndarray, top: int = 10) -> str:
+    lines = [f'{"kp":>10}{"ki":>10}{"kd":>10}{"settling s":>12}{"overshoot %":>13}{"effort":>10}{"score":>10}']
+    for row in results[:top]:
+        lines.append(
+            f'{row["kp"]:>10.4g}{row["ki"]:>10.4g}{row["kd"]:>10.4g}'
+            f'{row["settling_time"]:>12.3f}{row["overshoot"] * 100:>13.1f}{row["effort"]:>10.3f}{row["score"]:>10.3f}'
+        )
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print('Testing lib.python.pidsweep')
+
+    plant = ElevatorPlant(mass=10., gear_ratio=10., drum_radius=0.02, max_height=1.5)
+    settings = SweepSettings(duration=2.)
+    try:
+        # Unpowered, the carriage stays at the bottom; any proportional gain lifts it
+        results = simulate(plant, [[0, 0, 0], [2, 0, 0]], settings)
+        assert not results['settled'][0] and results['score'][0] == numpy.inf
+        assert results['effort'][1] > 0
+
+        gains = grid(numpy.linspace(0, 20, 9), numpy.linspace(0, 4, 5), numpy.linspace(0, 1, 5))
+        assert gains.shape == (225, 3)
+        serial = sweep(plant, gains, settings, processes=1)
+        parallel = sweep(plant, gains, settings, processes=2, chunk_size=50)
+        assert numpy.array_equal(serial, parallel)
+        assert serial['settled'][0] and numpy.all(numpy.diff(serial['score'][serial['settled']]) >= 0)
+
+        assert numpy.array_equal(random_search(10, (0, 1), (0, 1), (0, 1), 3), random_search(10, (0, 1), (0, 1), (0, 1), 3))
+    except AssertionError:
+        print('pidsweep test failed')
+        raise
+
+    print(format_results(serial, 5))
+    print('pidsweep.py tests succeded')
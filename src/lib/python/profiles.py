@@ -0,0 +1,229 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import math
+import os
+from typing import Any, Callable, Mapping
+import zipfile
+
+import numpy
+
+from lib.python.utils import content_hash
+
+
+class SampledProfile:
+    """
+    Columns of a motion profile or trajectory sampled every dt seconds from t = 0;
+    looked up by binary search over the sample times and interpolated linearly
+    (clamped to the first/last sample outside the profile)
+    """
+    __slots__ = 'dt', 'times', 'columns', 'duration'
+
+    def __init__(self, dt: float, columns: Mapping[str, numpy.ndarray]) -> None:
+        self.dt = dt
+        self.columns = {name: numpy.ascontiguousarray(column, float) for name, column in columns.items()}
+        lengths = {len(column) for column in self.columns.values()}
+        if len(lengths) != 1 or not lengths.pop():
+            raise ValueError('SampledProfile columns must be non-empty and all the same length')
+        self.times = numpy.arange(len(next(iter(self.columns.values())))) * dt
+        self.duration = float(self.times[-1])
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def sample(self, t: float) -> dict[str, float]:
+        """Every column's value at time t"""
+        times = self.times
+        i = int(numpy.searchsorted(times, t, 'right')) - 1
+        if i < 0:
+            return {name: float(column[0]) for name, column in self.columns.items()}
+        if i >= len(times) - 1:
+            return {name: float(column[-1]) for name, column in self.columns.items()}
+        fraction = (t - times[i]) / self.dt
+        return {
+            name: float(column[i] + fraction * (column[i + 1] - column[i]))
+            for name, column in self.columns.items()
+        }
+
+    def is_finished(self, t: float) -> bool:
+        return t >= self.duration
+
+
+def trapezoid(distance: float, max_velocity: float, max_acceleration: float, dt: float = 0.02) -> dict[str, numpy.ndarray]:
+    """
+    Position, velocity and acceleration of a rest-to-rest trapezoidal profile
+    (triangular when max_velocity isn't reached), sampled every dt seconds
+    """
+    if max_velocity <= 0 or max_acceleration <= 0:
+        raise ValueError('max_velocity and max_acceleration must be positive')
+
+    sign = math.copysign(1, distance)
+    distance = abs(distance)
+    accelerate_time = max_velocity / max_acceleration
+    if max_acceleration * accelerate_time ** 2 > distance:
+        accelerate_time = math.sqrt(distance / max_acceleration)
+    peak_velocity = max_acceleration * accelerate_time
+    accelerate_distance = peak_velocity * accelerate_time / 2
+    cruise_time = (distance - 2 * accelerate_distance) / peak_velocity if peak_velocity else 0.
+    decelerate_start = accelerate_time + cruise_time
+    total_time = decelerate_start + accelerate_time
+
+    t = numpy.arange(math.ceil(total_time / dt) + 1) * dt
+    t[-1] = min(t[-1], total_time)
+    accelerating = t < accelerate_time
+    decelerating = t >= decelerate_start
+    remaining = numpy.maximum(total_time - t, 0)
+
+    position = numpy.where(
+        accelerating,
+        max_acceleration * t ** 2 / 2,
+        numpy.where(
+            decelerating,
+            distance - max_acceleration * remaining ** 2 / 2,
+            accelerate_distance + peak_velocity * (t - accelerate_time),
+        ),
+    )
+    velocity = numpy.where(
+        accelerating,
+        max_acceleration * t,
+        numpy.where(decelerating, max_acceleration * remaining, peak_velocity),
+    )
+    acceleration = numpy.where(accelerating, max_acceleration, numpy.where(decelerating, -max_acceleration, 0.))
+    # The final sample is at rest
+    position[-1], velocity[-1], acceleration[-1] = distance, 0., 0.
+
+    return {
+        'position': sign * position,
+        'velocity': sign * velocity,
+        'acceleration': sign * acceleration,
+    }
+
+
+class ProfileCache:
+    """
+    Generates each profile once and keeps it as <key>.npz under directory,
+    where key hashes the kind of profile, its parameters and a salt
+    (e.g. the content hash of the constants it depends on),
+    so changing any of them generates a new profile
+    """
+
+    def __init__(self, directory: str, salt: str = '') -> None:
+        self.directory = directory
+        self.salt = salt
+        self._profiles: dict[str, SampledProfile] = {}
+
+    def key(self, kind: str, dt: float, parameters: Mapping[str, Any]) -> str:
+        return content_hash([
+            ('salt', self.salt),
+            ('kind', kind),
+            ('dt', dt),
+            *((f'parameter:{name}', value) for name, value in parameters.items()),
+        ])
+
+    def get(
+            self,
+            kind: str,
+            generate: Callable[..., Mapping[str, numpy.ndarray]],
+            dt: float = 0.02,
+            **parameters: Any,
+            ) -> SampledProfile:
+        """
+        The cached profile for (kind, dt, parameters),
+        otherwise generate(dt=dt, **parameters), which is then cached;
+        a missing, truncated or corrupt cache file is regenerated and overwritten
+        """
+        key = self.key(kind, dt, parameters)
+        profile = self._profiles.get(key)
+        if profile is not None:
+            return profile
+
+        path = os.path.join(self.directory, f'{key}.npz')
+        try:
+            with numpy.load(path) as data:
+                profile = SampledProfile(dt, {name: data[name] for name in data.files})
+        # Never fatal: this runs in robotInit, and a half-copied file is just a miss
+        except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+            columns = generate(dt=dt, **parameters)
+            os.makedirs(self.directory, exist_ok=True)
+            # Written aside and renamed, so a reboot mid-write never leaves a truncated profile
+            temporary_path = f'{path}.{os.getpid()}.tmp.npz'
+            numpy.savez(temporary_path, **columns)
+            os.replace(temporary_path, path)
+            profile = SampledProfile(dt, columns)
+
+        self._profiles[key] = profile
+        return profile
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    print('Testing lib.python.profiles')
+
+    try:
+        for distance, max_velocity in ((3., 1.5), (0.5, 1.5), (-2., 1.)):
+            columns = trapezoid(distance, max_velocity, 2., 0.01)
+            assert math.isclose(columns['position'][-1], distance)
+            assert abs(columns['velocity']).max() <= max_velocity + 1e-9
+            # Velocity is the derivative of position
+            assert numpy.allclose(numpy.diff(columns['position']) / 0.01, (columns['velocity'][1:] + columns['velocity'][:-1]) / 2, atol=0.02)
+    except AssertionError:
+        print('trapezoid test failed')
+        raise
+
+    try:
+        profile = SampledProfile(0.5, {'position': [0., 1., 4.]})
+        assert profile.duration == 1.
+        assert profile.sample(-1) == {'position': 0.}
+        assert profile.sample(0.25) == {'position': 0.5}
+        assert profile.sample(0.75) == {'position': 2.5}
+        assert profile.sample(5) == {'position': 4.}
+        assert profile.is_finished(1.) and not profile.is_finished(0.9)
+    except AssertionError:
+        print('SampledProfile test failed')
+        raise
+
+    with tempfile.TemporaryDirectory() as directory:
+        calls = []
+
+        def generate(**kwargs):
+            calls.append(kwargs)
+            return trapezoid(**kwargs)
+
+        try:
+            first = ProfileCache(directory, 'constants')
+            profile = first.get('trapezoid', generate, distance=1., max_velocity=1., max_acceleration=1.)
+            assert first.get('trapezoid', generate, distance=1., max_velocity=1., max_acceleration=1.) is profile
+
+            # A new process finds it on disk
+            second = ProfileCache(directory, 'constants')
+            loaded = second.get('trapezoid', generate, distance=1., max_velocity=1., max_acceleration=1.)
+            assert len(calls) == 1
+            assert numpy.array_equal(loaded.columns['position'], profile.columns['position'])
+
+            # Changed parameters or constants generate new profiles
+            second.get('trapezoid', generate, distance=2., max_velocity=1., max_acceleration=1.)
+            ProfileCache(directory, 'changed constants').get('trapezoid', generate, distance=1., max_velocity=1., max_acceleration=1.)
+            assert len(calls) == 3
+
+            # Truncated or overwritten files are regenerated and rewritten
+            path = os.path.join(directory, f'{second.key("trapezoid", 0.02, dict(distance=1., max_velocity=1., max_acceleration=1.))}.npz')
+            with open(path, 'rb') as file:
+                intact = file.read()
+            for corrupt in (intact[:len(intact) // 2], b'garbage', b''):
+                with open(path, 'wb') as file:
+                    file.write(corrupt)
+                regenerated = ProfileCache(directory, 'constants').get('trapezoid', generate, distance=1., max_velocity=1., max_acceleration=1.)
+                assert numpy.array_equal(regenerated.columns['position'], profile.columns['position'])
+                with numpy.load(path) as data:
+                    assert numpy.array_equal(data['position'], profile.columns['position'])
+            assert len(calls) == 6
+        except AssertionError:
+            print('ProfileCache test failed')
+            raise
+
+    print('profiles.py tests succeded')
@@ -0,0 +1,99 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import numpy
+
+
+class RollingWindow:
+    """
+    The last `window` samples of several channels at once, in a NumPy ring buffer
+
+    push() is O(1) per channel: the running sum is updated by the sample entering
+    and the one leaving the window (and recomputed exactly once per lap, so rounding
+    doesn't accumulate), and the EWMA by one multiply-add. max() scans the window
+    only when asked for.
+    """
+    __slots__ = 'buffer', 'alpha', 'ewma', 'count', '_sum', '_index'
+
+    def __init__(self, channels: int, window: int, alpha: float = 0.1) -> None:
+        if window < 1 or not 0 < alpha <= 1:
+            raise ValueError('RollingWindow needs window >= 1 and 0 < alpha <= 1')
+        self.buffer = numpy.zeros((window, channels))
+        self.alpha = alpha
+        self.ewma = numpy.zeros(channels)
+        self.count = 0
+        self._sum = numpy.zeros(channels)
+        self._index = 0
+
+    @property
+    def window(self) -> int:
+        return len(self.buffer)
+
+    def push(self, values: numpy.ndarray) -> None:
+        row = self.buffer[self._index]
+        self._sum += values
+        self._sum -= row
+        row[:] = values
+
+        if self.count:
+            self.ewma += self.alpha * (values - self.ewma)
+        else:
+            self.ewma[:] = values
+        self.count += 1
+
+        self._index += 1
+        if self._index == len(self.buffer):
+            self._index = 0
+            self.buffer.sum(axis=0, out=self._sum)
+
+    def filled(self) -> int:
+        """Number of samples currently in the window"""
+        return min(self.count, len(self.buffer))
+
+    def mean(self) -> numpy.ndarray:
+        return self._sum / max(self.filled(), 1)
+
+    def max(self) -> numpy.ndarray:
+        filled = self.filled()
+        if not filled:
+            return numpy.zeros(self.buffer.shape[1])
+        return self.buffer[:filled].max(axis=0)
+
+    def last(self) -> numpy.ndarray:
+        return self.buffer[self._index - 1]
+
+    def reset(self) -> None:
+        self.buffer[:] = 0
+        self.ewma[:] = 0
+        self._sum[:] = 0
+        self.count = 0
+        self._index = 0
+
+
+if __name__ == '__main__':
+    print('Testing lib.python.rolling')
+
+    rng = numpy.random.default_rng(0)
+    samples = rng.normal(20, 5, (1000, 3))
+    window = RollingWindow(3, 50, 0.2)
+    ewma = samples[0].copy()
+    try:
+        for i, sample in enumerate(samples):
+            window.push(sample)
+            if i:
+                ewma += 0.2 * (sample - ewma)
+            recent = samples[max(0, i - 49):i + 1]
+            assert numpy.allclose(window.mean(), recent.mean(axis=0))
+            assert numpy.array_equal(window.max(), recent.max(axis=0))
+            assert numpy.array_equal(window.last(), sample)
+            assert numpy.allclose(window.ewma, ewma)
+        assert window.filled() == 50
+    except AssertionError:
+        print('RollingWindow test failed')
+        raise
+
+    print('rolling.py tests succeded')
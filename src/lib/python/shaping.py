@@ -0,0 +1,330 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from abc import ABC, abstractmethod
+import math
+from typing import Iterable
+
+
+class Stage(ABC):
+    """
+    One step of a Pipeline
+
+    step() is the reference implementation; source() returns the same arithmetic
+    as lines of Python transforming the local `x`, which Pipeline inlines.
+    Parameters (from parameters()) are bound into the generated function as
+    f'{name}_{parameter}', so they're fixed once constructed but never written
+    out as literals, which inf, nan and NumPy scalars have none of;
+    per-tick state lives in the stage's slots.
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def step(self, x: float) -> float:
+        ...
+
+    def parameters(self) -> dict[str, float]:
+        """Values the generated code reads, by parameter name"""
+        return {}
+
+    def source(self, name: str) -> list[str]:
+        """Lines computing x from x, with the stage itself available as name"""
+        return [f'x = {name}.step(x)']
+
+    def reset(self) -> None:
+        pass
+
+
+def _finite(**values: float) -> None:
+    for name, value in values.items():
+        if not math.isfinite(value):
+            raise ValueError(f'{name} must be finite, not {value}')
+
+
+class Deadzone(Stage):
+    """Zero within ±width, rescaled so the rest of the range still spans 0 to ±1"""
+    __slots__ = 'width', '_scale'
+
+    def __init__(self, width: float = 0.1) -> None:
+        if not 0 <= width < 1:
+            raise ValueError(f'Deadzone width must be in [0, 1), not {width}')
+        self.width = width = float(width)
+        self._scale = 1 / (1 - width)
+
+    def step(self, x: float) -> float:
+        magnitude = abs(x)
+        if magnitude <= self.width:
+            return 0.
+        return math.copysign((magnitude - self.width) * self._scale, x)
+
+    def parameters(self) -> dict[str, float]:
+        return {'width': self.width, 'scale': self._scale}
+
+    def source(self, name: str) -> list[str]:
+        return [
+            'magnitude = abs(x)',
+            f'if magnitude <= {name}_width:',
+            '    x = 0.',
+            'else:',
+            f'    x = copysign((magnitude - {name}_width) * {name}_scale, x)',
+        ]
+
+
+class Expo(Stage):
+    """blend * sign(x)|x|^power + (1 - blend) * x; keeps sign and the ±1 endpoints"""
+    __slots__ = 'power', 'blend'
+
+    def __init__(self, power: float = 2., blend: float = 1.) -> None:
+        _finite(power=power)
+        if power <= 0 or not 0 <= blend <= 1:
+            raise ValueError('Expo needs power > 0 and 0 <= blend <= 1')
+        self.power = float(power)
+        self.blend = float(blend)
+
+    def step(self, x: float) -> float:
+        return self.blend * math.copysign(math.pow(abs(x), self.power), x) + (1 - self.blend) * x
+
+    def parameters(self) -> dict[str, float]:
+        return {'power': self.power, 'blend': self.blend, 'rest': 1 - self.blend}
+
+    def source(self, name: str) -> list[str]:
+        return [f'x = {name}_blend * copysign(pow(abs(x), {name}_power), x) + {name}_rest * x']
+
+
+class SlewRateLimiter(Stage):
+    """Limits how fast the output can change, in units per second"""
+    __slots__ = 'max_delta', 'value'
+
+    def __init__(self, rate: float, period: float = 0.02) -> None:
+        if not rate > 0:
+            raise ValueError(f'Slew rate must be positive, not {rate}')
+        _finite(period=period)
+        # An infinite rate is no limit at all
+        self.max_delta = float(rate * period)
+        self.value = 0.
+
+    def step(self, x: float) -> float:
+        delta = x - self.value
+        if delta > self.max_delta:
+            delta = self.max_delta
+        elif delta < -self.max_delta:
+            delta = -self.max_delta
+        self.value += delta
+        return self.value
+
+    def parameters(self) -> dict[str, float]:
+        return {'max_delta': self.max_delta, 'min_delta': -self.max_delta}
+
+    def source(self, name: str) -> list[str]:
+        return [
+            f'delta = x - {name}.value',
+            f'if delta > {name}_max_delta:',
+            f'    delta = {name}_max_delta',
+            f'elif delta < {name}_min_delta:',
+            f'    delta = {name}_min_delta',
+            f'x = {name}.value = {name}.value + delta',
+        ]
+
+    def reset(self) -> None:
+        self.value = 0.
+
+
+class LowPass(Stage):
+    """Single-pole low-pass filter with the given time constant, in seconds"""
+    __slots__ = 'alpha', 'value'
+
+    def __init__(self, time_constant: float, period: float = 0.02) -> None:
+        _finite(time_constant=time_constant, period=period)
+        if time_constant < 0:
+            raise ValueError(f'Time constant must not be negative, not {time_constant}')
+        self.alpha = float(period / (time_constant + period))
+        self.value = 0.
+
+    def step(self, x: float) -> float:
+        self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def parameters(self) -> dict[str, float]:
+        return {'alpha': self.alpha}
+
+    def source(self, name: str) -> list[str]:
+        return [f'x = {name}.value = {name}.value + {name}_alpha * (x - {name}.value)']
+
+    def reset(self) -> None:
+        self.value = 0.
+
+
+class Scale(Stage):
+    """Multiplies by factor, then clamps to ±limit"""
+    __slots__ = 'factor', 'limit'
+
+    def __init__(self, factor: float = 1., limit: float = 1.) -> None:
+        _finite(factor=factor)
+        if not limit >= 0:
+            raise ValueError(f'Scale limit must not be negative, not {limit}')
+        self.factor = float(factor)
+        # An infinite limit doesn't clamp
+        self.limit = float(limit)
+
+    def step(self, x: float) -> float:
+        x *= self.factor
+        if x > self.limit:
+            return self.limit
+        if x < -self.limit:
+            return -self.limit
+        return x
+
+    def parameters(self) -> dict[str, float]:
+        return {'factor': self.factor, 'limit': self.limit, 'lower': -self.limit}
+
+    def source(self, name: str) -> list[str]:
+        return [
+            f'x *= {name}_factor',
+            f'if x > {name}_limit:',
+            f'    x = {name}_limit',
+            f'elif x < {name}_lower:',
+            f'    x = {name}_lower',
+        ]
+
+
+class Pipeline:
+    """
+    A fixed sequence of stages compiled into one function,
+    so a call runs every stage's arithmetic inline with no per-stage dispatch
+
+    batch() runs the same arithmetic over an array (e.g. a recorded match) on a copy
+    of the stages from freshly reset state, so offline results are identical to the
+    robot's and the live pipeline's state is left alone.
+    """
+    __slots__ = 'stages', '_run'
+
+    def __init__(self, *stages: Stage) -> None:
+        self.stages = tuple(stages)
+
+        body = []
+        parameters = {}
+        namespace = {'copysign': math.copysign, 'pow': math.pow}
+        for i, stage in enumerate(self.stages):
+            name = f'stage{i}'
+            namespace[name] = stage
+            for parameter, value in stage.parameters().items():
+                parameters[f'{name}_{parameter}'] = value
+            body += [f'        {line}' for line in stage.source(name)]
+        # Parameters are arguments of an enclosing function, which run reads as closure cells
+        namespace['parameters'] = parameters
+        lines = [
+            f'def build({", ".join(parameters)}):',
+            '    def run(x):',
+            *body,
+            '        return x',
+            '    return run',
+            'run = build(**parameters)',
+        ]
+        exec(compile('\n'.join(lines), f'<Pipeline {self!r}>', 'exec'), namespace)
+        self._run = namespace['run']
+
+    def __call__(self, x: float) -> float:
+        return self._run(x)
+
+    def __repr__(self) -> str:
+        return f'Pipeline({", ".join(type(stage).__name__ for stage in self.stages)})'
+
+    def function(self):
+        """The compiled function itself, to skip even this object's call overhead"""
+        return self._run
+
+    def reset(self) -> None:
+        for stage in self.stages:
+            stage.reset()
+
+    def batch(self, inputs: Iterable[float]):
+        """
+        Outputs for a whole sequence of inputs, as a NumPy array, starting from reset state;
+        runs on copies of the stages, so it's safe to call while the pipeline is live
+        """
+        import copy
+        import numpy
+
+        inputs = numpy.asarray(inputs, dtype=numpy.float64)
+        offline = Pipeline(*copy.deepcopy(self.stages))
+        offline.reset()
+        run = offline._run
+        return numpy.fromiter((run(x) for x in inputs.tolist()), numpy.float64, len(inputs))
+
+
+if __name__ == '__main__':
+    import random
+
+    print('Testing lib.python.shaping')
+
+    def stages():
+        return (
+            Deadzone(0.1),
+            Expo(3., 0.7),
+            SlewRateLimiter(4., 0.02),
+            LowPass(0.05, 0.02),
+            Scale(0.8),
+        )
+
+    random.seed(0)
+    inputs = [random.uniform(-1.2, 1.2) for _ in range(2000)] + [0., 1., -1., 0.1, -0.1]
+    try:
+        assert Deadzone(0.1).step(0.1) == 0 and Deadzone(0.1).step(-1) == -1 and math.isclose(Deadzone(0.1).step(0.55), 0.5)
+        assert Expo(2.).step(-0.5) == -0.25
+
+        pipeline = Pipeline(*stages())
+        reference = stages()
+        for x in inputs:
+            expected = x
+            for stage in reference:
+                expected = stage.step(expected)
+            assert pipeline(x) == expected
+
+        # Batch mode reproduces a live run exactly
+        pipeline.reset()
+        live = [pipeline(x) for x in inputs]
+        assert pipeline.batch(inputs).tolist() == live
+
+        # ...without touching the live pipeline's state
+        state = [stage.value for stage in pipeline.stages if hasattr(stage, 'value')]
+        pipeline.batch(inputs)
+        assert [stage.value for stage in pipeline.stages if hasattr(stage, 'value')] == state
+
+        import numpy
+        assert Pipeline(Deadzone(numpy.float64(0.1)))(0.55) == Deadzone(0.1).step(0.55)
+
+        # Infinite parameters mean no limit, and compile like any other
+        assert Pipeline(Scale(2., math.inf))(3.) == 6.
+        assert Pipeline(SlewRateLimiter(math.inf))(-5.) == -5.
+        for invalid in (
+                lambda: Expo(math.inf),
+                lambda: Expo(math.nan),
+                lambda: Scale(math.nan),
+                lambda: Scale(1., math.nan),
+                lambda: SlewRateLimiter(math.nan),
+                lambda: LowPass(math.nan),
+                lambda: LowPass(math.inf),
+                lambda: Deadzone(math.nan),
+                ):
+            try:
+                invalid()
+            except ValueError:
+                pass
+            else:
+                raise AssertionError('Non-finite parameter accepted')
+
+        try:
+            Stage()
+        except TypeError:
+            pass
+        else:
+            raise AssertionError('Stage must be abstract')
+    except AssertionError:
+        print('Pipeline test failed')
+        raise
+
+    print('shaping.py tests succeded')
@@ -0,0 +1,237 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from array import array
+from collections import deque
+import json
+import queue
+import struct
+import threading
+
+
+# File layout (little endian):
+#   FILE_MAGIC, uint32 header length, JSON header, zero padding to 8 bytes
+#   then blocks of:
+#       BLOCK_HEADER (magic, uint32 rows, int64 first/last timestamp)
+#       int64 timestamp column (ns), then one column per field in header order,
+#       each column zero padded to 8 bytes
+# Every column starts 8-byte aligned so it can be viewed in place
+# (e.g. numpy.frombuffer on an mmap) without copying
+FILE_MAGIC = b'RBTLOG\x00\x01'
+BLOCK_MAGIC = b'BLK0'
+BLOCK_HEADER = struct.Struct('<4sIqq')
+FIELD_TYPES = 'bBhHiIqQfd'
+ALIGNMENT = 8
+
+
+def padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+class _Block:
+    __slots__ = 'timestamps', 'columns', 'rows'
+
+    def __init__(self, typecodes: list[str], capacity: int) -> None:
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.columns = [array(typecode, bytes(array(typecode).itemsize * capacity)) for typecode in typecodes]
+        self.rows = 0
+
+
+class TelemetryRecorder:
+    __slots__ = (
+        '_names', '_typecodes', '_latest',
+        '_block', '_columns', '_timestamps', '_row', '_capacity',
+        '_free', '_full', '_thread', '_file',
+        'dropped_blocks', 'written_blocks',
+    )
+
+    def __init__(self, block_rows: int = 250, spare_blocks: int = 8) -> None:
+        self._names: list[str] = []
+        self._typecodes: list[str] = []
+        self._latest: list = []
+        self._capacity = block_rows
+        self._free = deque(maxlen=spare_blocks + 1)
+        self._full = queue.SimpleQueue()
+        self._thread = None
+        self._file = None
+        self._block = None
+        self._columns = ()
+        self._timestamps = None
+        self._row = 0
+        self.dropped_blocks = 0
+        self.written_blocks = 0
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def add_field(self, name: str, typecode: str = 'd') -> int:
+        if self.started:
+            raise RuntimeError('Fields cannot be added once the recorder has started')
+        if typecode not in FIELD_TYPES:
+            raise ValueError(f'typecode must be one of {FIELD_TYPES!r}, not {typecode!r}')
+        if name in self._names:
+            raise ValueError(f'{name} has already been added')
+
+        self._names.append(name)
+        self._typecodes.append(typecode)
+        self._latest.append(0)
+        return len(self._names) - 1
+
+    def start(self, path: str) -> None:
+        if self.started:
+            raise RuntimeError('The recorder has already started')
+
+        for _ in range(self._free.maxlen):
+            self._free.append(_Block(self._typecodes, self._capacity))
+        self._next_block()
+
+        header = json.dumps({
+            'fields': [
+                {'name': name, 'type': typecode}
+                for name, typecode in zip(self._names, self._typecodes)
+            ],
+            'block_rows': self._capacity,
+        }).encode()
+
+        self._file = open(path, 'wb')
+        self._file.write(FILE_MAGIC)
+        self._file.write(struct.pack('<I', len(header)))
+        self._file.write(header)
+        self._file.write(bytes(padding(len(FILE_MAGIC) + 4 + len(header))))
+        self._file.flush()
+
+        self._thread = threading.Thread(target=self._write_blocks, name='TelemetryWriter', daemon=True)
+        self._thread.start()
+
+    def set(self, field: int, value) -> None:
+        """Sets a field's value for the current row; values hold until set again"""
+        self._latest[field] = value
+
+    def commit(self, timestamp_ns: int) -> None:
+        """Ends the current row, stamping it with timestamp_ns"""
+        row = self._row
+        self._timestamps[row] = timestamp_ns
+        for column, value in zip(self._columns, self._latest):
+            column[row] = value
+
+        row += 1
+        if row == self._capacity:
+            self._hand_off(row)
+        else:
+            self._row = row
+
+    def flush(self) -> None:
+        """Hands the partially filled block to the writer"""
+        if self._row:
+            self._hand_off(self._row)
+
+    def close(self) -> None:
+        if not self.started:
+            return
+        self.flush()
+        self._full.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _hand_off(self, rows: int) -> None:
+        if not self._free:
+            # The writer has fallen behind; never block or allocate in the loop,
+            # overwrite the block in hand instead
+            self.dropped_blocks += 1
+            self._row = 0
+            return
+
+        self._block.rows = rows
+        self._full.put(self._block)
+        self._next_block()
+
+    def _next_block(self) -> None:
+        # Only this thread takes blocks, so a non-empty deque stays non-empty
+        block = self._free.popleft()
+        self._block = block
+        self._columns = block.columns
+        self._timestamps = block.timestamps
+        self._row = 0
+
+    def _write_blocks(self) -> None:
+        file = self._file
+        while True:
+            block = self._full.get()
+            if block is None:
+                return
+
+            rows = block.rows
+            timestamps = block.timestamps
+            file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, rows, timestamps[0], timestamps[rows - 1]))
+            for column in (timestamps, *block.columns):
+                view = memoryview(column)[:rows]
+                file.write(view)
+                file.write(bytes(padding(view.nbytes)))
+            file.flush()
+
+            self.written_blocks += 1
+            self._free.append(block)
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    import timeit
+
+    print('Testing lib.python.telemetry')
+
+    recorder = TelemetryRecorder(block_rows=4)
+    position = recorder.add_field('drivetrain/leftPosition')
+    enabled = recorder.add_field('robot/enabled', 'b')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.rbtlog')
+        recorder.start(path)
+        for tick in range(10):
+            recorder.set(position, tick / 2)
+            if tick == 3:
+                recorder.set(enabled, 1)
+            recorder.commit(tick * 20_000_000)
+
+        per_field = min(timeit.repeat(lambda: recorder.set(position, 1.5), number=100_000, repeat=5)) / 100_000
+        recorder.close()
+
+        with open(path, 'rb') as file:
+            data = file.read()
+
+    try:
+        assert data.startswith(FILE_MAGIC)
+        assert BLOCK_HEADER.size % ALIGNMENT == 0
+        header_length, = struct.unpack_from('<I', data, len(FILE_MAGIC))
+        header = json.loads(data[12:12 + header_length])
+        assert [field['name'] for field in header['fields']] == ['drivetrain/leftPosition', 'robot/enabled']
+
+        offset = 12 + header_length + padding(12 + header_length)
+        rows_seen = []
+        while offset < len(data):
+            magic, rows, first, last = BLOCK_HEADER.unpack_from(data, offset)
+            assert magic == BLOCK_MAGIC
+            offset += BLOCK_HEADER.size
+            timestamps = memoryview(data)[offset:offset + 8 * rows].cast('q')
+            assert (timestamps[0], timestamps[-1]) == (first, last)
+            offset += 8 * rows
+            positions = memoryview(data)[offset:offset + 8 * rows].cast('d')
+            offset += 8 * rows
+            flags = memoryview(data)[offset:offset + rows].cast('b')
+            offset += rows + padding(rows)
+            rows_seen.extend(zip(timestamps.tolist(), positions.tolist(), flags.tolist()))
+
+        assert [row[1] for row in rows_seen] == [tick / 2 for tick in range(10)]
+        assert [row[2] for row in rows_seen] == [0, 0, 0, 1, 1, 1, 1, 1, 1, 1]
+        assert recorder.dropped_blocks == 0
+    except AssertionError:
+        print('TelemetryRecorder test failed')
+        raise
+
+    print(f'set: {per_field * 1e9:.0f} ns per field')
+    print('telemetry.py tests succeded')
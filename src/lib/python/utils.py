@@ -1,12 +1,22 @@
 from __future__ import annotations
 import functools
+import itertools
+import threading
 if __name__ == '__main__':
     import os
     import site
     os.chdir('src')
     site.addsitedir(os.getcwd())
 
+from array import array
+import hashlib
 import math
+import types
+from types import MappingProxyType
+import typing
+
+
+T = typing.TypeVar('T')
 
 
 class ValueRange: ...
@@ -58,12 +68,165 @@ def deadzone(
         return 1
 
 
+class DeadzoneCurve:
+    __slots__ = (
+        'power',
+        'lower_maxzone',
+        'lower_deadzone',
+        'higher_deadzone',
+        'higher_maxzone',
+        '_lower_span',
+        '_higher_span',
+    )
+
+    def __init__(
+            self,
+            power=2,
+            lower_maxzone=-1,
+            lower_deadzone=-0.1,
+            higher_deadzone=0.1,
+            higher_maxzone=1,
+            ):
+        if not(
+            -1 <= lower_maxzone < lower_deadzone <= 0
+            <= higher_deadzone < higher_maxzone <= 1
+        ):
+            raise ValueError(
+                'The following must be true: '
+                '-1 <= lower_maxzone < lower_deadzone <= 0'
+                '<= higher_deadzone < higher_maxzone <= 1'
+            )
+        if not(power >= 0):
+            raise ValueError('Power must be greater than or equal to zero')
+
+        for name, value in (
+                ('power', power),
+                ('lower_maxzone', lower_maxzone),
+                ('lower_deadzone', lower_deadzone),
+                ('higher_deadzone', higher_deadzone),
+                ('higher_maxzone', higher_maxzone),
+                ('_lower_span', lower_deadzone - lower_maxzone),
+                ('_higher_span', higher_maxzone - higher_deadzone),
+                ):
+            object.__setattr__(self, name, value)
+
+    def __call__(self, input):
+        # Same arithmetic as deadzone, so results are bit-identical;
+        # the lower bound of each range is implied by the previous check
+        # (NaN still falls through every branch)
+        if input <= self.lower_maxzone:
+            return -1
+        if input < self.lower_deadzone:
+            return math.pow(
+                (-input + self.lower_deadzone) / self._lower_span,
+                self.power,
+            )
+        if input <= self.higher_deadzone:
+            return 0
+        if input < self.higher_maxzone:
+            return math.pow(
+                (input - self.higher_deadzone) / self._higher_span,
+                self.power,
+            )
+        if self.higher_maxzone <= input:
+            return 1
+
+    def apply(self, inputs):
+        # Imported here so that robot code which never uses it doesn't pay for it at boot
+        import numpy
+
+        inputs = numpy.asarray(inputs, dtype=numpy.float64)
+        # NaN matches none of the ranges below, like the scalar path
+        outputs = numpy.full(inputs.shape, numpy.nan)
+
+        outputs[inputs <= self.lower_maxzone] = -1
+
+        lower = (self.lower_maxzone < inputs) & (inputs < self.lower_deadzone)
+        outputs[lower] = self._pow(
+            (-inputs[lower] + self.lower_deadzone) / self._lower_span
+        )
+
+        outputs[(self.lower_deadzone <= inputs) & (inputs <= self.higher_deadzone)] = 0
+
+        higher = (self.higher_deadzone < inputs) & (inputs < self.higher_maxzone)
+        outputs[higher] = self._pow(
+            (inputs[higher] - self.higher_deadzone) / self._higher_span
+        )
+
+        outputs[self.higher_maxzone <= inputs] = 1
+        return outputs
+
+    def _pow(self, bases):
+        import numpy
+
+        # numpy.power is not guaranteed to round like the platform's math.pow
+        # (not even for squares), so only the exact cases are left to numpy
+        if self.power == 0 or self.power == 1:
+            return numpy.power(bases, self.power)
+        return numpy.fromiter(
+            map(math.pow, bases.tolist(), itertools.repeat(self.power)),
+            numpy.float64,
+            len(bases),
+        )
+
+    def __setattr__(self, name: str, value) -> None:
+        raise TypeError(f"type '{__class__}' does not support attribute assignment")
+
+    def __delattr__(self, name: str) -> None:
+        raise TypeError(f"type '{__class__}' does not support attribute deletion")
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'power={self.power!r}, '
+            f'lower_maxzone={self.lower_maxzone!r}, '
+            f'lower_deadzone={self.lower_deadzone!r}, '
+            f'higher_deadzone={self.higher_deadzone!r}, '
+            f'higher_maxzone={self.higher_maxzone!r})'
+        )
+
+
 def remove_dunder_attrs(dict_: dict) -> dict:
     return {k: v for k, v in dict_.items() if not(k.startswith('__') and k.endswith('__'))}
 
 
+def _nested_paths(value) -> list:
+    nested_index = getattr(value, '__path_index__', None)
+    if isinstance(nested_index, MappingProxyType):
+        return [(path, v) for path, v in nested_index.items() if isinstance(path, tuple)]
+
+    if isinstance(value, (list, tuple)):
+        paths = []
+        for i, item in enumerate(value):
+            paths.append(((i,), item))
+            paths.extend(((i, *path), v) for path, v in _nested_paths(item))
+        return paths
+
+    return []
+
+
+def build_path_index(items) -> MappingProxyType:
+    index = {}
+    for key, value in items:
+        index[key] = value
+        index[(key,)] = value
+        for path, nested_value in _nested_paths(value):
+            index[(key, *path)] = nested_value
+    return MappingProxyType(index)
+
+
+def content_hash(items) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for key, value in sorted(items, key=lambda item: item[0]):
+        nested_hash = getattr(value, '__content_hash__', None)
+        if not isinstance(nested_hash, str):
+            nested_hash = repr(value)
+        digest.update(f'{key!r}={nested_hash}\n'.encode())
+    return digest.hexdigest()
+
+
 class ReadonlyDict:
-    __slots__ = '_dict',
+    __slots__ = '_dict', '__path_index__', '__content_hash__'
 
     def __init__(self, *args, **kwargs):
         if not args:
@@ -94,10 +257,20 @@ class ReadonlyDict:
                 self._dict[k] = tuple(v)
             else:
                 self._dict[k] = v
+
+        items = self._dict.items()
+        object.__setattr__(self, '__path_index__', build_path_index(items))
+        object.__setattr__(self, '__content_hash__', content_hash(items))
         
         return super().__init__()
     
     def __getitem__(self, name):
+        try:
+            return self.__path_index__[name]
+        except (KeyError, TypeError):
+            pass
+
+        # Paths through values other than ReadonlyDicts, lists and tuples
         if isinstance(name, str):
             if name in self._getdict():
                 return self._getdict()[name]
@@ -131,6 +304,9 @@ class ReadonlyDict:
     def _getdict(self) -> dict:
         return object.__getattribute__(self, '_dict')
 
+    def content_hash(self) -> str:
+        return self.__content_hash__
+
     def __iter__(self):
         return self._getdict().keys()
 
@@ -185,22 +361,115 @@ class SingletonType(type):
             bases: tuple,
             clsdict: dict,
             ) -> SingletonType:
-        clsdict.update({'_instance': None})
+        clsdict.update({'_instance': None, '_instance_lock': threading.RLock()})
         return super().__new__(mcls, clsname, bases, clsdict)
 
     def __call__(cls, *args, **kwargs):
-        return cls.get_instance(*args, **kwargs)
+        return SingletonType.get_instance(cls, *args, **kwargs)
 
     def get_instance(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = cls.__new__(*args, **kwargs)
-        return cls._instance
+        instance = cls._instance
+        if instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = super().__call__(*args, **kwargs)
+                instance = cls._instance
+        return instance
 
 
 def avg(*args):
+    # A single iterable argument is averaged itself
+    if len(args) == 1 and hasattr(args[0], '__iter__'):
+        args = tuple(args[0])
     return sum(args) / len(args)
 
 
+class Aggregate:
+    __slots__ = 'count', 'mean', 'min', 'max', 'values'
+
+    def __init__(self, count, mean, min, max, values):
+        self.count = count
+        self.mean = mean
+        self.min = min
+        self.max = max
+        self.values = values
+
+    @property
+    def spread(self):
+        return self.max - self.min
+
+    def __repr__(self):
+        return (
+            f'Aggregate(count={self.count}, mean={self.mean!r}, min={self.min!r}, '
+            f'max={self.max!r}, values={tuple(self.values)!r})'
+        )
+
+
+def aggregate(values):
+    count = 0
+    total = 0
+    minimum = maximum = None
+    members = array('d')
+    for value in values:
+        members.append(value)
+        total += value
+        count += 1
+        if minimum is None:
+            minimum = maximum = value
+        elif value < minimum:
+            minimum = value
+        elif value > maximum:
+            maximum = value
+    if not count:
+        raise ValueError('Cannot aggregate no values')
+    return Aggregate(count, total / count, minimum, maximum, members)
+
+
+@functools.singledispatch
+def aggregate_method_wrapper(method_or_attr_name, object_list: list, tick=None):
+    raise TypeError(f'Expected a method or attribute name, not {type(method_or_attr_name)}')
+
+@aggregate_method_wrapper.register(str)
+def _(attr_name: str, object_list: list, tick=None):
+    def values(args, kwargs):
+        for obj in object_list:
+            attr = getattr(obj, attr_name)
+            yield attr(*args, **kwargs) if callable(attr) else attr
+
+    return _aggregate_wrapper(values, tick)
+
+@aggregate_method_wrapper.register(types.FunctionType)
+@aggregate_method_wrapper.register(types.BuiltinFunctionType)
+@aggregate_method_wrapper.register(types.MethodDescriptorType)
+@aggregate_method_wrapper.register(types.WrapperDescriptorType)
+def _(method, object_list: list, tick=None):
+    def values(args, kwargs):
+        for obj in object_list:
+            yield method(obj, *args, **kwargs)
+
+    wrapper = _aggregate_wrapper(values, tick)
+    return functools.wraps(method)(wrapper)
+
+
+def _aggregate_wrapper(values, tick):
+    if tick is None:
+        def wrapper(*args, **kwargs):
+            return aggregate(values(args, kwargs))
+        return wrapper
+
+    cached_key = None
+    cached = None
+
+    def cached_wrapper(*args, **kwargs):
+        nonlocal cached_key, cached
+        key = (tick(), args, kwargs)
+        if key != cached_key:
+            cached = aggregate(values(args, kwargs))
+            cached_key = key
+        return cached
+    return cached_wrapper
+
+
 @functools.singledispatch
 def optional_average_method_wrapper(
         method_or_attr_name,
@@ -209,23 +478,36 @@ def optional_average_method_wrapper(
         ):
     pass
 
-@optional_average_method_wrapper.register
+# Registered explicitly: plain register would dispatch on the first annotation (object_list's list)
+@optional_average_method_wrapper.register(types.FunctionType)
+@optional_average_method_wrapper.register(types.BuiltinFunctionType)
+@optional_average_method_wrapper.register(types.MethodDescriptorType)
+@optional_average_method_wrapper.register(types.WrapperDescriptorType)
 def _(method, object_list: list, average_default=False):
     
     @functools.wraps(method)
     def wrapper(*args, average=average_default, **kwargs):
-        val_list = [method(self, *args, **kwargs) for self in object_list]
-    
         if average:
-            return avg(val_list)
-        return val_list
+            # Summed as they come; no list of values
+            total = 0
+            for self in object_list:
+                total += method(self, *args, **kwargs)
+            return total / len(object_list)
+        return [method(self, *args, **kwargs) for self in object_list]
 
     return wrapper
 
-@optional_average_method_wrapper.register
+@optional_average_method_wrapper.register(str)
 def _(attr_name: str, object_list: list, average_default=False):
     
     def wrapper(*args, average=average_default, **kwargs):
+        if average:
+            total = 0
+            for obj in object_list:
+                attr = getattr(obj, attr_name)
+                total += attr(*args, **kwargs) if callable(attr) else attr
+            return total / len(object_list)
+
         attr_list = []
         
         for obj in object_list:
@@ -235,8 +517,6 @@ def _(attr_name: str, object_list: list, average_default=False):
             else:
                 attr_list.append(attr)
     
-        if average:
-            return avg(attr_list)
         return attr_list
 
     return wrapper
@@ -273,10 +553,96 @@ if __name__ == '__main__':
         assert test_instance['dict', 'negative2'] == -2
         assert test_instance.dict.object1 is test_object
         assert test_instance.dict['object2'] is None
+        assert test_instance['int_list', 1] == 6
+        assert test_instance.content_hash() == ReadonlyDict({
+            'second': 2,
+            'first': 1,
+            'string': 'abcde',
+            'int_list': (5, 6, 7, 8, 9),
+            'dict': test_instance['dict'],
+        }).content_hash()
+        assert test_instance.content_hash() != ReadonlyDict(test_instance._getdict(), first=0).content_hash()
     except AssertionError as e:
         print('ReadonlyDict test failed')
         raise
     
     print('ReadonlyDict tests succeded')
 
+    try:
+        curve = DeadzoneCurve(3, -0.9, -0.2, 0.05, 0.95)
+        samples = [i / 100 for i in range(-110, 111)] + [float('nan')]
+        expected = [deadzone(sample, 3, -0.9, -0.2, 0.05, 0.95) for sample in samples]
+        assert [curve(sample) for sample in samples] == expected
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            assert numpy.array_equal(
+                curve.apply(samples),
+                numpy.array(expected, dtype=float),
+                equal_nan=True,
+            )
+    except AssertionError as e:
+        print('DeadzoneCurve test failed')
+        raise
+
+    print('DeadzoneCurve tests succeded')
+
+    try:
+        constructed = []
+
+        class TestSingleton(metaclass=SingletonType):
+            def __init__(self, value=None):
+                constructed.append(value)
+                self.value = value
+
+        threads = [threading.Thread(target=TestSingleton, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(constructed) == 1
+        assert TestSingleton().value == constructed[0]
+        assert TestSingleton.get_instance() is TestSingleton()
+    except AssertionError as e:
+        print('SingletonType test failed')
+        raise
+
+    print('SingletonType tests succeded')
+
+    try:
+        class Member:
+            def __init__(self, value):
+                self.value = value
+
+            def get(self, offset=0):
+                return self.value + offset
+
+        members = [Member(value) for value in (3, 1, 2)]
+        assert avg(1, 2, 3) == avg([1, 2, 3]) == 2
+
+        result = aggregate_method_wrapper(Member.get, members)()
+        assert (result.count, result.mean, result.min, result.max, result.spread) == (3, 2, 1, 3, 2)
+        assert list(result.values) == [3, 1, 2]
+        assert aggregate_method_wrapper('value', members)().mean == 2
+        assert aggregate_method_wrapper('get', members)(offset=1).max == 4
+
+        tick = [0]
+        cached = aggregate_method_wrapper(Member.get, members, tick=lambda: tick[0])
+        first = cached()
+        members[0].value = 6
+        assert cached() is first and cached(1) is not first
+        tick[0] += 1
+        assert cached().max == 6
+
+        assert optional_average_method_wrapper(Member.get, members)(average=True) == 3
+        assert optional_average_method_wrapper('value', members)() == [6, 1, 2]
+    except AssertionError as e:
+        print('aggregate test failed')
+        raise
+
+    print('aggregate tests succeded')
+
     print('pyutils.py tests succeded')
\ No newline at end of file
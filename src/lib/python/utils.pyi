@@ -1,3 +1,5 @@
+from array import array
+import types
 import typing
 
 
@@ -67,10 +69,88 @@ def deadzone(
     """
 
 
+class DeadzoneCurve:
+    """
+    Precomputed form of deadzone for a fixed set of parameters
+
+    Parameters are validated once, at construction,
+    and the curve cannot be modified afterwards;
+    calling the curve gives bit-identical results to
+    deadzone(input, power, lower_maxzone, ...)
+
+    DeadzoneCurve.apply evaluates a whole array of inputs at once
+    (requires numpy), e.g. to reshape a recorded joystick trace offline
+    """
+    __slots__ = (
+        'power',
+        'lower_maxzone',
+        'lower_deadzone',
+        'higher_deadzone',
+        'higher_maxzone',
+        '_lower_span',
+        '_higher_span',
+    )
+
+    power: float
+    lower_maxzone: unit_float
+    lower_deadzone: unit_float
+    higher_deadzone: unit_float
+    higher_maxzone: unit_float
+
+    def __init__(
+            self,
+            power: float = 2,
+            lower_maxzone: unit_float = -1,
+            lower_deadzone: unit_float = -0.1,
+            higher_deadzone: unit_float = 0.1,
+            higher_maxzone: unit_float = 1,
+            ) -> None:
+        """
+        Same parameters and ValueErrors as deadzone
+        """
+
+    def __call__(self, input: unit_float) -> unit_float:
+        """
+        Scalar fast path; the same as deadzone(input, ...)
+        """
+
+    def apply(self, inputs: typing.Any) -> typing.Any:
+        """
+        Vectorized path; takes any array-like of inputs
+        and returns a float64 numpy.ndarray of the same shape,
+        element-wise identical to the scalar path (NaN for NaN inputs)
+
+        Raises ImportError if numpy is not installed
+        """
+
+
 def remove_dunder_attrs(dict_: dict) -> dict:
     ...
 
 
+def build_path_index(
+        items: typing.Iterable[tuple[typing.Any, typing.Any]],
+        ) -> types.MappingProxyType:
+    """
+    Flattens key-value pairs into a read-only mapping of every path to its value
+
+    Each key is indexed both as key and (key,);
+    values which have their own __path_index__ (ReadonlyDict, ConstantsClass)
+    and lists/tuples (by position) are recursed into,
+    so (key1, key2, ...) paths resolve with a single lookup
+    """
+
+
+def content_hash(items: typing.Iterable[tuple[str, typing.Any]]) -> str:
+    """
+    Order-independent hex digest of key-value pairs
+
+    Values with a __content_hash__ (ReadonlyDict, ConstantsClass)
+    contribute that hash, others contribute their repr,
+    so the digest is only stable across runs for values with a deterministic repr
+    """
+
+
 class ReadonlyDict:
     """
     Dictionary-like object which stores key-value pairs
@@ -92,8 +172,11 @@ class ReadonlyDict:
 
     ReadonlyDictObject.key1 returns another ReadonlyDict object 
     with only the nested values
+
+    Every nested path is indexed when the object is created,
+    so nested lookups cost a single dictionary lookup
     """
-    __slots__ = '_dict',
+    __slots__ = '_dict', '__path_index__', '__content_hash__'
 
     @typing.overload
     def __init__(self, values: dict[str, typing.Any] = None) -> None:
@@ -124,6 +207,12 @@ class ReadonlyDict:
     def __getitem__(self, name: tuple[str]) -> typing.Any:
         """Get nested item from tuple of keys"""
     
+    def content_hash(self) -> str:
+        """
+        Stable hash of every (nested) value, computed when the object is created;
+        see content_hash
+        """
+
     def __setattr__(self, name: str, value: typing.Any) -> None:
         """
         Does not support attribute assignment
@@ -178,23 +267,81 @@ class SingletonType(type):
             clsdict: dict,
             ) -> SingletonType:
         """
-        Updates clsdict with _instance attribute
+        Updates clsdict with _instance and _instance_lock attributes
         """
     
     def __call__(cls: type[T], *args, **kwargs) -> T:
         """
         Overrides call phrasing of __new__ to prevent __init__ calls
+        after the first
         """
     
     def get_instance(cls, *args, **kwargs) -> T:
         """
-        Uses _instance attribute to check if an instance already exists
+        Uses _instance attribute to check if an instance already exists,
+        constructing it (only once, even across threads) if not
         """
 
 
 def avg(*args: typing.Any) -> typing.Any:
     """
-    Returns the average of the given arguments
+    Returns the average of the given arguments,
+    or of the items of a single iterable argument
+    """
+
+
+class Aggregate:
+    """
+    Summary of a group's values (e.g. one reading from every motor of a group)
+    """
+    __slots__ = 'count', 'mean', 'min', 'max', 'values'
+    count: int
+    mean: float
+    min: float
+    max: float
+    values: array
+
+    def __init__(self, count: int, mean: float, min: float, max: float, values: array) -> None: ...
+
+    @property
+    def spread(self) -> float:
+        """
+        max - min
+        """
+
+
+def aggregate(values: typing.Iterable[float]) -> Aggregate:
+    """
+    Count, mean, min, max and per-member values of an iterable, in a single pass
+    (without building a list first); raises ValueError when it is empty
+    """
+
+
+@typing.overload
+def aggregate_method_wrapper(
+        method: typing.Callable,
+        object_list: list,
+        tick: typing.Optional[typing.Callable[[], typing.Hashable]] = None,
+        ) -> typing.Callable[..., Aggregate]:
+    """
+    Wraps the given method so that a call aggregates its result for every object in object_list.
+
+    If tick is given, the Aggregate is computed once per value of tick() (and arguments)
+    and the same object returned for every other call in that tick.
+    """
+
+@typing.overload
+def aggregate_method_wrapper(
+        attr_name: str,
+        object_list: list,
+        tick: typing.Optional[typing.Callable[[], typing.Hashable]] = None,
+        ) -> typing.Callable[..., Aggregate]:
+    """
+    Wraps the given attribute (called if callable) so that a call aggregates it
+    for every object in object_list.
+
+    If tick is given, the Aggregate is computed once per value of tick() (and arguments)
+    and the same object returned for every other call in that tick.
     """
 
 
@@ -0,0 +1,216 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    # Result paths are relative to the caller, so src is added without changing directory
+    import os
+    import site
+    import sys
+    # This directory's ctre.py would otherwise shadow the ctre package
+    sys.path.pop(0)
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+from typing import Callable, NamedTuple, Optional
+
+
+class Benchmark(NamedTuple):
+    name: str
+    func: Callable[[], object]
+    # Runs inside every loop tick; gates --compare
+    hot: bool = True
+
+
+class StubTalonFX:
+    """Stands in for a ctre.WPI_TalonFX with the methods the benchmarks dispatch to"""
+
+    def __init__(self, deviceID: int) -> None:
+        self.mDeviceID = deviceID
+        self.mOutput = 0.
+        self.mPosition = float(deviceID * 100)
+
+    def getSelectedSensorPosition(self, pidIdx: int = 0) -> float:
+        return self.mPosition
+
+    def getStatorCurrent(self) -> float:
+        return 10. + self.mDeviceID
+
+    def isAlive(self) -> bool:
+        return True
+
+    def set(self, output: float) -> None:
+        self.mOutput = output
+
+    def configOpenloopRamp(self, seconds: float, timeoutMs: int = 0) -> int:
+        return 0
+
+
+class StubCollection:
+    __slots__ = 'mMotorList',
+
+    def __init__(self, *motors: StubTalonFX) -> None:
+        self.mMotorList = list(motors)
+
+
+def collectBenchmarks() -> list[Benchmark]:
+    from lib.python.utils import (
+        DeadzoneCurve,
+        ReadonlyDict,
+        aggregate_method_wrapper,
+        clamp,
+        deadzone,
+        optional_average_method_wrapper,
+    )
+    from lib.robotpy.ctre import buildDispatchTable
+    from lib.robotpy.utils import ConstantsClass
+
+    benchmarks = []
+
+    curve = DeadzoneCurve()
+    benchmarks += [
+        Benchmark('deadzone', lambda: deadzone(0.5)),
+        Benchmark('DeadzoneCurve.__call__', lambda: curve(0.5)),
+        Benchmark('clamp', lambda: clamp(0.5, -1, 1)),
+    ]
+
+    values = {
+        'first': 1,
+        'string': 'abcde',
+        'int_list': [5, 6, 7, 8, 9],
+        'dict': {'negative1': -1, 'nested': {'value': 2}},
+    }
+    readonly = ReadonlyDict(values)
+    benchmarks += [
+        Benchmark('ReadonlyDict construction', lambda: ReadonlyDict(values), hot=False),
+        Benchmark('ReadonlyDict[key]', lambda: readonly['first']),
+        Benchmark('ReadonlyDict[path]', lambda: readonly['dict', 'nested', 'value']),
+        Benchmark('ReadonlyDict.attribute', lambda: readonly.dict.negative1),
+    ]
+
+    class Constants(ConstantsClass):
+        kValue = 1
+        kIDs = (1, 2, 3)
+
+        class kNested(ConstantsClass):
+            kGain = 0.5
+
+    benchmarks += [
+        Benchmark('ConstantsClass[key]', lambda: Constants['kValue']),
+        Benchmark('ConstantsClass[path]', lambda: Constants['kNested', 'kGain']),
+        Benchmark('ConstantsClass[tuple index]', lambda: Constants['kIDs', 1]),
+        Benchmark('ConstantsClass.attribute', lambda: Constants.kNested.kGain),
+    ]
+
+    motors = [StubTalonFX(i) for i in range(4)]
+    averageMethod = optional_average_method_wrapper(StubTalonFX.getSelectedSensorPosition, motors)
+    averageName = optional_average_method_wrapper('getSelectedSensorPosition', motors)
+    aggregateMethod = aggregate_method_wrapper(StubTalonFX.getSelectedSensorPosition, motors)
+    tick = 0
+    cachedAggregate = aggregate_method_wrapper(StubTalonFX.getSelectedSensorPosition, motors, tick=lambda: tick)
+    benchmarks += [
+        Benchmark('optional_average_method_wrapper(method, average)', lambda: averageMethod(average=True)),
+        Benchmark('optional_average_method_wrapper(method, list)', lambda: averageMethod()),
+        Benchmark('optional_average_method_wrapper(name, average)', lambda: averageName(average=True)),
+        Benchmark('aggregate_method_wrapper', lambda: aggregateMethod()),
+        Benchmark('aggregate_method_wrapper(tick) hit', lambda: cachedAggregate()),
+    ]
+
+    # The same dispatchers WPI_TalonFXCollection installs, built for the stub
+    table = buildDispatchTable(StubTalonFX, StubCollection)
+    for name, dispatcher in table.items():
+        setattr(StubCollection, name, dispatcher)
+    collection = StubCollection(*motors)
+    benchmarks += [
+        Benchmark('WPI_TalonFXCollection get* (mean)', lambda: collection.getSelectedSensorPosition()),
+        Benchmark('WPI_TalonFXCollection get* (max)', lambda: collection.getStatorCurrent(mode='max')),
+        Benchmark('WPI_TalonFXCollection get* (stats)', lambda: collection.getStatorCurrent(mode='stats')),
+        Benchmark('WPI_TalonFXCollection is* (all)', lambda: collection.isAlive()),
+        Benchmark('WPI_TalonFXCollection fan-out', lambda: collection.set(0.5)),
+        Benchmark('WPI_TalonFXCollection config*', lambda: collection.configOpenloopRamp(0.2), hot=False),
+    ]
+
+    return benchmarks
+
+
+def run(benchmarks: list[Benchmark], repeat: int = 5, minTime: float = 0.05) -> dict[str, float]:
+    """Best-of-repeat nanoseconds per call for each benchmark"""
+    results = {}
+    for benchmark in benchmarks:
+        timer = timeit.Timer(benchmark.func)
+        number, elapsed = timer.autorange()
+        number = max(number, int(number * minTime / max(elapsed, 1e-9)))
+        best = min(timer.repeat(repeat, number))
+        results[benchmark.name] = best / number * 1e9
+    return results
+
+
+def compare(
+        results: dict[str, float],
+        baseline: dict[str, float],
+        hot: set[str],
+        threshold: float,
+        ) -> tuple[str, list[str]]:
+    """Report of results against baseline, and the hot benchmarks slower by more than threshold"""
+    lines = [f'{"benchmark":<52}{"baseline ns":>13}{"now ns":>10}{"change":>9}']
+    regressions = []
+    for name, ns in results.items():
+        before = baseline.get(name)
+        if before is None:
+            lines.append(f'{name:<52}{"-":>13}{ns:>10.0f}{"new":>9}')
+            continue
+        change = ns / before - 1
+        flag = ''
+        if name in hot and change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        lines.append(f'{name:<52}{before:>13.0f}{ns:>10.0f}{change:>+9.0%}{flag}')
+    return '\n'.join(lines), regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the helpers used every loop tick')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON (from --output) to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fractional slowdown of a hot benchmark that fails --compare')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    benchmarks = [benchmark for benchmark in collectBenchmarks() if args.filter in benchmark.name]
+    results = run(benchmarks, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'python': sys.version,
+                'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'ns_per_call': results,
+            }, file, indent=1)
+
+    if not args.compare:
+        for name, ns in results.items():
+            print(f'{name:<52}{ns:>10.0f} ns')
+        return 0
+
+    with open(args.compare) as file:
+        baseline = json.load(file)['ns_per_call']
+    report, regressions = compare(
+        results,
+        baseline,
+        {benchmark.name for benchmark in benchmarks if benchmark.hot},
+        args.threshold,
+    )
+    print(report)
+    if regressions:
+        print(f'{len(regressions)} hot path(s) regressed by more than {args.threshold:.0%}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import concurrent.futures
+import json
+import os
+from typing import Any, Callable, Mapping, NamedTuple
+
+
+class Parameter(NamedTuple):
+    # write(device, value, timeoutMs) -> ErrorCode (or None when the setter returns nothing)
+    write: Callable[[Any, Any, int], Any]
+    # Stored on the device through reboots; otherwise written on every boot
+    persistent: bool = True
+
+
+def talonFXParameters() -> dict[str, Parameter]:
+    """Parameters understood by ConfigurationStage for ctre.WPI_TalonFX devices"""
+    import ctre
+
+    return {
+        'openLoopRamp': Parameter(lambda device, value, timeoutMs: device.configOpenloopRamp(value, timeoutMs)),
+        'closedLoopRamp': Parameter(lambda device, value, timeoutMs: device.configClosedloopRamp(value, timeoutMs)),
+        'peakOutputForward': Parameter(lambda device, value, timeoutMs: device.configPeakOutputForward(value, timeoutMs)),
+        'peakOutputReverse': Parameter(lambda device, value, timeoutMs: device.configPeakOutputReverse(value, timeoutMs)),
+        'neutralDeadband': Parameter(lambda device, value, timeoutMs: device.configNeutralDeadband(value, timeoutMs)),
+        'voltageCompSaturation': Parameter(lambda device, value, timeoutMs: device.configVoltageCompSaturation(value, timeoutMs)),
+        # (enable, currentLimit, triggerThresholdCurrent, triggerThresholdTime)
+        'supplyCurrentLimit': Parameter(lambda device, value, timeoutMs: device.configSupplyCurrentLimit(ctre.SupplyCurrentLimitConfiguration(*value), timeoutMs)),
+        'statorCurrentLimit': Parameter(lambda device, value, timeoutMs: device.configStatorCurrentLimit(ctre.StatorCurrentLimitConfiguration(*value), timeoutMs)),
+        # (slot, value)
+        'kP': Parameter(lambda device, value, timeoutMs: device.config_kP(*value, timeoutMs)),
+        'kI': Parameter(lambda device, value, timeoutMs: device.config_kI(*value, timeoutMs)),
+        'kD': Parameter(lambda device, value, timeoutMs: device.config_kD(*value, timeoutMs)),
+        'kF': Parameter(lambda device, value, timeoutMs: device.config_kF(*value, timeoutMs)),
+        # Name of a ctre.NeutralMode member
+        'neutralMode': Parameter(lambda device, value, timeoutMs: device.setNeutralMode(getattr(ctre.NeutralMode, value)), False),
+        'inverted': Parameter(lambda device, value, timeoutMs: device.setInverted(value), False),
+    }
+
+
+def _normalize(value: Any) -> Any:
+    # Compare values as they come back out of the JSON cache (tuples become lists, etc.)
+    return json.loads(json.dumps(value))
+
+
+def _succeeded(code: Any) -> bool:
+    return code is None or int(code) == 0
+
+
+class ConfigurationStage:
+    """
+    Writes device configurations at boot, skipping what is already applied
+
+    The last successfully applied value of every persistent parameter
+    is cached on disk per device ID; only parameters which differ from the cache
+    (or every parameter of a device which reports a reset) are written,
+    spread across a thread pool with a per-write timeout and retries.
+    Non-persistent parameters are written on every boot.
+    """
+
+    def __init__(
+            self,
+            cachePath: str,
+            parameters: Mapping[str, Parameter],
+            timeoutMs: int = 50,
+            retries: int = 3,
+            workers: int = 4,
+            ) -> None:
+        self.mCachePath = cachePath
+        self.mParameters = parameters
+        self.mTimeoutMs = timeoutMs
+        self.mRetries = retries
+        self.mWorkers = workers
+
+    def loadCache(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.mCachePath) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def saveCache(self, cache: dict[str, dict[str, Any]]) -> None:
+        temporaryPath = self.mCachePath + '.tmp'
+        with open(temporaryPath, 'w') as file:
+            json.dump(cache, file, indent=1, sort_keys=True)
+        os.replace(temporaryPath, self.mCachePath)
+
+    def diff(
+            self,
+            cached: Mapping[str, Any],
+            desired: Mapping[str, Any],
+            reset: bool = False,
+            ) -> dict[str, Any]:
+        """Parameters of desired which need writing to a device"""
+        unknown = set(desired) - set(self.mParameters)
+        if unknown:
+            raise KeyError(f'Unknown configuration parameters {sorted(unknown)}')
+
+        return {
+            name: value
+            for name, value in desired.items()
+            if reset
+            or not self.mParameters[name].persistent
+            or name not in cached
+            or cached[name] != _normalize(value)
+        }
+
+    def _write(self, device: Any, changes: Mapping[str, Any]) -> dict[str, bool]:
+        results = {}
+        for name, value in changes.items():
+            write = self.mParameters[name].write
+            for _ in range(self.mRetries):
+                try:
+                    if _succeeded(write(device, value, self.mTimeoutMs)):
+                        results[name] = True
+                        break
+                except Exception:
+                    pass
+            else:
+                results[name] = False
+        return results
+
+    def apply(
+            self,
+            configurations: Mapping[int, tuple[Any, Mapping[str, Any]]],
+            force: bool = False,
+            timeout: float = 5.,
+            ) -> dict[int, dict[str, bool]]:
+        """
+        Writes each device's changed parameters, given {deviceID: (device, {parameter: value})};
+        returns {deviceID: {parameter: succeeded}} for every parameter written
+
+        Devices which haven't finished within timeout seconds are reported as failed
+        and left out of the cache, so they are written again next boot
+        """
+        cache = {} if force else self.loadCache()
+        writes = {}
+        for deviceID, (device, desired) in configurations.items():
+            hasReset = getattr(device, 'hasResetOccurred', None)
+            reset = hasReset() if hasReset is not None else False
+            changes = self.diff(cache.get(str(deviceID), {}), desired, reset)
+            if changes:
+                writes[deviceID] = (device, changes)
+
+        results = {}
+        if writes:
+            executor = concurrent.futures.ThreadPoolExecutor(self.mWorkers, 'ConfigurationStage')
+            futures = {
+                executor.submit(self._write, device, changes): deviceID
+                for deviceID, (device, changes) in writes.items()
+            }
+            done, _ = concurrent.futures.wait(futures, timeout)
+            # Don't wait on stuck writes; their devices count as failed
+            executor.shutdown(wait=False)
+
+            for future, deviceID in futures.items():
+                if future in done:
+                    results[deviceID] = future.result()
+                else:
+                    results[deviceID] = dict.fromkeys(writes[deviceID][1], False)
+
+        for deviceID, (_, desired) in configurations.items():
+            applied = cache.setdefault(str(deviceID), {})
+            for name, succeeded in results.get(deviceID, {}).items():
+                if not self.mParameters[name].persistent:
+                    continue
+                if succeeded:
+                    applied[name] = _normalize(desired[name])
+                else:
+                    applied.pop(name, None)
+
+        if writes or force:
+            self.saveCache(cache)
+        return results
+
+
+if __name__ == '__main__':
+    import tempfile
+    import threading
+    import time
+
+    print('Testing lib.robotpy.configuration')
+
+    class StubDevice:
+        """Simulated CAN device; fails the first `failures` writes, each write takes `latency` seconds"""
+        def __init__(self, failures=0, latency=0.):
+            self.failures = failures
+            self.latency = latency
+            self.values = {}
+            self.writes = 0
+            self.reset = False
+            self.lock = threading.Lock()
+
+        def hasResetOccurred(self):
+            return self.reset
+
+        def configure(self, name, value):
+            time.sleep(self.latency)
+            with self.lock:
+                self.writes += 1
+                if self.failures:
+                    self.failures -= 1
+                    return 1
+                self.values[name] = value
+                return 0
+
+    parameters = {
+        'openLoopRamp': Parameter(lambda device, value, timeoutMs: device.configure('openLoopRamp', value)),
+        'supplyCurrentLimit': Parameter(lambda device, value, timeoutMs: device.configure('supplyCurrentLimit', value)),
+        'inverted': Parameter(lambda device, value, timeoutMs: device.configure('inverted', value), False),
+    }
+    desired = {'openLoopRamp': 0.2, 'supplyCurrentLimit': (True, 40, 60, 0.1), 'inverted': False}
+
+    with tempfile.TemporaryDirectory() as directory:
+        stage = ConfigurationStage(os.path.join(directory, 'cache.json'), parameters, retries=3, workers=4)
+        devices = {1: StubDevice(failures=2), 2: StubDevice(), 3: StubDevice(latency=1.)}
+
+        try:
+            # First boot: everything is written, the slow device times out
+            results = stage.apply({i: (device, desired) for i, device in devices.items()}, timeout=0.5)
+            assert results[1] == results[2] == dict.fromkeys(desired, True)
+            assert results[3] == dict.fromkeys(desired, False)
+            assert devices[1].writes == 5
+
+            # Second boot: only non-persistent parameters, plus whatever didn't make it last time
+            devices[3].latency = 0
+            time.sleep(1)
+            results = stage.apply({i: (device, desired) for i, device in devices.items()})
+            assert results[1] == results[2] == {'inverted': True}
+            assert results[3] == dict.fromkeys(desired, True)
+
+            # A changed constant or a reset device is rewritten
+            devices[2].reset = True
+            results = stage.apply({
+                1: (devices[1], {**desired, 'openLoopRamp': 0.5}),
+                2: (devices[2], desired),
+            })
+            assert results[1] == {'openLoopRamp': True, 'inverted': True}
+            assert results[2] == dict.fromkeys(desired, True)
+        except AssertionError:
+            print('ConfigurationStage test failed')
+            raise
+
+    print('configuration.py tests succeded')
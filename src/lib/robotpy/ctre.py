@@ -1,10 +1,16 @@
-import functools
-from typing import Any, Callable, Union, final
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from typing import Any, Callable, Optional, Union, final
 import ctre
 import wpilib
 from wpilib import SpeedControllerGroup
 
-from lib.python.utils import optional_average_method_wrapper
+from lib.python.utils import Aggregate, aggregate, aggregate_method_wrapper
+from lib.robotpy import snapshot
 
 
 def getTalonEncoders(*talons: ctre.WPI_TalonFX
@@ -14,39 +20,109 @@ def getTalonEncoders(*talons: ctre.WPI_TalonFX
         ]:
     if len(talons) == 1:
         return talons[0].getSensorCollection()
+    return tuple(talon.getSensorCollection() for talon in talons)
+
+
+# Prefixes of WPI_TalonFX methods whose per-motor results get aggregated;
+# every other method is fanned out to each motor
+AGGREGATE_PREFIXES = ('get', 'is', 'has')
+AGGREGATE_MODES = ('mean', 'min', 'max', 'stats', 'all')
+# Return types which get* methods average by default: measurements.
+# int getters return IDs, versions and counts, whose mean means nothing
+MEASUREMENT_RETURN_TYPES = ('float',)
+
+
+def _returnType(method: Callable) -> Optional[str]:
+    """Name of method's return type, from its annotations or pybind11 signature; None if unknown"""
+    annotation = getattr(method, '__annotations__', {}).get('return')
+    if annotation is not None:
+        return annotation if isinstance(annotation, str) else getattr(annotation, '__name__', None)
+    # e.g. 'getStatorCurrent(self: ctre._ctre.WPI_TalonFX) -> float';
+    # overloaded methods start with a generic '(*args, **kwargs)' line instead
+    signature = (getattr(method, '__doc__', None) or '').lstrip().split('\n', 1)[0]
+    if signature.startswith(f'{method.__name__}(') and ') -> ' in signature:
+        return signature.rsplit(') -> ', 1)[1].strip()
+    return None
+
+
+def returnsMeasurement(method: Callable) -> bool:
+    return _returnType(method) in MEASUREMENT_RETURN_TYPES
+
+
+def makeAggregateDispatcher(method: Callable, default_mode: str = 'mean') -> Callable:
+    if default_mode not in AGGREGATE_MODES:
+        raise ValueError(f'mode must be one of {AGGREGATE_MODES}, not {default_mode!r}')
+
+    def dispatcher(self, *args, mode: str = default_mode, **kwargs):
+        motors = self.mMotorList
+        if mode == 'mean':
+            total = 0
+            for motor in motors:
+                total += method(motor, *args, **kwargs)
+            return total / len(motors)
+        if mode == 'all':
+            return [method(motor, *args, **kwargs) for motor in motors]
+        if mode == 'stats':
+            return aggregate(method(motor, *args, **kwargs) for motor in motors)
+        if mode == 'min':
+            result = None
+            for motor in motors:
+                value = method(motor, *args, **kwargs)
+                if result is None or value < result:
+                    result = value
+            return result
+        if mode == 'max':
+            result = None
+            for motor in motors:
+                value = method(motor, *args, **kwargs)
+                if result is None or value > result:
+                    result = value
+            return result
+        raise ValueError(f'mode must be one of {AGGREGATE_MODES}, not {mode!r}')
+
+    dispatcher.__name__ = method.__name__
+    dispatcher.__doc__ = method.__doc__
+    return dispatcher
 
 
-# def optional_average_map_wrapper(
-#         method_or_attr_name: Union[Callable, str],
-#         object_list: list,
-#         average_default = False,
-#         ) -> Callable:
-    
-#     if callable(method_or_attr_name):
-#         @functools.wraps(method_or_attr_name)
-#         def wrapper(*args, average=average_default, **kwargs):
-#             val_list = [method_or_attr_name(self, *args, **kwargs) for self in object_list]
-#             if average:
-#                 return avg(val_list)
-#             return val_list
-        
-#         return wrapper
-    
-#     def wrapper(*args, average=average_default, **kwargs):
-#         attr_list = []
-        
-#         for obj in object_list:
-#             attr = getattr(obj, method_or_attr_name)
-#             if callable(attr):
-#                 attr_list.append(attr(*args, **kwargs))
-#             else:
-#                 attr_list.append(attr)
-    
-#         if average:
-#             return avg(attr_list)
-#         return attr_list
-
-#     return wrapper
+def makeFanOutDispatcher(method: Callable, collect: bool = False) -> Callable:
+    if collect:
+        def dispatcher(self, *args, **kwargs):
+            return [method(motor, *args, **kwargs) for motor in self.mMotorList]
+    else:
+        def dispatcher(self, *args, **kwargs):
+            for motor in self.mMotorList:
+                method(motor, *args, **kwargs)
+
+    dispatcher.__name__ = method.__name__
+    dispatcher.__doc__ = method.__doc__
+    return dispatcher
+
+
+def buildDispatchTable(motor_cls: type, group_cls: type) -> dict[str, Callable]:
+    """
+    Builds one dispatcher per public callable of motor_cls
+    not already provided by group_cls
+    """
+    table = {}
+    for name in dir(motor_cls):
+        if name.startswith('_') or hasattr(group_cls, name):
+            continue
+
+        method = getattr(motor_cls, name)
+        if not callable(method):
+            continue
+
+        if name.startswith(AGGREGATE_PREFIXES):
+            # Boolean queries, and getters of ints (IDs, firmware versions), of objects
+            # (sensor collections, faults, enums) or of unknown types, have no meaningful mean
+            default_mode = 'mean' if name.startswith('get') and returnsMeasurement(method) else 'all'
+            table[name] = makeAggregateDispatcher(method, default_mode)
+        else:
+            # config* methods return an ErrorCode per motor worth checking
+            table[name] = makeFanOutDispatcher(method, name.startswith('config'))
+    return table
+
 
 @final
 class WPI_TalonFXCollection(wpilib.SpeedControllerGroup):
@@ -54,10 +130,17 @@ class WPI_TalonFXCollection(wpilib.SpeedControllerGroup):
     SpeedControllerGroup for a list of WPI_TalonFXs.
 
     Has the same methods as a WPI_TalonFX and SpeedControllerGroup and can be treated as one.
+
+    WPI_TalonFX methods are installed on the class once, at import:
+    get*/is*/has* methods aggregate each motor's result
+    (mode='mean', 'min', 'max', 'stats' for an Aggregate of them all
+    or 'all' for the per-motor list; float getters default to 'mean', the rest to 'all'),
+    all other methods are called on every motor in turn.
     """
-    __slots__ = 'mMotorList',
+    __slots__ = 'mMotorList', 'mAggregators'
 
     def __init__(self, *args: Union[int, ctre.WPI_TalonFX]) -> None:
+        self.mAggregators = {}
         self.mMotorList = []
         for arg in args:
             if isinstance(arg, int):
@@ -66,26 +149,36 @@ class WPI_TalonFXCollection(wpilib.SpeedControllerGroup):
                 self.mMotorList.append(arg)
 
         SpeedControllerGroup.__init__(self, *self.mMotorList)
-    
-    def __getattr__(self, name: str, list_: bool = False) -> Any:
-        
-        if hasattr(ctre.WPI_TalonFX, name):
-            if list_:
-                return [getattr(talon, name) for talon in self.mMotorList]
 
-            if callable(getattr(ctre.WPI_TalonFX, name)):
-                return optional_average_method_wrapper(
-                    name,
-                    self.mMotorList,
-                    True,
-                )
-            
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes missing from the dispatch table,
+        # i.e. non-callable WPI_TalonFX attributes
+        if hasattr(ctre.WPI_TalonFX, name):
             return [getattr(motor, name) for motor in self.mMotorList]
-        
+
         raise AttributeError(f'{self.__class__.__name__} has no attribute {name}')
-    
+
+    def aggregator(self, name: str) -> Callable[..., Aggregate]:
+        """
+        Aggregate of a WPI_TalonFX getter over every motor,
+        read at most once per robot loop (per arguments) however often it is called;
+        one wrapper (and so one cache) per name, shared by every caller
+        """
+        wrapper = self.mAggregators.get(name)
+        if wrapper is None:
+            wrapper = self.mAggregators[name] = aggregate_method_wrapper(
+                getattr(ctre.WPI_TalonFX, name), self.mMotorList, tick=snapshot.getTick)
+        return wrapper
+
     def get_talon_attr(self, name: str, list_: bool = False) -> Any:
-        return self.__getattr__(name, list_)
+        if list_:
+            return [getattr(motor, name) for motor in self.mMotorList]
+        return getattr(self, name)
+
+
+for _name, _dispatcher in buildDispatchTable(ctre.WPI_TalonFX, SpeedControllerGroup).items():
+    setattr(WPI_TalonFXCollection, _name, _dispatcher)
+del _name, _dispatcher
 
 
 # @final
@@ -101,13 +194,43 @@ class WPI_TalonFXCollection(wpilib.SpeedControllerGroup):
 #     def __getattribute__(self, name: str) -> Any:
 #         if name in __class__.__slots__:
 #             return object.__getattribute__(self, name)
-        
+
 #         super_attr = ctre.TalonFXSensorCollection.__getattribute__(name)
-        
+
 #         if callable(super_attr):
 #             return optional_average_method_wrapper(
 #                 name,
 #                 self.mSensors,
 #             )
-        
-#         return super_attr
\ No newline at end of file
+
+#         return super_attr
+
+
+if __name__ == '__main__':
+    import timeit
+
+    from lib.python.utils import optional_average_method_wrapper
+
+    print('Benchmarking lib.robotpy.ctre')
+
+    collection = WPI_TalonFXCollection(1, 2, 3)
+    motors = collection.mMotorList
+    number = 20_000
+
+    def previous():
+        # What WPI_TalonFXCollection.__getattr__ did on every access
+        if hasattr(ctre.WPI_TalonFX, 'getSelectedSensorPosition'):
+            if callable(getattr(ctre.WPI_TalonFX, 'getSelectedSensorPosition')):
+                return optional_average_method_wrapper(
+                    'getSelectedSensorPosition',
+                    motors,
+                )()
+
+    def current():
+        return collection.getSelectedSensorPosition(mode='all')
+
+    assert previous() == current()
+
+    for label, func in (('before', previous), ('after', current)):
+        seconds = min(timeit.repeat(func, number=number, repeat=5))
+        print(f'{label:>6}: {number / seconds:12,.0f} calls/s')
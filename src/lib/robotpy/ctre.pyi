@@ -3,6 +3,8 @@ import typing
 import ctre
 import wpilib
 
+from lib.python.utils import Aggregate
+
 
 def getTalonEncoders(
         *talons: ctre.WPI_TalonFX
@@ -15,6 +17,63 @@ def getTalonEncoders(
     """
 
 
+AGGREGATE_PREFIXES: tuple[str, ...]
+AGGREGATE_MODES: tuple[str, ...]
+MEASUREMENT_RETURN_TYPES: tuple[str, ...]
+
+
+def returnsMeasurement(method: typing.Callable) -> bool:
+    """
+    Whether method returns one of MEASUREMENT_RETURN_TYPES (float), going by its return annotation
+    or, for pybind11 methods, the signature on the first line of its docstring.
+
+    False when the return type can't be determined.
+    """
+
+
+def makeAggregateDispatcher(
+        method: typing.Callable,
+        default_mode: str = 'mean',
+        ) -> typing.Callable:
+    """
+    Wraps an unbound motor method so that calling it on a collection
+    calls it on every motor in collection.mMotorList and aggregates the results.
+
+    The returned dispatcher takes a mode keyword argument:
+    'mean', 'min' and 'max' reduce the results in a single loop,
+    'stats' returns an Aggregate (mean, min, max, spread and per-motor values) from one loop,
+    'all' returns the list of per-motor results.
+    """
+
+
+def makeFanOutDispatcher(
+        method: typing.Callable,
+        collect: bool = False,
+        ) -> typing.Callable:
+    """
+    Wraps an unbound motor method so that calling it on a collection
+    calls it on every motor in collection.mMotorList.
+
+    Returns None, or the list of per-motor results if collect is True.
+    """
+
+
+def buildDispatchTable(
+        motor_cls: type,
+        group_cls: type,
+        ) -> dict[str, typing.Callable]:
+    """
+    Builds one dispatcher per public callable of motor_cls
+    not already provided by group_cls.
+
+    get*/is*/has* methods become aggregate dispatchers
+    (defaulting to 'mean' for get* methods which return a float and 'all' otherwise,
+    including int getters such as getDeviceID and getFirmwareVersion),
+    config* methods become collecting fan-out dispatchers
+    and all other methods become plain fan-out dispatchers.
+    """
+
+
 @typing.final
 class WPI_TalonFXCollection(wpilib.SpeedControllerGroup, ctre.WPI_TalonFX):
     """
@@ -22,10 +81,23 @@ class WPI_TalonFXCollection(wpilib.SpeedControllerGroup, ctre.WPI_TalonFX):
 
     Has the same methods as a WPI_TalonFX and SpeedControllerGroup and can be treated as one.
     """
-    __slots__ = 'mMotorList',
+    __slots__ = 'mMotorList', 'mAggregators'
 
     def __init__(self, *args: typing.Union[int, ctre.WPI_TalonFX]) -> None: ...
 
+    def aggregator(self, name: str) -> typing.Callable[..., Aggregate]:
+        """
+        Aggregate of a WPI_TalonFX getter over every motor,
+        read at most once per robot loop (per arguments) however often it is called;
+        one wrapper (and so one cache) per name, shared by every caller
+        """
+
+    def get_talon_attr(self, name: str, list_: bool = False) -> typing.Any:
+        """
+        Gets an attribute through the dispatch table,
+        or the list of each motor's raw attribute if list_ is True
+        """
+
 
 # @typing.final
 # class TalonFXSensorCollectionCollection():
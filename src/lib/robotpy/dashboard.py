@@ -0,0 +1,315 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import math
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import numpy
+
+
+# Field types: double, boolean and string NetworkTables entries
+FIELD_TYPES = 'd?s'
+
+
+class NetworkTablesSink:
+    """Writes fields to entries of one NetworkTables table"""
+
+    def __init__(self, tableName: str, networkTables=None) -> None:
+        if networkTables is None:
+            from networktables import NetworkTables as networkTables
+        self.mNetworkTables = networkTables
+        self.mTable = networkTables.getTable(tableName)
+
+    def setter(self, name: str, typecode: str) -> Callable[[Any], None]:
+        entry = self.mTable.getEntry(name)
+        if typecode == '?':
+            return lambda value: entry.setBoolean(bool(value))
+        if typecode == 's':
+            return entry.setString
+        return lambda value: entry.setDouble(float(value))
+
+    def flush(self) -> None:
+        self.mNetworkTables.flush()
+
+
+class DashboardPublisher:
+    """
+    Publishes registered fields to a dashboard, only when they change enough
+
+    The robot loop calls sample(), which only reads every field's getter into an
+    array. A background thread runs publish() every period: it compares the latest
+    sample with the values last published, in NumPy, and writes just the fields
+    which moved by more than their threshold, or which haven't been written for
+    maxInterval (so a dashboard which connects late still gets everything).
+    Strings are published whenever they change.
+    """
+
+    def __init__(self, period: float = 0.05, clock: Callable[[], float] = time.monotonic) -> None:
+        self.mPeriod = period
+        self.mClock = clock
+        self.mLock = threading.Lock()
+
+        self.mNames: list[str] = []
+        self.mTypecodes: list[str] = []
+        self.mGetters: list[Callable[[], Any]] = []
+        self.mThresholds: list[float] = []
+        self.mMaxIntervals: list[float] = []
+        self.mStringNames: list[str] = []
+        self.mStringGetters: list[Callable[[], str]] = []
+        self.mStringMaxIntervals: list[float] = []
+
+        # Latest sample and last published value and time of each field
+        self.mSampled = numpy.empty(0)
+        self.mLastValues = numpy.empty(0)
+        self.mLastTimes = numpy.empty(0)
+        self.mThresholdArray = numpy.empty(0)
+        self.mMaxIntervalArray = numpy.empty(0)
+        self.mStringSampled: list[Optional[str]] = []
+        self.mStringLastValues: list[Optional[str]] = []
+        self.mStringLastTimes: list[float] = []
+
+        self.mSink = None
+        self.mSetters: list[Callable[[Any], None]] = []
+        self.mStringSetters: list[Callable[[str], None]] = []
+
+        self.mPublished = 0
+        self.mSkipped = 0
+        self.mThread: Optional[threading.Thread] = None
+        self.mStop = threading.Event()
+
+    def addField(
+            self,
+            name: str,
+            getter: Callable[[], Any],
+            typecode: str = 'd',
+            threshold: float = 0.,
+            maxInterval: float = 1.,
+            ) -> None:
+        """
+        Registers a field; doubles and booleans are published when they change
+        by more than threshold, strings on any change
+        """
+        if typecode not in FIELD_TYPES:
+            raise ValueError(f'typecode must be one of {FIELD_TYPES!r}, not {typecode!r}')
+        if name in self.mNames or name in self.mStringNames:
+            raise ValueError(f'Field {name!r} already registered')
+
+        with self.mLock:
+            if typecode == 's':
+                self.mStringNames.append(name)
+                self.mStringGetters.append(getter)
+                self.mStringMaxIntervals.append(maxInterval)
+                if self.mSink is not None:
+                    self.mStringSetters.append(self.mSink.setter(name, typecode))
+            else:
+                self.mNames.append(name)
+                self.mTypecodes.append(typecode)
+                self.mGetters.append(getter)
+                # Booleans change by 1
+                self.mThresholds.append(min(threshold, 0.5) if typecode == '?' else threshold)
+                self.mMaxIntervals.append(maxInterval)
+                if self.mSink is not None:
+                    self.mSetters.append(self.mSink.setter(name, typecode))
+            self._build()
+
+    def _build(self) -> None:
+        """
+        Grows the arrays to the registered fields, keeping the state
+        of those already there; called with the lock held
+        """
+        count = len(self.mNames)
+        for name, fill in (('mSampled', math.nan), ('mLastValues', math.nan), ('mLastTimes', -math.inf)):
+            previous = getattr(self, name)
+            values = numpy.full(count, fill)
+            values[:len(previous)] = previous
+            setattr(self, name, values)
+        self.mThresholdArray = numpy.array(self.mThresholds, float)
+        self.mMaxIntervalArray = numpy.array(self.mMaxIntervals, float)
+
+        added = len(self.mStringNames) - len(self.mStringSampled)
+        self.mStringSampled += [None] * added
+        self.mStringLastValues += [None] * added
+        self.mStringLastTimes += [-math.inf] * added
+
+    def sample(self) -> None:
+        """Reads every field; called from the robot loop"""
+        values = [getter() for getter in self.mGetters]
+        strings = [getter() for getter in self.mStringGetters]
+        with self.mLock:
+            self.mSampled[:] = values
+            self.mStringSampled[:] = strings
+
+    def publish(self) -> int:
+        """Writes the fields which are due, returning how many were written"""
+        now = self.mClock()
+        # Fields may be added meanwhile, which replaces the arrays
+        with self.mLock:
+            current = self.mSampled.copy()
+            strings = list(self.mStringSampled)
+            last = self.mLastValues
+            lastTimes = self.mLastTimes
+            thresholds = self.mThresholdArray
+            maxIntervals = self.mMaxIntervalArray
+
+        due = (
+            (numpy.abs(current - last) > thresholds)
+            | (numpy.isnan(current) != numpy.isnan(last))
+            | (now - lastTimes >= maxIntervals)
+        )
+        # Never-sampled fields aren't written
+        due &= ~numpy.isnan(current)
+        indices = numpy.flatnonzero(due)
+
+        setters = self.mSetters
+        for i in indices.tolist():
+            setters[i](current[i])
+        # Into the current arrays, which only ever grow, so the indices still hold
+        with self.mLock:
+            self.mLastValues[indices] = current[indices]
+            self.mLastTimes[indices] = now
+        written = len(indices)
+
+        lastStrings = self.mStringLastValues
+        lastStringTimes = self.mStringLastTimes
+        for i, value in enumerate(strings):
+            if value is None:
+                continue
+            if value != lastStrings[i] or now - lastStringTimes[i] >= self.mStringMaxIntervals[i]:
+                self.mStringSetters[i](value)
+                lastStrings[i] = value
+                lastStringTimes[i] = now
+                written += 1
+
+        if written:
+            self.mSink.flush()
+        self.mPublished += written
+        self.mSkipped += len(current) + len(strings) - written
+        return written
+
+    def attach(self, sink) -> None:
+        """Creates every field's setter on sink; further fields are added to it as registered"""
+        with self.mLock:
+            self.mSink = sink
+            self.mSetters = [
+                sink.setter(name, typecode)
+                for name, typecode in zip(self.mNames, self.mTypecodes)
+            ]
+            self.mStringSetters = [sink.setter(name, 's') for name in self.mStringNames]
+
+    def start(self, sink) -> None:
+        """Attaches sink and publishes to it every period from a background thread"""
+        if self.mThread is not None:
+            return
+        self.attach(sink)
+        self.mStop.clear()
+        self.mThread = threading.Thread(target=self._run, name='DashboardPublisher', daemon=True)
+        self.mThread.start()
+
+    def stop(self) -> None:
+        if self.mThread is None:
+            return
+        self.mStop.set()
+        self.mThread.join()
+        self.mThread = None
+
+    def _run(self) -> None:
+        while not self.mStop.wait(self.mPeriod):
+            self.publish()
+
+    def getFieldNames(self) -> list[str]:
+        return [*self.mNames, *self.mStringNames]
+
+
+if __name__ == '__main__':
+    print('Testing lib.robotpy.dashboard')
+
+    class RecordingSink:
+        def __init__(self):
+            self.mWrites = []
+            self.mFlushes = 0
+
+        def setter(self, name, typecode):
+            return lambda value: self.mWrites.append((name, value))
+
+        def flush(self):
+            self.mFlushes += 1
+
+    now = [0.]
+    values = {'position': 1., 'enabled': False, 'command': 'Idle'}
+    publisher = DashboardPublisher(clock=lambda: now[0])
+    publisher.addField('position', lambda: values['position'], threshold=0.1, maxInterval=1.)
+    publisher.addField('enabled', lambda: values['enabled'], '?')
+    publisher.addField('command', lambda: values['command'], 's')
+    sink = RecordingSink()
+    publisher.attach(sink)
+
+    def step(seconds: float = 0.05) -> list:
+        now[0] += seconds
+        publisher.sample()
+        start = len(sink.mWrites)
+        publisher.publish()
+        return sink.mWrites[start:]
+
+    try:
+        assert publisher.publish() == 0
+
+        assert step() == [('position', 1.), ('enabled', 0.), ('command', 'Idle')]
+        assert step() == []
+        assert sink.mFlushes == 1
+
+        values['position'] = 1.05
+        assert step() == []
+        values['position'] = 1.2
+        assert step() == [('position', 1.2)]
+
+        values['enabled'] = True
+        values['command'] = 'Drive'
+        assert step() == [('enabled', 1.), ('command', 'Drive')]
+
+        # Everything is republished after maxInterval
+        assert {name for name, _ in step(1.)} == {'position', 'enabled', 'command'}
+
+        publisher.addField('late', lambda: 5.)
+        assert step() == [('late', 5.)]
+
+        # A field added during a publish doesn't lose what that publish wrote
+        setter = sink.setter
+        def addDuringPublish(name, typecode):
+            write = setter(name, typecode)
+            def set_(value):
+                write(value)
+                if name == 'position' and 'during' not in publisher.getFieldNames():
+                    publisher.addField('during', lambda: 1.)
+            return set_
+        sink.setter = addDuringPublish
+        publisher.attach(sink)
+        values['position'] = 2.
+        assert step() == [('position', 2.)]
+        assert step() == [('during', 1.)]
+
+        try:
+            publisher.addField('late', lambda: 5.)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('Duplicate fields must be rejected')
+
+        threaded = DashboardPublisher(period=0.01)
+        threaded.addField('value', lambda: 1.)
+        threadedSink = RecordingSink()
+        threaded.sample()
+        threaded.start(threadedSink)
+        time.sleep(0.1)
+        threaded.stop()
+        assert threadedSink.mWrites == [('value', 1.)]
+    except AssertionError:
+        print('DashboardPublisher test failed')
+        raise
+
+    print('dashboard.py tests succeded')
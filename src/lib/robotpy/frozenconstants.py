@@ -0,0 +1,283 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import hashlib
+import importlib
+import io
+import os
+import pickle
+from types import MappingProxyType, ModuleType
+from typing import Iterable, Optional
+
+from lib.python.utils import content_hash, remove_dunder_attrs
+from lib.robotpy.utils import ConstantsType
+
+
+# Bumped whenever the snapshot layout changes, which makes every snapshot stale
+kFormat = 1
+
+# Class attributes carried over from the live classes besides their constants
+_kClassAttributes = ('__module__', '__doc__', '__annotations__', '__content_hash__')
+
+
+def sourceHash(paths: Iterable[str]) -> str:
+    """Hash of the snapshot format and the contents of every file the constants depend on"""
+    digest = hashlib.blake2b(str(kFormat).encode(), digest_size=16)
+    for path in paths:
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def liveClasses(module: ModuleType) -> dict[str, ConstantsType]:
+    """The ConstantsClasses defined at the top level of module, by name"""
+    return {
+        name: value
+        for name, value in vars(module).items()
+        if isinstance(value, ConstantsType) and value.__module__ == module.__name__
+        and value.__qualname__ == name
+    }
+
+
+def _postOrder(classes: Iterable[ConstantsType]) -> list[ConstantsType]:
+    """Every class and its nested ConstantsClasses, nested ones first"""
+    ordered = []
+
+    def visit(cls: ConstantsType) -> None:
+        for value in remove_dunder_attrs(cls.__dict__).values():
+            if isinstance(value, ConstantsType) and value.__qualname__.startswith(f'{cls.__qualname__}.'):
+                visit(value)
+        ordered.append(cls)
+
+    for cls in classes:
+        visit(cls)
+    return ordered
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        # Classes are recreated from their own records, never pickled by reference
+        if isinstance(obj, ConstantsType):
+            return obj.__module__, obj.__qualname__
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, data: bytes, classes: dict[tuple[str, str], ConstantsType]) -> None:
+        super().__init__(io.BytesIO(data))
+        self.mClasses = classes
+
+    def persistent_load(self, pid):
+        cls = self.mClasses.get(pid)
+        if cls is not None:
+            return cls
+        # Constants classes from elsewhere, e.g. the ConstantsClass base
+        module, qualname = pid
+        obj = importlib.import_module(module)
+        for name in qualname.split('.'):
+            obj = getattr(obj, name)
+        return obj
+
+
+def _record(cls: ConstantsType) -> bytes:
+    clsdict = {
+        name: cls.__dict__[name]
+        for name in _kClassAttributes
+        if name in cls.__dict__
+    }
+    # Kept by the type itself rather than in its __dict__
+    clsdict['__qualname__'] = cls.__qualname__
+    clsdict.update(remove_dunder_attrs(cls.__dict__))
+    # MappingProxyTypes can't be pickled
+    clsdict['__path_index__'] = dict(cls.__path_index__)
+
+    file = io.BytesIO()
+    _Pickler(file, pickle.HIGHEST_PROTOCOL).dump((cls.__name__, cls.__bases__, clsdict))
+    return file.getvalue()
+
+
+def _createClass(data: bytes, classes: dict[tuple[str, str], ConstantsType]) -> ConstantsType:
+    name, bases, clsdict = _Unpickler(data, classes).load()
+    clsdict['__path_index__'] = MappingProxyType(clsdict['__path_index__'])
+    # Everything ConstantsType.__new__ would compute is already in clsdict
+    return super(ConstantsType, ConstantsType).__new__(ConstantsType, name, bases, clsdict)
+
+
+def validate(module: ModuleType) -> list[str]:
+    """Problems which would make a snapshot of module differ from it, e.g. values which can't be pickled"""
+    problems = []
+    ordered = _postOrder(liveClasses(module).values())
+    recreated = {}
+    for cls in ordered:
+        key = (cls.__module__, cls.__qualname__)
+        try:
+            copy = recreated[key] = _createClass(_record(cls), recreated)
+        except Exception as e:
+            problems.append(f'{cls.__qualname__} cannot be snapshotted: {e!r}')
+            continue
+        # The copy carries the stored hash, so it's recomputed from the copy's own values;
+        # nested copies are checked before the classes holding them
+        if content_hash(remove_dunder_attrs(copy.__dict__).items()) != cls.contentHash():
+            problems.append(f'{cls.__qualname__} changes when snapshotted')
+    return problems
+
+
+def build(module: ModuleType, sourcePaths: Iterable[str], path: str) -> None:
+    """Writes a snapshot of module's ConstantsClasses to path"""
+    snapshot = {
+        'hash': sourceHash(sourcePaths),
+        'records': [_record(cls) for cls in _postOrder(liveClasses(module).values())],
+    }
+    tempPath = f'{path}.tmp'
+    with open(tempPath, 'wb') as file:
+        pickle.dump(snapshot, file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tempPath, path)
+
+
+def isCurrent(sourcePaths: Iterable[str], path: str) -> bool:
+    try:
+        with open(path, 'rb') as file:
+            snapshot = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return False
+    return snapshot.get('hash') == sourceHash(sourcePaths)
+
+
+def load(sourcePaths: Iterable[str], path: str) -> Optional[dict[str, ConstantsType]]:
+    """
+    The top-level classes of a snapshot by name, created without running
+    ConstantsType.__new__; None if there is no snapshot or it is stale
+    """
+    try:
+        with open(path, 'rb') as file:
+            snapshot = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if snapshot.get('hash') != sourceHash(sourcePaths):
+        return None
+
+    classes = {}
+    for record in snapshot['records']:
+        cls = _createClass(record, classes)
+        classes[cls.__module__, cls.__qualname__] = cls
+    return {
+        qualname: cls
+        for (_, qualname), cls in classes.items()
+        if '.' not in qualname
+    }
+
+
+def loadOrImport(moduleName: str, sourcePaths: Iterable[str], path: str) -> dict[str, ConstantsType]:
+    """The snapshot's classes if it is current, otherwise those of the imported module"""
+    sourcePaths = tuple(sourcePaths)
+    classes = load(sourcePaths, path)
+    if classes is None:
+        classes = liveClasses(importlib.import_module(moduleName))
+    return classes
+
+
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    import textwrap
+    import warnings
+
+    print('Testing lib.robotpy.frozenconstants')
+
+    source = textwrap.dedent('''
+        from __future__ import annotations
+        from lib.robotpy.utils import ConstantsClass, IDList
+
+        class Drive(ConstantsClass):
+            """Drive constants"""
+            kIDs: IDList
+            kGain = 0.5
+            kPoints = ((1., 2.), (3., 4.))
+
+            class kNested(ConstantsClass):
+                kName = 'nested'
+                kLimits = (True, 40.)
+
+        class Other(ConstantsClass):
+            kDrive = Drive
+    ''')
+
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        sourcePath = os.path.join(directory, 'snapshotconstants.py')
+        snapshotPath = os.path.join(directory, 'snapshotconstants.snapshot')
+        with open(sourcePath, 'w') as file:
+            file.write(source)
+
+        try:
+            assert load((sourcePath,), snapshotPath) is None
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                live = importlib.import_module('snapshotconstants')
+            assert len(caught) == 1 and 'kIDs' in str(caught[0].message)
+            assert validate(live) == []
+
+            build(live, (sourcePath,), snapshotPath)
+            assert isCurrent((sourcePath,), snapshotPath)
+
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                frozen = load((sourcePath,), snapshotPath)
+            assert set(frozen) == {'Drive', 'Other'}
+            Drive = frozen['Drive']
+            assert Drive is not live.Drive
+            assert Drive.contentHash() == live.Drive.contentHash()
+            assert Drive.kGain == Drive['kGain'] == 0.5
+            assert Drive['kPoints', 1, 0] == 3.
+            assert Drive['kNested', 'kLimits', 1] == 40.
+            assert Drive.kNested['kName'] == 'nested'
+            assert Drive.kNested.__qualname__ == 'Drive.kNested'
+            assert Drive.kIDs == (0, 0)
+            assert Drive.__doc__ == 'Drive constants'
+            assert frozen['Other'].kDrive is Drive
+            assert Drive.keys() == live.Drive.keys()
+            assert Drive() is Drive
+            try:
+                Drive.kGain = 1.
+            except TypeError:
+                pass
+            else:
+                raise AssertionError('Snapshot classes must be nonwritable')
+
+            # Any change to the source makes the snapshot stale
+            with open(sourcePath, 'a') as file:
+                file.write('\n# changed\n')
+            assert not isCurrent((sourcePath,), snapshotPath)
+            assert loadOrImport('snapshotconstants', (sourcePath,), snapshotPath)['Drive'] is live.Drive
+
+            with open(os.path.join(directory, 'badconstants.py'), 'w') as file:
+                file.write(textwrap.dedent('''
+                    from lib.robotpy.utils import ConstantsClass
+
+                    class Bad(ConstantsClass):
+                        kCallback = lambda: 0
+                '''))
+            problems = validate(importlib.import_module('badconstants'))
+            assert len(problems) == 1 and problems[0].startswith('Bad cannot be snapshotted'), problems
+
+            with open(os.path.join(directory, 'changedconstants.py'), 'w') as file:
+                file.write(textwrap.dedent('''
+                    from lib.robotpy.utils import ConstantsClass
+
+                    class Changed(ConstantsClass):
+                        kSentinel = object()
+                '''))
+            problems = validate(importlib.import_module('changedconstants'))
+            assert problems == ['Changed changes when snapshotted'], problems
+        except AssertionError:
+            print('frozenconstants test failed')
+            raise
+        finally:
+            sys.path.remove(directory)
+
+    print('frozenconstants.py tests succeded')
@@ -0,0 +1,147 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import gc
+from time import perf_counter_ns
+from typing import Optional
+
+
+class GarbageCollectionPolicy:
+    """
+    Keeps the cyclic garbage collector out of the enabled robot loop
+
+    freeze() (end of robotInit) moves everything allocated so far, the subsystems,
+    commands and constants, into the permanent generation, so no later collection
+    traverses it. While enabled, automatic collection is disabled or limited to
+    the young generations by enabledThresholds; while disabled, the default
+    thresholds are restored and a full collection is run every collectPeriod,
+    so an enabled period starts with as little garbage as possible.
+
+    Collections are timed through gc.callbacks: getEnabledCollections() and
+    getMaxEnabledPauseMs() show whether any still happen during a match.
+    """
+
+    def __init__(
+            self,
+            enabledThresholds: Optional[tuple[int, int, int]] = None,
+            collectPeriod: float = 1.,
+            period: float = 0.02,
+            ) -> None:
+        """enabledThresholds=None disables automatic collection entirely while enabled"""
+        self.mEnabledThresholds = enabledThresholds
+        self.mDefaultThresholds = gc.get_threshold()
+        self.mCollectTicks = max(1, round(collectPeriod / period))
+        self.mTicks = 0
+
+        self.mEnabled = False
+        self.mCollectionStart = 0
+        self.mEnabledCollections = 0
+        self.mMaxEnabledPauseNs = 0
+        self.mLastPauseNs = 0
+        gc.callbacks.append(self._timeCollection)
+
+    def _timeCollection(self, phase: str, info: dict) -> None:
+        if phase == 'start':
+            self.mCollectionStart = perf_counter_ns()
+            return
+
+        pause = self.mLastPauseNs = perf_counter_ns() - self.mCollectionStart
+        if self.mEnabled:
+            self.mEnabledCollections += 1
+            if pause > self.mMaxEnabledPauseNs:
+                self.mMaxEnabledPauseNs = pause
+
+    def freeze(self) -> None:
+        """Collects, then exempts every surviving object from all future collections"""
+        gc.collect()
+        gc.freeze()
+
+    def onEnabled(self) -> None:
+        """Called by autonomousInit, teleopInit and testInit"""
+        if self.mEnabled:
+            return
+        self.mEnabled = True
+        if self.mEnabledThresholds is None:
+            gc.disable()
+        else:
+            gc.set_threshold(*self.mEnabledThresholds)
+
+    def onDisabled(self) -> None:
+        """Called by disabledInit"""
+        self.mEnabled = False
+        gc.set_threshold(*self.mDefaultThresholds)
+        gc.enable()
+        gc.collect()
+        self.mTicks = 0
+
+    def disabledPeriodic(self) -> None:
+        self.mTicks += 1
+        if self.mTicks >= self.mCollectTicks:
+            self.mTicks = 0
+            gc.collect()
+
+    def getEnabledCollections(self) -> int:
+        """Collections (of any generation) which ran while enabled"""
+        return self.mEnabledCollections
+
+    def getMaxEnabledPauseMs(self) -> float:
+        return self.mMaxEnabledPauseNs / 1e6
+
+    def getLastPauseMs(self) -> float:
+        return self.mLastPauseNs / 1e6
+
+    def close(self) -> None:
+        """Stops timing collections and restores the default collector settings"""
+        gc.callbacks.remove(self._timeCollection)
+        gc.set_threshold(*self.mDefaultThresholds)
+        gc.enable()
+        gc.unfreeze()
+
+
+if __name__ == '__main__':
+    print('Testing lib.robotpy.gcpolicy')
+
+    class Node:
+        def __init__(self):
+            self.mSelf = self
+
+    def makeGarbage(count: int) -> None:
+        for _ in range(count):
+            Node()
+
+    policy = GarbageCollectionPolicy(enabledThresholds=None, collectPeriod=0.1, period=0.02)
+    try:
+        policy.freeze()
+        assert gc.get_freeze_count() > 0
+
+        policy.onEnabled()
+        assert not gc.isenabled()
+        makeGarbage(100_000)
+        assert policy.getEnabledCollections() == 0
+
+        policy.onDisabled()
+        assert gc.isenabled() and gc.get_threshold() == policy.mDefaultThresholds
+        assert gc.get_count()[0] < 100
+        for _ in range(5):
+            policy.disabledPeriodic()
+        assert policy.mTicks == 0
+
+        # Raised thresholds still allow young collections, which are counted
+        limited = GarbageCollectionPolicy(enabledThresholds=(1000, 1_000_000, 1_000_000))
+        limited.onEnabled()
+        makeGarbage(10_000)
+        assert limited.getEnabledCollections() > 0
+        assert gc.get_threshold() == (1000, 1_000_000, 1_000_000)
+        limited.onDisabled()
+        limited.close()
+    except AssertionError:
+        print('GarbageCollectionPolicy test failed')
+        raise
+    finally:
+        policy.close()
+
+    print('gcpolicy.py tests succeded')
@@ -0,0 +1,129 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from array import array
+from typing import Callable, Sequence
+
+import commands2.button
+
+
+class InputSnapshot:
+    """
+    Every axis and button of a set of joysticks, read from the driver station once per tick
+
+    Axes are kept in one preallocated array and each joystick's buttons as a bitmask
+    (bit n - 1 for button n), so a tick's pressed/released edges for every button
+    come from two bitwise operations against the previous tick's mask.
+    Suppliers and triggers read the snapshot, never the HAL.
+    """
+    __slots__ = (
+        'mDriverStation', 'mPorts', 'mIndices', 'mAxisCount',
+        'mAxes', 'mButtons', 'mPressed', 'mReleased',
+    )
+
+    def __init__(self, driverStation, ports: Sequence[int], axisCount: int) -> None:
+        self.mDriverStation = driverStation
+        self.mPorts = tuple(ports)
+        self.mIndices = {port: i for i, port in enumerate(self.mPorts)}
+        self.mAxisCount = axisCount
+        self.mAxes = array('d', bytes(8 * axisCount * len(self.mPorts)))
+        self.mButtons = [0] * len(self.mPorts)
+        self.mPressed = [0] * len(self.mPorts)
+        self.mReleased = [0] * len(self.mPorts)
+
+    def refresh(self) -> None:
+        """Reads the driver station; called once per tick before any command runs"""
+        driverStation = self.mDriverStation
+        axes = self.mAxes
+        axisCount = self.mAxisCount
+        for i, port in enumerate(self.mPorts):
+            base = i * axisCount
+            for axis in range(axisCount):
+                axes[base + axis] = driverStation.getStickAxis(port, axis)
+
+            buttons = driverStation.getStickButtons(port)
+            previous = self.mButtons[i]
+            self.mPressed[i] = buttons & ~previous
+            self.mReleased[i] = previous & ~buttons
+            self.mButtons[i] = buttons
+
+    def getAxis(self, port: int, axis: int) -> float:
+        return self.mAxes[self.mIndices[port] * self.mAxisCount + axis]
+
+    def getButtons(self, port: int) -> int:
+        return self.mButtons[self.mIndices[port]]
+
+    def getButton(self, port: int, button: int) -> bool:
+        return bool(self.mButtons[self.mIndices[port]] >> (button - 1) & 1)
+
+    def getButtonPressed(self, port: int, button: int) -> bool:
+        """Whether the button went down since the previous tick"""
+        return bool(self.mPressed[self.mIndices[port]] >> (button - 1) & 1)
+
+    def getButtonReleased(self, port: int, button: int) -> bool:
+        """Whether the button came up since the previous tick"""
+        return bool(self.mReleased[self.mIndices[port]] >> (button - 1) & 1)
+
+    def axis(self, port: int, axis: int, scale: float = 1.) -> Callable[[], float]:
+        """Supplier of an axis's value this tick, times scale (e.g. -1 to make stick forward positive)"""
+        if axis >= self.mAxisCount:
+            raise IndexError(f'Axis {axis} is not read; {self.mAxisCount} axes per joystick')
+        axes = self.mAxes
+        index = self.mIndices[port] * self.mAxisCount + axis
+        return lambda: axes[index] * scale
+
+    def button(self, port: int, button: int) -> Callable[[], bool]:
+        """Supplier of whether a button is held this tick"""
+        buttons = self.mButtons
+        i = self.mIndices[port]
+        mask = 1 << (button - 1)
+        return lambda: bool(buttons[i] & mask)
+
+    def trigger(self, port: int, button: int) -> commands2.button.Button:
+        """commands2 Button bound to a button of the snapshot"""
+        return commands2.button.Button(self.button(port, button))
+
+
+if __name__ == '__main__':
+    print('Testing lib.robotpy.inputs')
+
+    class StubDriverStation:
+        def __init__(self):
+            self.axes = {}
+            self.buttons = {}
+
+        def getStickAxis(self, port, axis):
+            return self.axes.get((port, axis), 0.)
+
+        def getStickButtons(self, port):
+            return self.buttons.get(port, 0)
+
+    driverStation = StubDriverStation()
+    inputs = InputSnapshot(driverStation, (0, 1), 6)
+    forward = inputs.axis(0, 1, -1)
+    held = inputs.button(1, 3)
+    try:
+        driverStation.axes[0, 1] = -0.5
+        driverStation.buttons[1] = 0b100
+        inputs.refresh()
+        # Reads between refreshes see the snapshot
+        driverStation.axes[0, 1] = 1.
+        driverStation.buttons[1] = 0
+        assert forward() == 0.5 and inputs.getAxis(0, 1) == -0.5
+        assert held() and inputs.getButtonPressed(1, 3) and not inputs.getButtonReleased(1, 3)
+
+        inputs.refresh()
+        assert forward() == -1.
+        assert not held() and not inputs.getButtonPressed(1, 3) and inputs.getButtonReleased(1, 3)
+
+        inputs.refresh()
+        assert not inputs.getButtonReleased(1, 3)
+    except AssertionError:
+        print('InputSnapshot test failed')
+        raise
+
+    print('inputs.py tests succeded')
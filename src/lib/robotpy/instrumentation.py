@@ -0,0 +1,392 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from array import array
+import functools
+import sys
+from time import perf_counter_ns
+import tracemalloc
+from typing import Callable, Iterable
+
+
+def subclasses(base: type, modulePrefix: str = '') -> list[type]:
+    """Every (indirect) subclass of base defined in a module starting with modulePrefix"""
+    found = []
+    pending = list(base.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        if cls not in found:
+            found.append(cls)
+            pending.extend(cls.__subclasses__())
+    return [cls for cls in found if cls.__module__.startswith(modulePrefix)]
+
+
+def wrapMethods(profiler, cls: type, methods: Iterable[str], wrap: Callable) -> None:
+    """
+    Replaces each of cls's methods with wrap(Class.method, method), unless
+    profiler has already wrapped it; several profilers can wrap the same method
+    """
+    for method in methods:
+        func = getattr(cls, method)
+        profilers = getattr(func, '__profilers__', ())
+        if profiler in profilers:
+            continue
+        wrapper = wrap(f'{cls.__name__}.{method}', func)
+        wrapper.__profilers__ = (*profilers, profiler)
+        setattr(cls, method, wrapper)
+
+
+class LoopProfiler:
+    """
+    Opt-in timing of the robot loop and of named sections within it
+
+    Every section keeps its last `window` durations in a preallocated
+    ring buffer; percentiles are only computed when a report is asked for.
+    A loop which runs past its budget counts as an overrun and is blamed
+    on the section which took the most time during that loop.
+
+    A loop's time is its own span plus every section which ran between it
+    and the previous loop, e.g. timing wheel jobs, so all of a tick's work is counted.
+    """
+    kLoopSection = 'loop'
+
+    def __init__(self, period: float = 0.02, window: int = 500, publishEvery: int = 50) -> None:
+        self.mBudgetNs = int(period * 1e9)
+        self.mWindow = window
+        self.mPublishEvery = publishEvery
+
+        self.mNames: list[str] = []
+        self.mIds: dict[str, int] = {}
+        self.mSamples: list[array] = []
+        self.mCounts = array('q')
+        self.mMaxNs = array('q')
+        self.mLoopNs = array('q')
+
+        self.mLoopStart = 0
+        self.mInLoop = False
+        # Time recorded by sections outside beginLoop/endLoop since the last loop ended
+        self.mBetweenNs = 0
+        self.mLoops = 0
+        self.mOverruns = 0
+        self.mOverrunsBy: dict[str, int] = {}
+        self.mLastOverrun = ''
+        self.mTable = None
+
+        self.mLoopId = self.section(self.kLoopSection)
+
+    def section(self, name: str) -> int:
+        """Registers (or looks up) a named section, returning its id"""
+        if name in self.mIds:
+            return self.mIds[name]
+
+        self.mIds[name] = len(self.mNames)
+        self.mNames.append(name)
+        self.mSamples.append(array('q', bytes(8 * self.mWindow)))
+        self.mCounts.append(0)
+        self.mMaxNs.append(0)
+        self.mLoopNs.append(0)
+        return self.mIds[name]
+
+    def record(self, sectionId: int, ns: int) -> None:
+        count = self.mCounts[sectionId]
+        self.mSamples[sectionId][count % self.mWindow] = ns
+        self.mCounts[sectionId] = count + 1
+        self.mLoopNs[sectionId] += ns
+        if ns > self.mMaxNs[sectionId]:
+            self.mMaxNs[sectionId] = ns
+        if not self.mInLoop:
+            self.mBetweenNs += ns
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """Wraps func so that every call is recorded under name"""
+        sectionId = self.section(name)
+        record = self.record
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(sectionId, perf_counter_ns() - start)
+
+        return wrapper
+
+    def instrumentClass(self, cls: type, methods: Iterable[str]) -> None:
+        """Replaces each of cls's methods with a timed wrapper, named Class.method"""
+        wrapMethods(self, cls, methods, self.timed)
+
+    def beginLoop(self) -> None:
+        self.mLoopStart = perf_counter_ns()
+        self.mInLoop = True
+
+    def endLoop(self) -> None:
+        elapsed = perf_counter_ns() - self.mLoopStart + self.mBetweenNs
+        self.record(self.mLoopId, elapsed)
+        self.mInLoop = False
+        self.mLoops += 1
+
+        if elapsed > self.mBudgetNs:
+            self.mOverruns += 1
+            culprit = self.kLoopSection
+            culpritNs = -1
+            for i, ns in enumerate(self.mLoopNs):
+                if i != self.mLoopId and ns > culpritNs:
+                    culprit, culpritNs = self.mNames[i], ns
+            self.mOverrunsBy[culprit] = self.mOverrunsBy.get(culprit, 0) + 1
+            self.mLastOverrun = culprit
+
+        # Sections which run before the next loop count towards it
+        loopNs = self.mLoopNs
+        for i in range(len(loopNs)):
+            loopNs[i] = 0
+        self.mBetweenNs = 0
+
+        if self.mPublishEvery and self.mLoops % self.mPublishEvery == 0:
+            self.publish()
+
+    def statistics(self, name: str) -> tuple[float, float, float]:
+        """(p50, p99, max) in milliseconds over the section's window"""
+        sectionId = self.mIds[name]
+        count = min(self.mCounts[sectionId], self.mWindow)
+        if not count:
+            return 0., 0., 0.
+
+        samples = sorted(self.mSamples[sectionId][:count])
+        return (
+            samples[(count - 1) // 2] / 1e6,
+            samples[(count - 1) * 99 // 100] / 1e6,
+            self.mMaxNs[sectionId] / 1e6,
+        )
+
+    def publish(self) -> None:
+        """Writes every section's statistics to the LoopTiming NetworkTable"""
+        if self.mTable is None:
+            from networktables import NetworkTables
+            self.mTable = NetworkTables.getTable('LoopTiming')
+
+        table = self.mTable
+        for name in self.mNames:
+            p50, p99, maximum = self.statistics(name)
+            table.putNumber(f'{name}/p50', p50)
+            table.putNumber(f'{name}/p99', p99)
+            table.putNumber(f'{name}/max', maximum)
+        table.putNumber('overruns', self.mOverruns)
+        table.putString('lastOverrun', self.mLastOverrun)
+
+    def summary(self) -> str:
+        lines = [
+            f'{self.mLoops} loops, {self.mOverruns} overruns '
+            f'of the {self.mBudgetNs / 1e6:g} ms budget',
+            f'{"section":<40}{"calls":>10}{"p50 ms":>10}{"p99 ms":>10}{"max ms":>10}{"overruns":>10}',
+        ]
+        for name in self.mNames:
+            p50, p99, maximum = self.statistics(name)
+            lines.append(
+                f'{name:<40}{self.mCounts[self.mIds[name]]:>10}'
+                f'{p50:>10.3f}{p99:>10.3f}{maximum:>10.3f}'
+                f'{self.mOverrunsBy.get(name, 0):>10}'
+            )
+        return '\n'.join(lines)
+
+
+class AllocationProfiler:
+    """
+    Opt-in allocation counts of the robot loop and of named sections within it
+
+    Built on tracemalloc, which slows every allocation down, so meant for
+    diagnosing where a loop's garbage comes from rather than for matches.
+    For every call a section records the bytes it allocated (its traced
+    memory peak above where it started, so short-lived objects count too)
+    and the change in allocated blocks (what it kept). Sections aren't
+    expected to nest, except within the loop itself.
+    """
+
+    def __init__(self) -> None:
+        self.mNames: list[str] = []
+        self.mIds: dict[str, int] = {}
+        self.mCalls = array('q')
+        self.mBytes = array('q')
+        self.mMaxBytes = array('q')
+        self.mBlocks = array('q')
+
+        self.mLoops = 0
+        self.mLoopStart = 0
+        self.mLoopBlocks = 0
+        self.mLoopPeak = 0
+        self.mLastLoopBytes = 0
+        self.mLastLoopBlocks = 0
+        self.mMaxLoopBytes = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+    def section(self, name: str) -> int:
+        """Registers (or looks up) a named section, returning its id"""
+        if name in self.mIds:
+            return self.mIds[name]
+
+        self.mIds[name] = len(self.mNames)
+        self.mNames.append(name)
+        for values in (self.mCalls, self.mBytes, self.mMaxBytes, self.mBlocks):
+            values.append(0)
+        return self.mIds[name]
+
+    def record(self, sectionId: int, allocated: int, blocks: int) -> None:
+        self.mCalls[sectionId] += 1
+        self.mBytes[sectionId] += allocated
+        self.mBlocks[sectionId] += blocks
+        if allocated > self.mMaxBytes[sectionId]:
+            self.mMaxBytes[sectionId] = allocated
+
+    def tracked(self, name: str, func: Callable) -> Callable:
+        """Wraps func so that every call's allocations are recorded under name"""
+        sectionId = self.section(name)
+        record = self.record
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            blocks = sys.getallocatedblocks()
+            start, peak = tracemalloc.get_traced_memory()
+            # The loop's peak so far would be lost by the reset
+            if peak > self.mLoopPeak:
+                self.mLoopPeak = peak
+            tracemalloc.reset_peak()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                peak = tracemalloc.get_traced_memory()[1]
+                if peak > self.mLoopPeak:
+                    self.mLoopPeak = peak
+                record(sectionId, peak - start, sys.getallocatedblocks() - blocks)
+
+        return wrapper
+
+    def instrumentClass(self, cls: type, methods: Iterable[str]) -> None:
+        """Replaces each of cls's methods with a tracked wrapper, named Class.method"""
+        wrapMethods(self, cls, methods, self.tracked)
+
+    def beginLoop(self) -> None:
+        self.mLoopBlocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        self.mLoopStart = self.mLoopPeak = tracemalloc.get_traced_memory()[0]
+
+    def endLoop(self) -> None:
+        peak = max(self.mLoopPeak, tracemalloc.get_traced_memory()[1])
+        self.mLastLoopBytes = peak - self.mLoopStart
+        self.mLastLoopBlocks = sys.getallocatedblocks() - self.mLoopBlocks
+        if self.mLastLoopBytes > self.mMaxLoopBytes:
+            self.mMaxLoopBytes = self.mLastLoopBytes
+        self.mLoops += 1
+
+    def getLoopBytes(self) -> int:
+        """Bytes allocated during the last loop"""
+        return self.mLastLoopBytes
+
+    def getLoopBlocks(self) -> int:
+        """Change in allocated blocks over the last loop"""
+        return self.mLastLoopBlocks
+
+    def summary(self) -> str:
+        """Sections by total bytes allocated, most first"""
+        lines = [
+            f'{self.mLoops} loops, {self.mLastLoopBytes} bytes allocated last loop, '
+            f'{self.mMaxLoopBytes} at most',
+            f'{"section":<40}{"calls":>10}{"B/call":>10}{"max B":>10}{"blocks/call":>13}',
+        ]
+        for sectionId in sorted(range(len(self.mNames)), key=self.mBytes.__getitem__, reverse=True):
+            calls = max(self.mCalls[sectionId], 1)
+            lines.append(
+                f'{self.mNames[sectionId]:<40}{self.mCalls[sectionId]:>10}'
+                f'{self.mBytes[sectionId] / calls:>10.0f}{self.mMaxBytes[sectionId]:>10}'
+                f'{self.mBlocks[sectionId] / calls:>13.1f}'
+            )
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import time
+
+    print('Testing lib.robotpy.instrumentation')
+
+    class Slow:
+        def execute(self, seconds):
+            time.sleep(seconds)
+
+    profiler = LoopProfiler(period=0.005, window=8, publishEvery=0)
+    profiler.instrumentClass(Slow, ('execute',))
+    profiler.instrumentClass(Slow, ('execute',))
+    slow = Slow()
+
+    try:
+        for seconds in (0, 0, 0.01, 0):
+            profiler.beginLoop()
+            slow.execute(seconds)
+            profiler.endLoop()
+
+        assert profiler.mNames == ['loop', 'Slow.execute']
+        assert profiler.mCounts[profiler.mIds['Slow.execute']] == 4
+        assert profiler.mOverruns == 1
+        assert profiler.mOverrunsBy == {'Slow.execute': 1}
+        assert profiler.statistics('Slow.execute')[2] >= 10
+
+        # Work between loops, like a timing wheel job, counts towards the next loop
+        job = profiler.timed('job', time.sleep)
+        job(0.01)
+        profiler.beginLoop()
+        profiler.endLoop()
+        assert profiler.mOverruns == 2
+        assert profiler.mOverrunsBy == {'Slow.execute': 1, 'job': 1}
+        loopId = profiler.mLoopId
+        assert profiler.mSamples[loopId][(profiler.mCounts[loopId] - 1) % 8] >= 10e6
+    except AssertionError:
+        print('LoopProfiler test failed')
+        raise
+
+    print(profiler.summary())
+
+    class Wasteful:
+        def periodic(self):
+            return [bytes(1000) for _ in range(100)]
+
+        def kept(self):
+            self.mKept = [[] for _ in range(100)]
+
+    allocations = AllocationProfiler()
+    allocations.instrumentClass(Wasteful, ('periodic', 'kept'))
+    allocations.instrumentClass(Wasteful, ('periodic',))
+    # Both profilers can wrap the same method
+    profiler.instrumentClass(Wasteful, ('periodic',))
+    wasteful = Wasteful()
+
+    allocations.start()
+    try:
+        for _ in range(3):
+            allocations.beginLoop()
+            wasteful.periodic()
+            wasteful.kept()
+            allocations.endLoop()
+
+        periodic = allocations.mIds['Wasteful.periodic']
+        kept = allocations.mIds['Wasteful.kept']
+        assert allocations.mCalls[periodic] == 3
+        assert allocations.mMaxBytes[periodic] >= 100 * 1000
+        assert allocations.mBlocks[kept] >= 100
+        assert allocations.mMaxLoopBytes >= allocations.mMaxBytes[periodic]
+        assert profiler.mCounts[profiler.mIds['Wasteful.periodic']] == 3
+    except AssertionError:
+        print('AllocationProfiler test failed')
+        raise
+    finally:
+        allocations.stop()
+
+    print(allocations.summary())
+    print('instrumentation.py tests succeded')
@@ -0,0 +1,209 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    site.addsitedir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import argparse
+import math
+from time import perf_counter_ns
+from typing import Any, Callable, Optional
+
+import numpy
+
+from lib.robotpy.dashboard import DashboardPublisher, NetworkTablesSink
+
+
+def _stringSize(value: str) -> int:
+    """NetworkTables 3 string: ULEB128 length, then UTF-8"""
+    size = len(value.encode())
+    length = 1
+    while size >= 0x80:
+        size >>= 7
+        length += 1
+    return length + len(value.encode())
+
+
+def valueSize(typecode: str, value: Any) -> int:
+    if typecode == 's':
+        return _stringSize(value)
+    return 1 if typecode == '?' else 8
+
+
+class WireCountingSink:
+    """
+    Counts the bytes each write would put on the wire under NetworkTables 3,
+    passing the writes on to another sink (e.g. a local NetworkTablesSink) if given
+
+    The first write to an entry is an entry assignment (message type, name, value type,
+    id, sequence number, flags, value), later ones entry updates (message type, id,
+    sequence number, value type, value). NetworkTables merges updates to an entry
+    within its own update interval, so this is an upper bound.
+    """
+
+    def __init__(self, inner=None) -> None:
+        self.mInner = inner
+        self.mBytes = 0
+        self.mWrites = 0
+
+    def setter(self, name: str, typecode: str) -> Callable[[Any], None]:
+        assignmentSize = 1 + _stringSize(name) + 1 + 2 + 2 + 1
+        updateSize = 1 + 2 + 2 + 1
+        inner = self.mInner.setter(name, typecode) if self.mInner is not None else None
+        assigned = False
+
+        def set_(value) -> None:
+            nonlocal assigned
+            self.mBytes += (updateSize if assigned else assignmentSize) + valueSize(typecode, value)
+            self.mWrites += 1
+            assigned = True
+            if inner is not None:
+                inner(value)
+
+        return set_
+
+    def flush(self) -> None:
+        if self.mInner is not None:
+            self.mInner.flush()
+
+
+class SyntheticRobot:
+    """
+    Fields shaped like the robot's: noisy, slowly moving doubles (positions,
+    currents, outputs), booleans which rarely flip and command names which
+    change every few seconds
+    """
+
+    def __init__(self, doubles: int, booleans: int, strings: int, seed: int = 0) -> None:
+        self.mRng = numpy.random.default_rng(seed)
+        self.mDoubles = numpy.zeros(doubles)
+        self.mSteps = self.mRng.uniform(0.001, 0.05, doubles)
+        self.mBooleans = numpy.zeros(booleans, bool)
+        self.mStrings = ['Idle'] * strings
+        self.mTick = 0
+
+    def step(self) -> None:
+        self.mTick += 1
+        # Half the fields hold still at a time, like a robot which is partly idle
+        moving = (self.mTick // 50 + numpy.arange(len(self.mDoubles))) % 2 == 0
+        self.mDoubles += moving * self.mRng.normal(0, self.mSteps)
+        flips = self.mRng.random(len(self.mBooleans)) < 0.005
+        self.mBooleans ^= flips
+        if self.mTick % 150 == 0:
+            for i in range(len(self.mStrings)):
+                self.mStrings[i] = self.mRng.choice(('Idle', 'DriveDistance', 'FollowTrajectory', 'Elevate'))
+
+    def fields(self) -> list[tuple[str, Callable[[], Any], str]]:
+        fields = []
+        for i in range(len(self.mDoubles)):
+            fields.append((f'double{i}', lambda i=i: float(self.mDoubles[i]), 'd'))
+        for i in range(len(self.mBooleans)):
+            fields.append((f'boolean{i}', lambda i=i: bool(self.mBooleans[i]), '?'))
+        for i in range(len(self.mStrings)):
+            fields.append((f'string{i}', lambda i=i: str(self.mStrings[i]), 's'))
+        return fields
+
+
+def runEveryTick(robot: SyntheticRobot, sink, ticks: int) -> tuple[int, int]:
+    """Writes every field every tick from the loop; (bytes, loop ns)"""
+    setters = [(sink.setter(name, typecode), getter) for name, getter, typecode in robot.fields()]
+    loopNs = 0
+    for _ in range(ticks):
+        robot.step()
+        start = perf_counter_ns()
+        for setter, getter in setters:
+            setter(getter())
+        sink.flush()
+        loopNs += perf_counter_ns() - start
+    return sink.mBytes, loopNs
+
+
+def runPublisher(
+        robot: SyntheticRobot,
+        sink,
+        ticks: int,
+        loopPeriod: float,
+        publishPeriod: float,
+        threshold: float,
+        maxInterval: float,
+        ) -> tuple[int, int, int]:
+    """
+    Samples every tick and publishes every publishPeriod on simulated time,
+    so the thread's work is timed separately; (bytes, loop ns, publisher ns)
+    """
+    now = [0.]
+    publisher = DashboardPublisher(publishPeriod, clock=lambda: now[0])
+    for name, getter, typecode in robot.fields():
+        publisher.addField(name, getter, typecode, threshold, maxInterval)
+    publisher.attach(sink)
+
+    publishEvery = max(1, round(publishPeriod / loopPeriod))
+    loopNs = publisherNs = 0
+    for tick in range(ticks):
+        robot.step()
+        now[0] = tick * loopPeriod
+        start = perf_counter_ns()
+        publisher.sample()
+        loopNs += perf_counter_ns() - start
+        if tick % publishEvery == 0:
+            start = perf_counter_ns()
+            publisher.publish()
+            publisherNs += perf_counter_ns() - start
+    return sink.mBytes, loopNs, publisherNs
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Compare writing every dashboard field every tick with DashboardPublisher, '
+                    'in NetworkTables bytes and time per tick',
+    )
+    parser.add_argument('--doubles', type=int, default=60)
+    parser.add_argument('--booleans', type=int, default=20)
+    parser.add_argument('--strings', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=30., help='simulated match time')
+    parser.add_argument('--loop-period', type=float, default=0.02)
+    parser.add_argument('--publish-period', type=float, default=0.05)
+    parser.add_argument('--threshold', type=float, default=0.01)
+    parser.add_argument('--max-interval', type=float, default=1.)
+    parser.add_argument('--networktables', action='store_true',
+                        help='also write to a local NetworkTables server, timing the real entry writes')
+    args = parser.parse_args(argv)
+
+    def sink(table: str) -> WireCountingSink:
+        if not args.networktables:
+            return WireCountingSink()
+        return WireCountingSink(NetworkTablesSink(table))
+
+    if args.networktables:
+        from networktables import NetworkTables
+        NetworkTables.initialize()
+
+    ticks = math.ceil(args.seconds / args.loop_period)
+    counts = (args.doubles, args.booleans, args.strings)
+
+    everyBytes, everyNs = runEveryTick(SyntheticRobot(*counts), sink('HarnessEveryTick'), ticks)
+    publisherBytes, loopNs, threadNs = runPublisher(
+        SyntheticRobot(*counts),
+        sink('HarnessPublisher'),
+        ticks,
+        args.loop_period,
+        args.publish_period,
+        args.threshold,
+        args.max_interval,
+    )
+
+    print(f'{sum(counts)} fields, {ticks} ticks of {args.loop_period * 1e3:g} ms')
+    print(f'{"":<24}{"bytes/tick":>12}{"loop us/tick":>14}{"thread us/tick":>16}')
+    print(f'{"every field every tick":<24}{everyBytes / ticks:>12.0f}{everyNs / ticks / 1e3:>14.1f}{"-":>16}')
+    print(
+        f'{"DashboardPublisher":<24}{publisherBytes / ticks:>12.0f}'
+        f'{loopNs / ticks / 1e3:>14.1f}{threadNs / ticks / 1e3:>16.1f}'
+    )
+
+    if args.networktables:
+        from networktables import NetworkTables
+        NetworkTables.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from array import array
+import math
+import threading
+from typing import Callable, NamedTuple, Optional
+
+import wpilib
+
+
+class Pose(NamedTuple):
+    timestamp: float
+    x: float
+    y: float
+    heading: float
+
+
+class PoseHistory:
+    """
+    Fixed-size ring of timestamped poses written by one thread and read by any
+
+    Readers never block the writer: the oldest eighth of the ring is never read,
+    so the writer can append that many poses during a read before it has to be retried.
+    Clearing only moves the start of the history up to the newest pose, so a read
+    which overlaps a clear sees the count keep growing and is retried the same way.
+    """
+    __slots__ = 'mCapacity', 'mMargin', 'mTimes', 'mX', 'mY', 'mHeading', 'mCount', 'mStart'
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 2:
+            raise ValueError(f'PoseHistory needs a capacity of at least 2, not {capacity}')
+        self.mCapacity = capacity
+        self.mMargin = max(1, capacity // 8)
+        self.mTimes = array('d', bytes(8 * capacity))
+        self.mX = array('d', bytes(8 * capacity))
+        self.mY = array('d', bytes(8 * capacity))
+        self.mHeading = array('d', bytes(8 * capacity))
+        # Total number of poses ever appended; the newest is at (mCount - 1) % mCapacity
+        self.mCount = 0
+        # Count at the last clear; poses before it are no longer part of the history
+        self.mStart = 0
+
+    def __len__(self) -> int:
+        return min(self.mCount - self.mStart, self.mCapacity - self.mMargin)
+
+    def append(self, timestamp: float, x: float, y: float, heading: float) -> None:
+        """Only to be called from the writer thread, with increasing timestamps"""
+        i = self.mCount % self.mCapacity
+        self.mTimes[i] = timestamp
+        self.mX[i] = x
+        self.mY[i] = y
+        self.mHeading[i] = heading
+        # Published last, so readers never see a half-written pose
+        self.mCount += 1
+
+    def clear(self) -> None:
+        """Only to be called from the writer thread"""
+        self.mStart = self.mCount
+
+    def _read(self, start: int, count: int, timestamp: float) -> Optional[Pose]:
+        capacity = self.mCapacity
+        times = self.mTimes
+        oldest = max(start, count - capacity + self.mMargin)
+        newest = count - 1
+
+        if timestamp >= times[newest % capacity]:
+            i = newest % capacity
+            return Pose(times[i], self.mX[i], self.mY[i], self.mHeading[i])
+        if timestamp <= times[oldest % capacity]:
+            i = oldest % capacity
+            return Pose(times[i], self.mX[i], self.mY[i], self.mHeading[i])
+
+        # First sample after timestamp, searched in append order
+        low, high = oldest, newest
+        while low < high:
+            middle = (low + high) // 2
+            if times[middle % capacity] <= timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        after, before = low % capacity, (low - 1) % capacity
+
+        t0, t1 = times[before], times[after]
+        fraction = (timestamp - t0) / (t1 - t0) if t1 > t0 else 0.
+        heading0 = self.mHeading[before]
+        # Shortest way round between the two headings
+        turn = math.remainder(self.mHeading[after] - heading0, math.tau)
+        return Pose(
+            timestamp,
+            self.mX[before] + fraction * (self.mX[after] - self.mX[before]),
+            self.mY[before] + fraction * (self.mY[after] - self.mY[before]),
+            heading0 + fraction * turn,
+        )
+
+    def sample(self, timestamp: float) -> Optional[Pose]:
+        """
+        Pose at timestamp, linearly interpolated between the poses either side of it;
+        clamped to the oldest/newest pose outside the buffer's span, None when empty
+        """
+        while True:
+            # Start first: it never passes the count, which only grows
+            start = self.mStart
+            count = self.mCount
+            if count == start:
+                if self.mStart == start:
+                    return None
+                continue
+            pose = self._read(start, count, timestamp)
+            # The slots read are only overwritten once the writer has used up the margin
+            if self.mStart == start and self.mCount - count < self.mMargin:
+                return pose
+
+
+class DifferentialOdometry:
+    """
+    Integrates a differential drive's pose from its wheel distances
+    on a wpilib.Notifier thread, independently of the robot loop
+
+    The latest pose is double-buffered (the integrator fills the spare buffer, then flips),
+    and every pose is also kept in a PoseHistory for latency compensation.
+    Heading comes from the wheels alone: (right - left) / track width.
+
+    The encoders are never zeroed in hardware: resetEncoders() has the integrator
+    take each side's current distance as its offset, in the same step as it
+    re-baselines, so there is no jump in distance for it to integrate.
+    """
+
+    def __init__(
+            self,
+            leftDistance: Callable[[], float],
+            rightDistance: Callable[[], float],
+            trackWidth: float,
+            historyLength: int = 200,
+            clock: Callable[[], float] = wpilib.Timer.getFPGATimestamp,
+            ) -> None:
+        self.mLeftDistance = leftDistance
+        self.mRightDistance = rightDistance
+        self.mTrackWidth = trackWidth
+        self.mClock = clock
+
+        self.mBuffers = (array('d', bytes(32)), array('d', bytes(32)))
+        self.mFront = 0
+        self.mHistory = PoseHistory(historyLength)
+
+        self.mLastLeft = None
+        self.mLastRight = None
+        # (left, right) raw distances at the last encoder reset; replaced whole, never mutated
+        self.mOffsets = (0., 0.)
+        # Taken up by the integrator on its next update: a new (x, y, heading),
+        # and whether to take the current distances as the offsets
+        self.mLock = threading.Lock()
+        self.mPendingReset: Optional[tuple[float, float, float]] = None
+        self.mPendingEncoderReset = False
+        self.mNotifier = None
+
+    def start(self, period: float = 0.005) -> None:
+        if self.mNotifier is None:
+            self.mNotifier = wpilib.Notifier(self.update)
+        self.mNotifier.startPeriodic(period)
+
+    def stop(self) -> None:
+        if self.mNotifier is not None:
+            self.mNotifier.stop()
+
+    def resetPose(self, x: float = 0., y: float = 0., heading: float = 0.) -> None:
+        """
+        Moves the pose and re-baselines the wheel distances on the integrator's next update
+        """
+        with self.mLock:
+            self.mPendingReset = (x, y, heading)
+
+    def resetEncoders(self) -> None:
+        """
+        Zeroes the wheel distances on the integrator's next update, keeping the pose
+        """
+        with self.mLock:
+            self.mPendingEncoderReset = True
+
+    def getEncoderOffsets(self) -> tuple[float, float]:
+        """Raw (left, right) distances at the last encoder reset, to subtract from the encoders"""
+        return self.mOffsets
+
+    def update(self) -> None:
+        """One integration step; called by the notifier"""
+        timestamp = self.mClock()
+        rawLeft = self.mLeftDistance()
+        rawRight = self.mRightDistance()
+        _, x, y, heading = self.mBuffers[self.mFront]
+
+        with self.mLock:
+            reset, self.mPendingReset = self.mPendingReset, None
+            encoderReset, self.mPendingEncoderReset = self.mPendingEncoderReset, False
+            if encoderReset:
+                # The new offsets and the baseline come from the same reading
+                self.mOffsets = (rawLeft, rawRight)
+            leftOffset, rightOffset = self.mOffsets
+        left = rawLeft - leftOffset
+        right = rawRight - rightOffset
+
+        if reset is not None:
+            # The pose given is the pose now, so the distance since the last update is dropped
+            x, y, heading = reset
+            self.mHistory.clear()
+        elif not encoderReset and self.mLastLeft is not None:
+            deltaLeft = left - self.mLastLeft
+            deltaRight = right - self.mLastRight
+            distance = (deltaLeft + deltaRight) / 2
+            turn = (deltaRight - deltaLeft) / self.mTrackWidth
+            if abs(turn) < 1e-9:
+                x += distance * math.cos(heading)
+                y += distance * math.sin(heading)
+            else:
+                # Exact for a constant-curvature arc between samples
+                radius = distance / turn
+                x += radius * (math.sin(heading + turn) - math.sin(heading))
+                y -= radius * (math.cos(heading + turn) - math.cos(heading))
+            heading += turn
+
+        self.mLastLeft = left
+        self.mLastRight = right
+
+        back = 1 - self.mFront
+        buffer = self.mBuffers[back]
+        buffer[0] = timestamp
+        buffer[1] = x
+        buffer[2] = y
+        buffer[3] = heading
+        self.mFront = back
+        self.mHistory.append(timestamp, x, y, heading)
+
+    def getPose(self) -> Pose:
+        """Most recently integrated pose"""
+        return Pose(*self.mBuffers[self.mFront])
+
+    def getPoseAt(self, timestamp: float) -> Optional[Pose]:
+        """Pose at an FPGA timestamp within the history (see PoseHistory.sample)"""
+        return self.mHistory.sample(timestamp)
+
+
+if __name__ == '__main__':
+    print('Testing lib.robotpy.odometry')
+
+    history = PoseHistory(4)
+    try:
+        assert history.sample(0) is None
+        for t in range(6):
+            history.append(t, t * 2., 0., 0.)
+        assert len(history) == 3
+        assert history.sample(3.5) == Pose(3.5, 7., 0., 0.)
+        assert history.sample(0) == Pose(3, 6., 0., 0.)
+        assert history.sample(9) == Pose(5, 10., 0., 0.)
+
+        history.clear()
+        history.append(0, 0, 0, math.pi - 0.1)
+        history.append(1, 0, 0, -math.pi + 0.1)
+        assert math.isclose(abs(history.sample(0.5).heading), math.pi)
+
+        # A read which overlaps a clear is retried rather than mixing the two histories
+        class ClearedDuringRead(PoseHistory):
+            __slots__ = 'mCleared',
+
+            def _read(self, start, count, timestamp):
+                pose = super()._read(start, count, timestamp)
+                if not self.mCleared:
+                    self.mCleared = True
+                    self.clear()
+                    self.append(2, 5., 5., 0.)
+                return pose
+
+        cleared = ClearedDuringRead(4)
+        cleared.mCleared = False
+        cleared.append(0, 0., 0., 0.)
+        cleared.append(1, 1., 0., 0.)
+        assert cleared.sample(0.5) == Pose(2, 5., 5., 0.)
+    except AssertionError:
+        print('PoseHistory test failed')
+        raise
+
+    distances = [0., 0.]
+    clock = [0.]
+    odometry = DifferentialOdometry(lambda: distances[0], lambda: distances[1], 0.5, clock=lambda: clock[0])
+    try:
+        odometry.update()
+        # Drive a quarter circle of radius 1 in 100 steps
+        for step in range(1, 101):
+            clock[0] = step * 0.005
+            distances[0] = (1 - 0.25) * math.pi / 2 * step / 100
+            distances[1] = (1 + 0.25) * math.pi / 2 * step / 100
+            odometry.update()
+        pose = odometry.getPose()
+        assert math.isclose(pose.x, 1, abs_tol=1e-9) and math.isclose(pose.y, 1, abs_tol=1e-9)
+        assert math.isclose(pose.heading, math.pi / 2)
+        assert math.isclose(odometry.getPoseAt(0.25).heading, math.pi / 4)
+
+        odometry.resetPose(1, 2, 3)
+        distances[0] += 1
+        odometry.update()
+        assert odometry.getPose()[1:] == (1, 2, 3)
+
+        # Resetting the encoders doesn't move the pose, however far the wheels have gone
+        distances[0] += 0.25
+        odometry.resetEncoders()
+        odometry.update()
+        assert odometry.getPose()[1:] == (1, 2, 3)
+        assert odometry.getEncoderOffsets() == tuple(distances)
+        distances[0] += 0.5
+        distances[1] += 0.5
+        odometry.update()
+        assert math.isclose(odometry.getPose().x, 1 + 0.5 * math.cos(3))
+    except AssertionError:
+        print('DifferentialOdometry test failed')
+        raise
+
+    print('odometry.py tests succeded')
@@ -0,0 +1,204 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from array import array
+from typing import Callable
+
+import wpilib
+
+
+# Falcon 500
+kStallCurrent = 257.
+
+
+class CurrentArbiter:
+    """
+    Scales motor group outputs so predicted battery draw keeps the voltage above a floor
+
+    Each motor group registers once with a priority; every tick its subsystem requests
+    the output it wants (with its speed as a fraction of free speed), and update()
+    predicts each group's supply current from a DC motor model, estimates the
+    battery's open-circuit voltage from the measured voltage and last tick's draw,
+    and hands the current budget out by priority: higher priorities are served in full
+    first, a priority which doesn't fit is scaled down as a whole, and lower ones get
+    what is left. Scales drop immediately but recover at recoveryRate per second,
+    so load is shed and restored smoothly.
+
+    update() loops over groups, never over motors, so its cost doesn't grow with motor count.
+    """
+
+    def __init__(
+            self,
+            batteryVoltage: Callable[[], float] = wpilib.RobotController.getBatteryVoltage,
+            resistance: float = 0.02,
+            minimumVoltage: float = 7.5,
+            recoveryRate: float = 2.,
+            period: float = 0.02,
+            ) -> None:
+        self.mBatteryVoltage = batteryVoltage
+        self.mResistance = resistance
+        self.mMinimumVoltage = minimumVoltage
+        self.mRecoveryStep = recoveryRate * period
+
+        self.mNames: list[str] = []
+        self.mPriorities: list[int] = []
+        # Per group: motor count * stall current, per-group current cap
+        self.mStall = array('d')
+        self.mLimit = array('d')
+        self.mOutput = array('d')
+        self.mSpeed = array('d')
+        self.mDemand = array('d')
+        self.mScale = array('d')
+        # Groups sharing a priority, highest priority first
+        self.mLevels: list[tuple[int, ...]] = []
+
+        self.mPredictedCurrent = 0.
+        self.mBudget = float('inf')
+
+    def register(
+            self,
+            name: str,
+            priority: int,
+            motors: int,
+            currentLimit: float = float('inf'),
+            stallCurrent: float = kStallCurrent,
+            ) -> int:
+        """
+        Adds a group of motors which are always commanded together, returning its id;
+        currentLimit is each motor's supply current limit, if configured
+        """
+        group = len(self.mNames)
+        self.mNames.append(name)
+        self.mPriorities.append(priority)
+        self.mStall.append(motors * stallCurrent)
+        self.mLimit.append(motors * currentLimit)
+        for values in (self.mOutput, self.mSpeed, self.mDemand):
+            values.append(0.)
+        self.mScale.append(1.)
+
+        levels = {}
+        for i, groupPriority in enumerate(self.mPriorities):
+            levels.setdefault(groupPriority, []).append(i)
+        self.mLevels = [tuple(levels[level]) for level in sorted(levels, reverse=True)]
+        return group
+
+    def request(self, group: int, output: float, speed: float = 0.) -> None:
+        """The output (-1 to 1) a group wants this tick, moving at speed (fraction of free speed)"""
+        self.mOutput[group] = output
+        self.mSpeed[group] = speed
+
+    def getScale(self, group: int) -> float:
+        return self.mScale[group]
+
+    def scale(self, group: int, output: float) -> float:
+        """Requests output for the group and returns it as scaled by the last update"""
+        self.mOutput[group] = output
+        return output * self.mScale[group]
+
+    def getPredictedCurrent(self) -> float:
+        """Predicted total supply current (A) after scaling, as of the last update"""
+        return self.mPredictedCurrent
+
+    def getBudget(self) -> float:
+        return self.mBudget
+
+    def update(self) -> None:
+        """Recomputes every group's scale; called once per tick"""
+        output = self.mOutput
+        speed = self.mSpeed
+        demand = self.mDemand
+        stall = self.mStall
+        limit = self.mLimit
+        for group in range(len(demand)):
+            # Supply current = duty cycle * armature current, (output - speed) * stall
+            current = output[group] * (output[group] - speed[group]) * stall[group]
+            if current < 0:
+                # Regenerating
+                current = 0.
+            elif current > limit[group]:
+                current = limit[group]
+            demand[group] = current
+
+        openCircuit = self.mBatteryVoltage() + self.mResistance * self.mPredictedCurrent
+        remaining = self.mBudget = max(0., (openCircuit - self.mMinimumVoltage) / self.mResistance)
+
+        scales = self.mScale
+        recovery = self.mRecoveryStep
+        predicted = 0.
+        for level in self.mLevels:
+            levelDemand = 0.
+            for group in level:
+                levelDemand += demand[group]
+            if levelDemand <= remaining:
+                target = 1.
+                remaining -= levelDemand
+            else:
+                target = remaining / levelDemand
+                remaining = 0.
+
+            for group in level:
+                scale = scales[group]
+                if target < scale:
+                    scale = target
+                elif scale + recovery < target:
+                    scale += recovery
+                else:
+                    scale = target
+                scales[group] = scale
+                # Scaling output scales current at most proportionally
+                predicted += scale * demand[group]
+        self.mPredictedCurrent = predicted
+
+
+if __name__ == '__main__':
+    from timeit import timeit
+
+    from wpilib.simulation import BatterySim
+
+    print('Testing lib.robotpy.power')
+
+    kResistance = 0.02
+    voltage = [12.5]
+    arbiter = CurrentArbiter(lambda: voltage[0], kResistance, minimumVoltage=8., period=0.02)
+    drive = arbiter.register('drivetrain', 1, 4, currentLimit=60.)
+    elevator = arbiter.register('elevator', 0, 2, currentLimit=40.)
+
+    def step(driveOutput: float, elevatorOutput: float) -> None:
+        arbiter.request(drive, driveOutput)
+        arbiter.request(elevator, elevatorOutput)
+        arbiter.update()
+        # The battery sees what the motors actually draw once scaled
+        voltage[0] = BatterySim.calculate(12.5, kResistance, [arbiter.getPredictedCurrent()])
+
+    try:
+        step(0.1, 0.1)
+        assert arbiter.getScale(drive) == arbiter.getScale(elevator) == 1
+
+        # Pushing from a standstill with everything: the elevator is shed first
+        for _ in range(50):
+            step(1., 1.)
+            assert voltage[0] >= 8. - 1e-9
+        assert arbiter.getScale(drive) > 0.5 and arbiter.getScale(elevator) < arbiter.getScale(drive)
+
+        # Load comes back gradually
+        step(0.1, 0.1)
+        previous = arbiter.getScale(elevator)
+        step(0.1, 0.1)
+        assert previous < arbiter.getScale(elevator) <= previous + 0.04 + 1e-9
+        for _ in range(50):
+            step(0.1, 0.1)
+        assert arbiter.getScale(elevator) == 1
+    except AssertionError:
+        print('CurrentArbiter test failed')
+        raise
+
+    for i in range(30):
+        arbiter.register(f'group{i}', i % 3, 2)
+    number = 10_000
+    print(f'update() with {len(arbiter.mNames)} groups: {timeit(arbiter.update, number=number) / number * 1e6:.1f} us')
+
+    print('power.py tests succeded')
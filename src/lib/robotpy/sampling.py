@@ -0,0 +1,293 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import functools
+import os
+import sys
+import threading
+from time import perf_counter_ns
+from types import CodeType
+from typing import Callable, Iterable, Optional
+
+from lib.robotpy.instrumentation import wrapMethods
+
+
+class SamplingProfiler:
+    """
+    Samples the robot loop thread's stack from a background thread
+
+    Every interval the sampler reads the loop thread's current frame and
+    counts the stack (as code objects, named only on export) under the
+    section running at the time: instrumented subsystems tag themselves on
+    entry, at the cost of two attribute writes per call, and instrumented
+    commands also name the subsystems they require, e.g. 'Drive.execute[Drivetrain]'.
+    export() writes collapsed stacks, section first, which flamegraph.pl,
+    speedscope and inferno read directly.
+
+    Each sample holds the GIL only while walking one stack, so the loop is
+    slowed down by a fraction of a percent; getOverhead() measures it.
+    While the loop thread runs Python code the sampler has to wait for the GIL
+    after its sleep and again after its sample, each up to sys.getswitchinterval()
+    (5 ms), so the effective rate is about 100 Hz at most, whatever the interval.
+    """
+    kUntagged = 'robot'
+
+    def __init__(self, interval: float = 0.01, maxDepth: int = 64) -> None:
+        self.mInterval = interval
+        self.mMaxDepth = maxDepth
+        self.mSection: Optional[str] = None
+        self.mStacks: dict[tuple[Optional[str], tuple[CodeType, ...]], int] = {}
+        self.mSamples = 0
+        self.mSamplingNs = 0
+        self.mRunningNs = 0
+        self.mStartNs = 0
+
+        self.mThreadId = 0
+        self.mThread: Optional[threading.Thread] = None
+        self.mStop = threading.Event()
+
+    def tagged(self, name: str, func: Callable) -> Callable:
+        """Wraps func so that samples taken during its calls are counted under name"""
+        profiler = self
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous = profiler.mSection
+            profiler.mSection = name
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.mSection = previous
+
+        return wrapper
+
+    def taggedCommand(self, name: str, func: Callable) -> Callable:
+        """
+        Wraps a command's method so that samples taken during its calls are counted
+        under name and the subsystems the command requires, e.g. name[Drivetrain,Elevator]
+        """
+        profiler = self
+        # command: (number of requirements, section); requirements are only ever added,
+        # so the section is rebuilt only when their number changes
+        sections: dict[object, tuple[int, str]] = {}
+
+        @functools.wraps(func)
+        def wrapper(command, *args, **kwargs):
+            previous = profiler.mSection
+            requirements = command.getRequirements()
+            cached = sections.get(command)
+            if cached is None or cached[0] != len(requirements):
+                names = sorted(type(subsystem).__name__ for subsystem in requirements)
+                cached = sections[command] = (len(requirements), f'{name}[{",".join(names)}]')
+            profiler.mSection = cached[1]
+            try:
+                return func(command, *args, **kwargs)
+            finally:
+                profiler.mSection = previous
+
+        return wrapper
+
+    def instrumentClass(self, cls: type, methods: Iterable[str]) -> None:
+        """Replaces each of cls's methods with a tagging wrapper, named Class.method"""
+        wrapMethods(self, cls, methods, self.tagged)
+
+    def instrumentCommand(self, cls: type, methods: Iterable[str]) -> None:
+        """As instrumentClass, for a command class, also tagging with its requirements"""
+        wrapMethods(self, cls, methods, self.taggedCommand)
+
+    def start(self) -> None:
+        """Starts sampling the calling thread"""
+        if self.mThread is not None:
+            return
+        self.mThreadId = threading.get_ident()
+        self.mStop.clear()
+        self.mStartNs = perf_counter_ns()
+        self.mThread = threading.Thread(target=self._run, name='SamplingProfiler', daemon=True)
+        self.mThread.start()
+
+    def stop(self) -> None:
+        if self.mThread is None:
+            return
+        self.mStop.set()
+        self.mThread.join()
+        self.mThread = None
+        self.mRunningNs += perf_counter_ns() - self.mStartNs
+
+    def _run(self) -> None:
+        while not self.mStop.wait(self.mInterval):
+            self.sample()
+
+    def sample(self) -> None:
+        sampleStart = perf_counter_ns()
+        frame = sys._current_frames().get(self.mThreadId)
+        if frame is None:
+            return
+
+        section = self.mSection
+        codes = []
+        depth = self.mMaxDepth
+        while frame is not None and depth:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+            depth -= 1
+        del frame
+
+        key = (section, tuple(codes))
+        self.mStacks[key] = self.mStacks.get(key, 0) + 1
+        self.mSamples += 1
+        self.mSamplingNs += perf_counter_ns() - sampleStart
+
+    def getSampleCount(self) -> int:
+        return self.mSamples
+
+    def getOverhead(self) -> float:
+        """Fraction of the time sampled so far spent taking samples"""
+        running = self.mRunningNs
+        if self.mThread is not None:
+            running += perf_counter_ns() - self.mStartNs
+        return self.mSamplingNs / running if running else 0.
+
+    def clear(self) -> None:
+        self.mStacks = {}
+        self.mSamples = 0
+        self.mSamplingNs = 0
+        self.mRunningNs = 0
+        self.mStartNs = perf_counter_ns()
+
+    @staticmethod
+    def frameName(code: CodeType) -> str:
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+    def collapsed(self, section: Optional[str] = None) -> list[str]:
+        """
+        One 'root;...;leaf count' line per distinct stack, rooted at its section;
+        only section's stacks if given
+        """
+        names: dict[CodeType, str] = {}
+        counts: dict[str, int] = {}
+        for (stackSection, codes), count in list(self.mStacks.items()):
+            if section is not None and stackSection != section:
+                continue
+            frames = [stackSection or self.kUntagged]
+            for code in reversed(codes):
+                name = names.get(code)
+                if name is None:
+                    # ';' separates frames
+                    name = names[code] = self.frameName(code).replace(';', ':')
+                frames.append(name)
+            line = ';'.join(frames)
+            counts[line] = counts.get(line, 0) + count
+        return [f'{line} {count}' for line, count in sorted(counts.items())]
+
+    def export(self, path: str, section: Optional[str] = None) -> None:
+        """Writes collapsed stacks to path"""
+        tempPath = f'{path}.tmp'
+        with open(tempPath, 'w') as file:
+            for line in self.collapsed(section):
+                file.write(line)
+                file.write('\n')
+        os.replace(tempPath, path)
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    print('Testing lib.robotpy.sampling')
+
+    def spin(seconds: float) -> None:
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+    class Arm:
+        pass
+
+    class Slow:
+        def getRequirements(self):
+            return {Arm()}
+
+        def execute(self):
+            self.inner()
+
+        def inner(self):
+            spin(0.02)
+
+        def periodic(self):
+            spin(0.005)
+
+    profiler = SamplingProfiler(interval=0.002)
+    profiler.instrumentCommand(Slow, ('execute',))
+    profiler.instrumentClass(Slow, ('periodic',))
+    profiler.instrumentCommand(Slow, ('execute',))
+    slow = Slow()
+
+    start = time.perf_counter()
+    profiler.start()
+    for _ in range(10):
+        slow.execute()
+        slow.periodic()
+    spin(0.03)
+    profiler.stop()
+    elapsed = time.perf_counter() - start
+
+    try:
+        lines = profiler.collapsed()
+        total = sum(int(line.rsplit(' ', 1)[1]) for line in lines)
+        # Waiting for the GIL twice a sample stretches the interval by up to two switch intervals;
+        # half of that rate leaves room for a busy machine
+        expected = elapsed / (profiler.mInterval + 2 * sys.getswitchinterval()) / 2
+        assert total == profiler.getSampleCount() >= expected, (total, expected)
+
+        bySection = {}
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            section = stack.split(';', 1)[0]
+            bySection[section] = bySection.get(section, 0) + int(count)
+        # execute spins for four times as long as periodic
+        assert bySection['Slow.execute[Arm]'] > 2 * bySection['Slow.periodic']
+        assert 'robot' in bySection
+        assert all(';inner (sampling.py:' in line for line in profiler.collapsed('Slow.execute[Arm]'))
+        assert profiler.getOverhead() < 0.05
+
+        class Lift:
+            pass
+
+        class Grow:
+            def __init__(self):
+                self.mRequirements = {Arm()}
+                self.mSections = []
+
+            def getRequirements(self):
+                return self.mRequirements
+
+            def execute(self):
+                self.mSections.append(profiler.mSection)
+
+        profiler.instrumentCommand(Grow, ('execute',))
+        grow = Grow()
+        grow.execute()
+        grow.execute()
+        grow.mRequirements.add(Lift())
+        grow.execute()
+        first, second, third = grow.mSections
+        # Built once per requirement set, not once per call
+        assert first == 'Grow.execute[Arm]' and second is first
+        assert third == 'Grow.execute[Arm,Lift]'
+        assert profiler.mSection is None
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.collapsed')
+            profiler.export(path)
+            with open(path) as file:
+                assert file.read().splitlines() == lines
+    except AssertionError:
+        print('SamplingProfiler test failed')
+        raise
+
+    print(f'{profiler.getSampleCount()} samples, {profiler.getOverhead():.2%} of the time spent sampling')
+    print('sampling.py tests succeded')
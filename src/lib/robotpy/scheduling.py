@@ -0,0 +1,188 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+import math
+from typing import Callable, NamedTuple
+
+import wpilib
+
+
+class Job(NamedTuple):
+    callback: Callable[[], None]
+    # In ticks
+    period: int
+    offset: int
+    name: str
+
+
+class TimingWheel:
+    """
+    Runs callbacks at multiples of one base tick from a single robot.addPeriodic callback
+
+    The wheel has a slot per tick of the hyperperiod (the lcm of every job's period),
+    each listing the jobs due on that tick. A new job is given the phase offset
+    whose slots are least loaded, counting the robot's main loop as a job,
+    so slow jobs spread out instead of landing on the same tick.
+
+    The tick is read off the clock relative to the robot's start time rather than
+    counted, so slot 0 stays in phase with the main loop however late or often run()
+    is called: ticks missed by an overrun are skipped, and a tick is never run twice.
+    """
+
+    def __init__(
+            self,
+            tickPeriod: float = 0.005,
+            mainPeriod: float = 0.02,
+            clock: Callable[[], float] = wpilib.Timer.getFPGATimestamp,
+            ) -> None:
+        self.mTickPeriod = tickPeriod
+        self.mMainTicks = self.toTicks(mainPeriod)
+        self.mClock = clock
+        self.mJobs: list[Job] = []
+        self.mSlots: list[tuple[Callable[[], None], ...]] = [()]
+        self.mStartTime = 0.
+        # Last tick run
+        self.mTick = -1
+        self.mInstalled = False
+
+    def toTicks(self, period: float) -> int:
+        ticks = round(period / self.mTickPeriod)
+        if ticks < 1 or not math.isclose(ticks * self.mTickPeriod, period, rel_tol=1e-6):
+            raise ValueError(f'Period {period} is not a multiple of the {self.mTickPeriod} tick')
+        return ticks
+
+    def _hyperperiod(self, *periods: int) -> int:
+        return math.lcm(self.mMainTicks, *(job.period for job in self.mJobs), *periods)
+
+    def load(self, hyperperiod: int = None) -> list[int]:
+        """Jobs (including the main loop) due on each tick of the hyperperiod"""
+        hyperperiod = hyperperiod or self._hyperperiod()
+        load = [0] * hyperperiod
+        for slot in range(0, hyperperiod, self.mMainTicks):
+            load[slot] += 1
+        for job in self.mJobs:
+            for slot in range(job.offset, hyperperiod, job.period):
+                load[slot] += 1
+        return load
+
+    def add(self, callback: Callable[[], None], period: float, name: str = None) -> Job:
+        """Schedules callback every period seconds (a multiple of the tick), returning its job"""
+        ticks = self.toTicks(period)
+        hyperperiod = self._hyperperiod(ticks)
+        load = self.load(hyperperiod)
+
+        def cost(offset: int) -> tuple[int, int]:
+            slots = [load[slot] for slot in range(offset, hyperperiod, ticks)]
+            return max(slots), sum(slots)
+
+        job = Job(callback, ticks, min(range(ticks), key=cost), name or getattr(callback, '__qualname__', repr(callback)))
+        self.mJobs.append(job)
+        self._build()
+        return job
+
+    def remove(self, job: Job) -> None:
+        self.mJobs.remove(job)
+        self._build()
+
+    def instrument(self, wrap: Callable[[str, Callable[[], None]], Callable[[], None]]) -> None:
+        """Replaces every job's callback with wrap(name, callback), e.g. LoopProfiler.timed"""
+        self.mJobs = [job._replace(callback=wrap(job.name, job.callback)) for job in self.mJobs]
+        self._build()
+
+    def _build(self) -> None:
+        hyperperiod = self._hyperperiod()
+        slots = [[] for _ in range(hyperperiod)]
+        for job in self.mJobs:
+            for slot in range(job.offset, hyperperiod, job.period):
+                slots[slot].append(job.callback)
+        self.mSlots = [tuple(slot) for slot in slots]
+
+    def run(self) -> None:
+        """Runs the jobs due on the current tick; called every tick"""
+        tick = round((self.mClock() - self.mStartTime) / self.mTickPeriod)
+        # A catch-up call for a tick which has already run
+        if tick <= self.mTick:
+            return
+        self.mTick = tick
+        slots = self.mSlots
+        for callback in slots[tick % len(slots)]:
+            callback()
+
+    def install(self, robot, startTime: float = None) -> None:
+        """
+        Drives the wheel from a wpilib.TimedRobot, whose main loop then counts as
+        a job with the robot's period; startTime is the clock reading the robot's
+        loop is timed from (its construction), by default now
+        """
+        if self.mInstalled:
+            raise RuntimeError('TimingWheel is already installed')
+        self.mInstalled = True
+        self.mStartTime = self.mClock() if startTime is None else startTime
+        self.mTick = -1
+        self.mMainTicks = self.toTicks(robot.getPeriod())
+        self._build()
+        robot.addPeriodic(self.run, self.mTickPeriod)
+
+    def describe(self) -> str:
+        return '\n'.join(
+            f'{job.name}: every {job.period * self.mTickPeriod * 1000:g} ms from tick {job.offset}'
+            for job in self.mJobs
+        )
+
+
+if __name__ == '__main__':
+    print('Testing lib.robotpy.scheduling')
+
+    calls = []
+    now = [0.]
+    wheel = TimingWheel(0.005, 0.02, clock=lambda: now[0])
+    try:
+        fast = wheel.add(lambda: calls.append('fast'), 0.005, 'fast')
+        slow = [wheel.add(lambda i=i: calls.append(f'slow{i}'), 0.1, f'slow{i}') for i in range(3)]
+        medium = wheel.add(lambda: calls.append('medium'), 0.02, 'medium')
+
+        # Slow jobs avoid the main loop's ticks and each other
+        assert fast.offset == 0
+        assert all(job.offset % 4 for job in slow)
+        assert len({job.offset for job in slow}) == 3
+        assert medium.offset % 4
+
+        for tick in range(200):
+            # Called a little late, as by the robot's notifier
+            now[0] = tick * 0.005 + 0.0004
+            wheel.run()
+        assert calls.count('fast') == 200
+        assert calls.count('medium') == 50
+        assert all(calls.count(f'slow{i}') == 10 for i in range(3))
+
+        # Only fast jobs share a tick with the main loop
+        load = wheel.load()
+        assert max(load) == 3 and all(load[slot] == 2 for slot in range(0, len(load), 4))
+
+        # After an overrun the wheel picks up on the tick the clock says, not the next one counted;
+        # catch-up calls for a tick already run do nothing
+        calls.clear()
+        now[0] = 203 * 0.005
+        wheel.run()
+        wheel.run()
+        assert calls == [job.name for job in wheel.mJobs if 203 % job.period == job.offset]
+        assert wheel.mTick == 203
+
+        wheel.remove(fast)
+        assert max(wheel.load()) == 2
+
+        try:
+            wheel.add(lambda: None, 0.007)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('Period which is not a multiple of the tick accepted')
+    except AssertionError:
+        print('TimingWheel test failed')
+        raise
+
+    print('scheduling.py tests succeded')
@@ -0,0 +1,150 @@
+from __future__ import annotations
+if __name__ == '__main__':
+    import os
+    import site
+    os.chdir('src')
+    site.addsitedir(os.getcwd())
+
+from array import array
+from typing import Callable, Iterable, Mapping
+import weakref
+
+
+_snapshots: weakref.WeakSet[SensorSnapshot] = weakref.WeakSet()
+_tick = 0
+
+
+def getTick() -> int:
+    """Number of times invalidateAll has been called (one per robot loop)"""
+    return _tick
+
+
+def invalidateAll() -> None:
+    """
+    Marks every group of every live SensorSnapshot as stale;
+    called by Robot at the start of each loop so the first reader
+    of each group in the loop re-reads its sensors
+    """
+    global _tick
+    _tick += 1
+    for snapshot in _snapshots:
+        snapshot.invalidate()
+
+
+class SensorSnapshot:
+    """
+    Array-backed cache of sensor reads which are taken at most once per tick.
+
+    Sensors are given as named groups of zero-argument getters;
+    the first read of a group after invalidation calls that group's getters once
+    and every later read in the same tick is served from the array,
+    so all readers in a tick see the same values.
+    Groups nobody reads in a tick are never read from the hardware.
+    """
+    __slots__ = 'mSources', 'mValues', 'mGroups', 'mValid', '__weakref__'
+
+    def __init__(self, groups: Mapping[str, Iterable[Callable[[], float]]]) -> None:
+        sources = []
+        self.mGroups = {}
+        for name, getters in groups.items():
+            start = len(sources)
+            sources.extend(getters)
+            # (index into mValid, start, stop)
+            self.mGroups[name] = (len(self.mGroups), start, len(sources))
+
+        self.mSources = tuple(sources)
+        self.mValues = array('d', bytes(8 * len(sources)))
+        # One flag per group
+        self.mValid = bytearray(len(self.mGroups))
+
+        _snapshots.add(self)
+
+    def refresh(self, name: str | None = None) -> None:
+        """Re-reads the named group's sensors, or every group's"""
+        groups = self.mGroups.values() if name is None else (self.mGroups[name],)
+        for group, start, stop in groups:
+            self._read(group, start, stop)
+
+    def _read(self, group: int, start: int, stop: int) -> None:
+        values = self.mValues
+        sources = self.mSources
+        for i in range(start, stop):
+            values[i] = sources[i]()
+        self.mValid[group] = True
+
+    def invalidate(self) -> None:
+        self.mValid[:] = bytes(len(self.mValid))
+
+    def _group(self, name: str) -> tuple[int, int]:
+        """(start, stop) of the named group, refreshing it if it is stale"""
+        group, start, stop = self.mGroups[name]
+        if not self.mValid[group]:
+            self._read(group, start, stop)
+        return start, stop
+
+    def get(self, name: str, index: int = 0) -> float:
+        """Value of the index-th sensor in the named group"""
+        start, stop = self._group(name)
+        if not 0 <= index < stop - start:
+            raise IndexError(f'{name} has no sensor {index}')
+        return self.mValues[start + index]
+
+    def mean(self, name: str) -> float:
+        """Average of every sensor in the named group"""
+        start, stop = self._group(name)
+        values = self.mValues
+        total = 0.
+        for i in range(start, stop):
+            total += values[i]
+        return total / (stop - start)
+
+    def values(self, name: str) -> tuple[float, ...]:
+        """Every sensor value in the named group"""
+        start, stop = self._group(name)
+        return tuple(self.mValues[start:stop])
+
+
+if __name__ == '__main__':
+    print('Testing lib.robotpy.snapshot')
+
+    reads = []
+
+    def sensor(value):
+        def getter():
+            reads.append(value)
+            return value
+        return getter
+
+    snapshot = SensorSnapshot({
+        'left': [sensor(1.), sensor(3.)],
+        'right': [sensor(5.)],
+    })
+
+    try:
+        assert snapshot.mean('left') == 2.
+        # Only the group which was read
+        assert reads == [1., 3.]
+        assert snapshot.get('right') == 5.
+        assert snapshot.values('left') == (1., 3.)
+        # Every sensor read exactly once in the tick
+        assert reads == [1., 3., 5.]
+
+        tick = getTick()
+        invalidateAll()
+        assert getTick() == tick + 1
+        assert snapshot.mean('right') == 5.
+        assert reads == [1., 3., 5., 5.]
+        assert snapshot.get('left', 1) == 3.
+        assert reads == [1., 3., 5., 5., 1., 3.]
+
+        snapshot.invalidate()
+        snapshot.refresh('right')
+        assert reads == [1., 3., 5., 5., 1., 3., 5.]
+        snapshot.refresh()
+        assert reads[-3:] == [1., 3., 5.]
+        assert snapshot.mean('left') == 2. and len(reads) == 10
+    except AssertionError:
+        print('SensorSnapshot test failed')
+        raise
+
+    print('snapshot.py tests succeded')
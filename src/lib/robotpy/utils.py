@@ -5,6 +5,7 @@ if __name__ == '__main__':
     os.chdir('src')
     site.addsitedir(os.getcwd())
 
+import sys
 import typing
 from typing import (
     Any,
@@ -19,6 +20,8 @@ from lib.python.utils import (
     T,
     NonwritableType,
     SingletonType,
+    build_path_index,
+    content_hash,
     remove_dunder_attrs,
 )
 
@@ -36,9 +39,10 @@ class ConstantsType(NonwritableType):
     """Defines a get item and repr method"""
     def __new__(mcls: ConstantsType, clsname: str, bases: tuple, clsdict: dict) -> ConstantsType:
         """
-        Checks for potentially dubious keys attribute
-        and
+        Checks for potentially dubious keys attribute,
         replaces annotation-only values with default values
+        and
+        indexes every nested path and hashes the contents
         """
 
         if 'keys' in clsdict:
@@ -47,20 +51,25 @@ class ConstantsType(NonwritableType):
         annotations = clsdict.get('__annotations__', {})
         for name, type_ in annotations.items():
             if name not in clsdict:
-                type_ = eval(type_)
+                if isinstance(type_, str):
+                    type_ = eval(type_, vars(sys.modules[clsdict['__module__']]))
 
                 err_text = f'{name} is only outlined in {clsname} as {type_!s} (not defined)'
                 
                 try:
-                    annotation = annotation()
+                    annotation = type_()
                 except TypeError:
-                    pass
+                    annotation = None
                 else:
                     err_text += f', replacing with default constructor value of {annotation!s}'
                 
                 warnings.warn(err_text, UserWarning)
                 
                 clsdict[name] = annotation
+
+        items = remove_dunder_attrs(clsdict).items()
+        clsdict['__path_index__'] = build_path_index(items)
+        clsdict['__content_hash__'] = content_hash(items)
         
         return super().__new__(mcls, clsname, bases, clsdict)
     
@@ -77,19 +86,25 @@ class ConstantsType(NonwritableType):
             raise TypeError(f'Items must be of type str or tuple[str], not {type(name)}')
         
         try:
-            if name in self.__dict__:
-                return getattr(self, name)
-            # If name is a tuple, iterate over sub-objects and their attributes
-            if isinstance(name, tuple):
-                obj = self
-
-                for item in name:
-                    # If it has items, check only those
-                    # Otherwise, check attributes
-                    if hasattr(obj, '__getitem__'):
-                        obj = obj[item]
-                    else:
-                        obj = getattr(obj, item)
+            return self.__path_index__[name]
+        except (KeyError, TypeError):
+            pass
+
+        # Paths through inherited attributes or values which are not
+        # ConstantsClasses, ReadonlyDicts, lists or tuples
+        path = (name,) if isinstance(name, str) else name
+        if not path:
+            raise KeyError(name)
+
+        try:
+            obj = getattr(self, path[0])
+            for item in path[1:]:
+                # If it has items, check only those
+                # Otherwise, check attributes
+                if hasattr(obj, '__getitem__'):
+                    obj = obj[item]
+                else:
+                    obj = getattr(obj, item)
         
         except AttributeError as e:
             raise KeyError(*e.args) from e
@@ -97,6 +112,14 @@ class ConstantsType(NonwritableType):
             raise
         else:
             return obj
+
+    def contentHash(self) -> str:
+        """
+        Stable hash of every (nested) value, computed when the class is created;
+        changes whenever any constant does
+        (values without a deterministic repr are hashed by their repr)
+        """
+        return self.__content_hash__
     
     # Taken practically directly from types.SimpleNamespace documentation page
     def __repr__(self) -> str:
@@ -218,6 +241,15 @@ if __name__ == '__main__':
         assert 'first' in TestConstant
         assert tuple(item for item in TestConstant) == TestConstant.keys()
         assert {**TestConstant} == dict(TestConstant.items())
+        # Hashing
+        class SameConstant(ConstantsClass):
+            second = 2
+            first = 1
+            string = 'abcde'
+            int_list = [5, 6, 7, 8, 9]
+            Dict_ = TestConstant.Dict_
+        assert TestConstant.contentHash() == SameConstant.contentHash()
+        assert TestConstant.contentHash() != TestConstant.Dict_.contentHash()
     except AssertionError as e:
         print(f'ConstantsClass test failed')
         raise